@@ -0,0 +1,70 @@
+"""
+Benchmark of clone strategies: clone time, scan time and bytes on disk for a
+full checkout at depth 100 (the previous default) vs. per-mode clones that
+scan straight from the object database, using local bare repos as sources.
+
+Usage: python -m benchmarks.bench_clone [--files 2000] [--commits 50]
+"""
+import argparse
+import os
+import subprocess
+import tempfile
+import time
+
+import config
+from scanner.clone_strategy import CloneStrategy
+from scanner.pattern_matcher import PatternMatcher
+from scanner.repo_processor import RepoProcessor
+from benchmarks.local_repos import create_repo
+
+
+def disk_usage(path):
+    total = 0
+    for root, _, files in os.walk(path):
+        for name in files:
+            try:
+                total += os.path.getsize(os.path.join(root, name))
+            except OSError:
+                pass
+    return total
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Clone strategy benchmark")
+    parser.add_argument("--files", type=int, default=2000)
+    parser.add_argument("--commits", type=int, default=50)
+    parser.add_argument("--blob-limit", type=str, default="64k", help="Blob filter of the partial clone strategy")
+    args = parser.parse_args()
+
+    matcher = PatternMatcher(config.PATTERNS)
+    with tempfile.TemporaryDirectory() as tmp:
+        work = create_repo(os.path.join(tmp, "work"), files=args.files, commits=args.commits)
+        source = os.path.join(tmp, "source.git")
+        subprocess.run(["git", "clone", "-q", "--bare", work, source], check=True)
+        subprocess.run(["git", "-C", source, "config", "uploadpack.allowFilter", "true"], check=True)
+        url = "file://" + os.path.abspath(source).replace("\\", "/")
+
+        processor = RepoProcessor(temp_dir=os.path.join(tmp, "clones"))
+        strategies = [
+            ("checkout, depth 100 (previous)", CloneStrategy(), processor.scan_current_files),
+            ("checkout, depth 1", CloneStrategy.for_scan("current", checkout=True), processor.scan_current_files),
+            ("object database, depth 1", CloneStrategy.for_scan("current"), processor.scan_tree),
+            (f"object database, blob:limit={args.blob_limit}", CloneStrategy.for_scan("current", blob_limit=args.blob_limit), processor.scan_tree),
+        ]
+
+        print(f"{'strategy':<38} {'clone s':>8} {'scan s':>8} {'disk KB':>9} {'findings':>9}")
+        for label, strategy, scan in strategies:
+            start = time.perf_counter()
+            path = processor.clone_repo(url, "bench", strategy)
+            clone_time = time.perf_counter() - start
+
+            start = time.perf_counter()
+            findings = scan(path, matcher.scan_text)
+            scan_time = time.perf_counter() - start
+
+            print(f"{label:<38} {clone_time:>8.2f} {scan_time:>8.2f} {disk_usage(path) / 1024:>9.0f} {len(findings):>9}")
+            processor.delete_repo(path)
+
+
+if __name__ == "__main__":
+    main()
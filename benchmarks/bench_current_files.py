@@ -0,0 +1,46 @@
+"""
+Benchmark of RepoProcessor.scan_current_files, serial vs. a process pool.
+
+Usage: python -m benchmarks.bench_current_files [--files 20000] [--processes 1,2,4,0]
+"""
+import argparse
+import os
+import tempfile
+import time
+
+import config
+from scanner.pattern_matcher import PatternMatcher
+from scanner.repo_processor import RepoProcessor
+from benchmarks.local_repos import create_repo
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Current-files scan benchmark")
+    parser.add_argument("--files", type=int, default=20000)
+    parser.add_argument("--lines", type=int, default=100, help="Lines per file")
+    parser.add_argument("--processes", type=str, default="1,2,4,0", help="Process counts to compare (0 = one per core)")
+    args = parser.parse_args()
+
+    matcher = PatternMatcher(config.PATTERNS)
+    with tempfile.TemporaryDirectory() as tmp:
+        repo_path = create_repo(os.path.join(tmp, "repo"), files=args.files, commits=1, lines_per_file=args.lines)
+        processor = RepoProcessor(temp_dir=os.path.join(tmp, "cache"))
+
+        baseline = None
+        for processes in (int(p) for p in args.processes.split(",")):
+            processor.scan_current_files(repo_path, matcher.scan_text, processes=processes)  # warm pool and page cache
+            start = time.perf_counter()
+            findings = processor.scan_current_files(repo_path, matcher.scan_text, processes=processes)
+            elapsed = time.perf_counter() - start
+
+            if baseline is None:
+                baseline = (elapsed, findings)
+            elif findings != baseline[1]:
+                raise SystemExit(f"Findings differ with processes={processes}!")
+            print(f"processes={processes or os.cpu_count()}: {elapsed:.2f}s "
+                  f"({baseline[0] / elapsed:.1f}x), {len(findings)} findings")
+        processor.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,103 @@
+"""
+Benchmark of the scanner daemon: time per single-repository scan job when each job
+is a fresh `python main.py --repo ...` process vs. a job submitted to a running
+`main.py --daemon` (POST /jobs, then reading GET /jobs/<id>/results to the end).
+Repositories are small, so the time is mostly per-job overhead.
+
+Usage: python -m benchmarks.bench_daemon [--jobs 20]
+"""
+import argparse
+import http.client
+import json
+import os
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+from benchmarks.local_repos import create_repo
+
+MAIN = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "main.py")
+SCAN_ARGS = ["--mode", "history", "--depth", "5", "--no-scan-cache"]
+
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def run_cli(url, cwd):
+    subprocess.run([sys.executable, MAIN, "--repo", url, *SCAN_ARGS], cwd=cwd, check=True,
+                   stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+
+
+def run_job(port, url):
+    """Submits a job and reads its result stream; returns the number of findings."""
+    conn = http.client.HTTPConnection("127.0.0.1", port)
+    conn.request("POST", "/jobs", body=json.dumps({"repo": url}), headers={"Content-Type": "application/json"})
+    job = json.loads(conn.getresponse().read())
+    conn.request("GET", f"/jobs/{job['id']}/results")
+    lines = conn.getresponse().read().decode().splitlines()
+    conn.close()
+    return json.loads(lines[-1])["findings"]
+
+
+def wait_for(port, timeout=30):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            conn = http.client.HTTPConnection("127.0.0.1", port)
+            conn.request("GET", "/health")
+            conn.getresponse().read()
+            return
+        except OSError:
+            time.sleep(0.05)
+    raise RuntimeError("Daemon didn't start")
+
+
+def report(label, times):
+    times = sorted(times)
+    p95 = times[min(len(times) - 1, int(len(times) * 0.95))]
+    print(f"{label:<16} mean {statistics.mean(times) * 1000:7.1f} ms  p50 {statistics.median(times) * 1000:7.1f} ms  p95 {p95 * 1000:7.1f} ms")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Scanner daemon benchmark")
+    parser.add_argument("--jobs", type=int, default=20, help="Scan jobs per method")
+    parser.add_argument("--files", type=int, default=5, help="Files per repository")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        url = "file://" + create_repo(os.path.join(tmp, "repo"), files=args.files, commits=3, secret_rate=0.05)
+
+        cli_times = []
+        for _ in range(args.jobs):
+            start = time.perf_counter()
+            run_cli(url, tmp)
+            cli_times.append(time.perf_counter() - start)
+
+        port = free_port()
+        daemon = subprocess.Popen([sys.executable, MAIN, "--daemon", "--listen", f"127.0.0.1:{port}", *SCAN_ARGS],
+                                  cwd=tmp, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        try:
+            wait_for(port)
+            daemon_times = []
+            for _ in range(args.jobs):
+                start = time.perf_counter()
+                findings = run_job(port, url)
+                daemon_times.append(time.perf_counter() - start)
+        finally:
+            daemon.terminate()
+            daemon.wait()
+
+        print(f"{args.jobs} jobs on a {args.files}-file repository ({findings} findings each)")
+        report("process per job", cli_times)
+        report("daemon job", daemon_times)
+        print(f"speedup: {statistics.mean(cli_times) / statistics.mean(daemon_times):.1f}x")
+
+
+if __name__ == "__main__":
+    main()
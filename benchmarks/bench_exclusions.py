@@ -0,0 +1,85 @@
+"""
+Benchmark of the exclusion rules: scan time of a typical JS/Python repository
+(sources plus node_modules, minified bundles, lockfiles, images and binaries)
+with no rules vs. config.EXCLUDE_PATTERNS, the size limit and binary sniffing.
+
+Usage: python -m benchmarks.bench_exclusions [--sources 300] [--packages 200]
+"""
+import argparse
+import json
+import os
+import random
+import subprocess
+import tempfile
+import time
+
+import config
+from scanner.exclusions import ExclusionRules
+from scanner.pattern_matcher import PatternMatcher
+from scanner.repo_processor import RepoProcessor
+from scanner.scan_report import ScanReport
+from benchmarks.local_repos import create_repo
+
+
+def _write(path, data):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "wb") as f:
+        f.write(data)
+
+
+def add_dependencies(repo_path, packages, seed=0):
+    """Adds what a JS/Python project typically commits next to its sources."""
+    rng = random.Random(seed)
+    line = b"function f%d(a,b){return a.map(function(x){return x*%d+b})}\n"
+    for p in range(packages):
+        for m in range(5):
+            _write(os.path.join(repo_path, "node_modules", f"pkg{p}", "lib", f"mod{m}.js"),
+                   b"".join(line % (i, i) for i in range(400)))
+    for b in range(10):
+        _write(os.path.join(repo_path, "static", f"bundle{b}.min.js"), b"".join(line % (i, i) for i in range(20000)).replace(b"\n", b";"))
+        _write(os.path.join(repo_path, "static", f"bundle{b}.js.map"), json.dumps({"mappings": "AAAA;" * 100000}).encode())
+    lock = {"packages": {f"node_modules/pkg{p}": {"version": "1.0.0", "integrity": "sha512-" + "a" * 88} for p in range(packages * 20)}}
+    _write(os.path.join(repo_path, "package-lock.json"), json.dumps(lock, indent=2).encode())
+    for i in range(50):
+        _write(os.path.join(repo_path, "assets", f"image{i}.png"), b"\x89PNG\r\n\x1a\n\0" + rng.randbytes(200000))
+    # Binaries without a telling extension are caught by sniffing
+    for i in range(10):
+        _write(os.path.join(repo_path, "bin", f"tool{i}"), b"\x7fELF\x02\x01\x01\0" + rng.randbytes(500000))
+    subprocess.run(["git", "-c", "user.name=bench", "-c", "user.email=bench@example.com", "add", "-A"],
+                   cwd=repo_path, check=True)
+    subprocess.run(["git", "-c", "user.name=bench", "-c", "user.email=bench@example.com", "commit", "-q", "-m", "deps"],
+                   cwd=repo_path, check=True)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Exclusion rules benchmark")
+    parser.add_argument("--sources", type=int, default=300, help="Source files")
+    parser.add_argument("--packages", type=int, default=200, help="node_modules packages (5 files each)")
+    args = parser.parse_args()
+
+    matcher = PatternMatcher(config.PATTERNS)
+    rules = ExclusionRules(config.EXCLUDE_PATTERNS, config.SCAN_MAX_FILE_SIZE)
+    with tempfile.TemporaryDirectory() as tmp:
+        repo_path = create_repo(os.path.join(tmp, "repo"), files=args.sources, commits=1)
+        add_dependencies(repo_path, args.packages)
+        processor = RepoProcessor(temp_dir=os.path.join(tmp, "cache"))
+
+        for scan in ("scan_current_files", "scan_tree"):
+            baseline = None
+            for label, exclusions in (("no rules", None), ("exclusions", rules)):
+                processor.exclusions = exclusions
+                getattr(processor, scan)(repo_path, matcher.scan_text)  # warm the page cache
+                report = ScanReport()
+                start = time.perf_counter()
+                findings = getattr(processor, scan)(repo_path, matcher.scan_text, report=report)
+                elapsed = time.perf_counter() - start
+                if baseline is None:
+                    baseline = elapsed
+                source_findings = sum(1 for f in findings if f.path.startswith("src/"))
+                print(f"{scan:<18} {label:<10} {elapsed:6.2f}s ({baseline / elapsed:4.1f}x), "
+                      f"{source_findings} findings in sources; {report.summary()}")
+        processor.close()
+
+
+if __name__ == "__main__":
+    main()
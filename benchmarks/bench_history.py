@@ -0,0 +1,66 @@
+"""
+Benchmark of RepoProcessor.scan_history (one streamed `git log --patch`) against
+the previous approach of one GitPython diff per commit.
+
+Usage: python -m benchmarks.bench_history [--commits 1000] [--files 500]
+"""
+import argparse
+import os
+import tempfile
+import time
+
+import git
+
+import config
+from scanner.pattern_matcher import PatternMatcher
+from scanner.repo_processor import RepoProcessor
+from benchmarks.local_repos import create_repo
+
+
+def legacy_scan_history(repo_path, depth, scanner_func):
+    """The per-commit GitPython loop scan_history used before, kept here for comparison."""
+    results = []
+    repo = git.Repo(repo_path)
+    for commit in list(repo.iter_commits('HEAD', max_count=depth)):
+        for m in scanner_func(commit.message):
+            results.append(m)
+        if not commit.parents:
+            continue
+        for diff in commit.diff(commit.parents[0], create_patch=True):
+            for m in scanner_func(diff.diff.decode('utf-8', errors='ignore')):
+                results.append(m)
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="History scan benchmark")
+    parser.add_argument("--commits", type=int, default=1000)
+    parser.add_argument("--files", type=int, default=500)
+    parser.add_argument("--lines", type=int, default=50, help="Lines per file")
+    args = parser.parse_args()
+
+    matcher = PatternMatcher(config.PATTERNS)
+    with tempfile.TemporaryDirectory() as tmp:
+        print(f"Creating repo with {args.commits} commits...")
+        repo_path = create_repo(os.path.join(tmp, "repo"), files=max(args.files, args.commits), commits=args.commits, lines_per_file=args.lines)
+        processor = RepoProcessor(temp_dir=os.path.join(tmp, "cache"))
+
+        start = time.perf_counter()
+        legacy = legacy_scan_history(repo_path, args.commits, matcher.scan_text)
+        legacy_time = time.perf_counter() - start
+        print(f"per-commit GitPython diffs: {legacy_time:.2f}s, {len(legacy)} findings")
+
+        start = time.perf_counter()
+        streamed = processor.scan_history(repo_path, depth=args.commits, scanner_func=matcher.scan_text)
+        streamed_time = time.perf_counter() - start
+        print(f"streamed git log --patch:  {streamed_time:.2f}s, {len(streamed)} findings "
+              f"({legacy_time / streamed_time:.1f}x faster)")
+        try:
+            import resource
+            print(f"peak RSS: {resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024:.0f} MB")
+        except ImportError:
+            pass # Not available on Windows
+
+
+if __name__ == "__main__":
+    main()
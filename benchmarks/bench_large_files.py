@@ -0,0 +1,81 @@
+"""
+Benchmark of scanning one large file: peak RSS and MB/s of RepoProcessor.scan_current_files
+(windowed byte scanning) vs. the previous read-and-decode of the whole file, as the file grows.
+Each measurement runs in a fresh process so its peak RSS is its own.
+
+Usage: python -m benchmarks.bench_large_files [--sizes-mb 16,64,256]
+"""
+import argparse
+import multiprocessing
+import os
+import resource
+import tempfile
+import time
+
+import config
+from scanner.pattern_matcher import PatternMatcher
+from scanner.repo_processor import RepoProcessor
+
+LINE = b"INSERT INTO events VALUES (42, 'user@example.com', '2024-01-01 00:00:00', 'payload');\n"
+SECRET_EVERY = 10000  # Lines
+
+
+def create_dump(path, size):
+    """Writes a SQL-dump-like file of about size bytes with an AWS key every SECRET_EVERY lines."""
+    chunk = b"".join(LINE for _ in range(SECRET_EVERY - 1))
+    written = count = 0
+    with open(path, "wb") as f:
+        while written < size:
+            secret = b"key = 'AKIA%s'\n" % (b"%016d" % count).replace(b"0", b"Q")
+            f.write(chunk + secret)
+            written += len(chunk) + len(secret)
+            count += 1
+    return count
+
+
+def legacy_scan(repo_path, matcher):
+    """What scan_current_files did per file before: read it whole and decode it."""
+    matches = []
+    for name in os.listdir(repo_path):
+        with open(os.path.join(repo_path, name), 'rb') as f:
+            data = f.read()
+        text = data.decode('utf-8', errors='ignore').replace('\r\n', '\n').replace('\r', '\n')
+        matches.extend(matcher.scan_text(text))
+    return matches
+
+
+def measure(method, repo_path, queue):
+    matcher = PatternMatcher(config.PATTERNS)
+    start = time.perf_counter()
+    if method == "legacy":
+        findings = len(legacy_scan(repo_path, matcher))
+    else:
+        processor = RepoProcessor(temp_dir=os.path.join(os.path.dirname(repo_path), "cache"))
+        findings = len(processor.scan_current_files(repo_path, scanner_func=matcher.scan_text))
+    elapsed = time.perf_counter() - start
+    queue.put((elapsed, findings, resource.getrusage(resource.RUSAGE_SELF).ru_maxrss // 1024))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Large file scan benchmark")
+    parser.add_argument("--sizes-mb", type=str, default="16,64,256", help="File sizes to compare")
+    args = parser.parse_args()
+
+    context = multiprocessing.get_context("spawn")
+    print(f"{'size':>8}  {'method':<8} {'time':>7} {'MB/s':>7} {'peak RSS':>9}  findings")
+    for size_mb in (int(s) for s in args.sizes_mb.split(",")):
+        with tempfile.TemporaryDirectory() as tmp:
+            repo_path = os.path.join(tmp, "repo")
+            os.makedirs(repo_path)
+            secrets = create_dump(os.path.join(repo_path, "dump.sql"), size_mb * 1024 * 1024)
+            for method in ("legacy", "windowed"):
+                queue = context.Queue()
+                process = context.Process(target=measure, args=(method, repo_path, queue))
+                process.start()
+                elapsed, findings, rss_mb = queue.get()
+                process.join()
+                print(f"{size_mb:>5} MB  {method:<8} {elapsed:6.2f}s {size_mb / elapsed:7.1f} {rss_mb:>6} MB  {findings}/{secrets}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,82 @@
+"""
+Benchmark of the --metrics instrumentation overhead: MB/s of PatternMatcher.scan_text
+with and without per-pattern MatchStats, and wall time of end-to-end ScannerEngine.run
+over local repositories with and without --metrics (best of --rounds, alternating).
+
+Usage: python -m benchmarks.bench_metrics [--size-mb 8] [--repos 10] [--rounds 3]
+"""
+import argparse
+import contextlib
+import logging
+import os
+import tempfile
+import time
+
+import config
+import utils.history
+import utils.run_manifest
+from main import build_parser
+from scanner.pattern_matcher import PatternMatcher
+from benchmarks.bench_pattern_matcher import build_corpus
+from benchmarks.bench_pipeline import LocalScannerEngine
+from benchmarks.local_repos import create_repos
+
+
+def engine_args(mode, metrics):
+    argv = ["--mode", mode, "--depth", "20", "--clone-workers", "2", "--no-scan-cache", "--no-frontier",
+            "--regex-engine", "re", "--file-budget", "0", "--repo-budget", "0", "--max-file-size", "0"]
+    return build_parser().parse_args(argv + (["--metrics"] if metrics else []))
+
+
+def scan_rate(text, stats, rounds):
+    matcher = PatternMatcher(config.PATTERNS, stats=stats)
+    chunks = [text[i:i + 64 * 1024] for i in range(0, len(text), 64 * 1024)]
+    best = float("inf")
+    for _ in range(rounds):
+        start = time.perf_counter()
+        for chunk in chunks:
+            matcher.scan_text(chunk)
+        best = min(best, time.perf_counter() - start)
+    return len(text) / best / 1024**2
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Instrumentation overhead benchmark")
+    parser.add_argument("--size-mb", type=float, default=8, help="Text scanned by scan_text")
+    parser.add_argument("--repos", type=int, default=10)
+    parser.add_argument("--files", type=int, default=100)
+    parser.add_argument("--rounds", type=int, default=3)
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.ERROR)
+
+    text = build_corpus(int(args.size_mb * 1024**2)).encode('utf-8')
+    plain, timed = scan_rate(text, False, args.rounds), scan_rate(text, True, args.rounds)
+    print(f"scan_text: {plain:.1f} MB/s plain, {timed:.1f} MB/s with MatchStats ({(plain / timed - 1) * 100:+.1f}% time)")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        repos = create_repos(os.path.join(tmp, "sources"), args.repos, files=args.files)
+        # Keep clones, results and scan history out of the real project directories
+        workdir = os.path.join(tmp, "work")
+        os.makedirs(workdir)
+        os.chdir(workdir)
+        utils.history.HISTORY_DB = os.path.join(workdir, "scan_history.sqlite")
+        utils.history.HISTORY_FILE = os.path.join(workdir, "scanned_repos.txt")
+        utils.run_manifest.RUNS_DIR = os.path.join(workdir, "runs")
+
+        devnull = open(os.devnull, "w")  # Clone/scan progress lines
+        for mode in ("current", "history"):
+            best = {False: float("inf"), True: float("inf")}
+            for _ in range(args.rounds):
+                for metrics in (False, True):
+                    start = time.perf_counter()
+                    with contextlib.redirect_stdout(devnull):
+                        LocalScannerEngine(repos).run(engine_args(mode, metrics))
+                    best[metrics] = min(best[metrics], time.perf_counter() - start)
+            print(f"ScannerEngine.run ({mode}, {args.repos} repos): {best[False]:.2f}s plain, "
+                  f"{best[True]:.2f}s with --metrics ({(best[True] / best[False] - 1) * 100:+.1f}%)")
+        devnull.close()
+        os.chdir(tmp)
+
+
+if __name__ == "__main__":
+    main()
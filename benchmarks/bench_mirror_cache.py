@@ -0,0 +1,96 @@
+"""
+Benchmark of the mirror cache: repeated scans of local file:// repositories that get a
+new commit between scans. Compares a fresh clone per scan with MirrorCache.checkout
+(fetch into the kept mirror + worktree) in time and bytes brought over, then checks that
+concurrent checkouts of one repository share its mirror and that eviction spares
+mirrors in use.
+
+Usage: python -m benchmarks.bench_mirror_cache [--repos 4] [--rounds 5]
+"""
+import argparse
+import os
+import subprocess
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from scanner.clone_strategy import CloneStrategy
+from scanner.mirror_cache import MirrorCache, _directory_size
+from scanner.repo_processor import RepoProcessor
+from benchmarks.local_repos import create_repo
+
+
+def add_commit(repo_path, round_no):
+    with open(os.path.join(repo_path, f"change_{round_no}.py"), "w", encoding="utf-8") as f:
+        f.write(f'token = "AKIA{"R" * 15}{round_no % 10}"\n')
+    for args in (["add", "-A"], ["commit", "-q", "-m", f"round {round_no}"]):
+        subprocess.run(["git", "-c", "user.name=bench", "-c", "user.email=bench@example.com", *args],
+                       cwd=repo_path, check=True)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Mirror cache benchmark")
+    parser.add_argument("--repos", type=int, default=4, help="Source repositories")
+    parser.add_argument("--rounds", type=int, default=5, help="Scans per repository")
+    parser.add_argument("--files", type=int, default=200, help="Files per repository")
+    args = parser.parse_args()
+
+    strategy = CloneStrategy.for_scan("history", depth=20)
+    with tempfile.TemporaryDirectory() as tmp:
+        sources = [create_repo(os.path.join(tmp, "sources", f"repo{i}"), files=args.files, commits=25, seed=i)
+                   for i in range(args.repos)]
+        processor = RepoProcessor(temp_dir=os.path.join(tmp, "clones"))
+        mirrors = MirrorCache(path=os.path.join(tmp, "mirrors"))
+
+        print(f"{'round':>5}  {'fresh clone':>18}  {'mirror cache':>18}")
+        totals = {"clone": [0.0, 0], "mirror": [0.0, 0]}
+        for round_no in range(args.rounds):
+            if round_no:
+                for source in sources:
+                    add_commit(source, round_no)
+            row = {}
+            for method in ("clone", "mirror"):
+                elapsed = transferred = 0
+                for i, source in enumerate(sources):
+                    url = "file://" + source
+                    start = time.perf_counter()
+                    if method == "clone":
+                        path = processor.clone_repo(url, f"repo{i}", strategy)
+                        elapsed += time.perf_counter() - start
+                        transferred += _directory_size(os.path.join(path, ".git", "objects"))
+                        processor.delete_repo(path)
+                    else:
+                        objects = os.path.join(mirrors.path, f"repo{i}.git", "objects")
+                        before = _directory_size(objects)
+                        path = mirrors.checkout(f"repo{i}", url, os.path.join(tmp, "clones", f"repo{i}"), strategy)
+                        elapsed += time.perf_counter() - start
+                        transferred += _directory_size(objects) - before
+                        mirrors.release(path)
+                row[method] = (elapsed, transferred)
+                totals[method][0] += elapsed
+                totals[method][1] += transferred
+            print(f"{round_no + 1:>5}  " + "  ".join(f"{t:6.2f}s {b / 1024:8.0f} KB" for t, b in row.values()))
+        print(f"{'total':>5}  " + "  ".join(f"{t:6.2f}s {b / 1024:8.0f} KB" for t, b in totals.values()))
+
+        # Concurrent checkouts of one repository: one fetch at a time, every worktree gets HEAD
+        add_commit(sources[0], args.rounds)
+        head = subprocess.run(["git", "rev-parse", "HEAD"], cwd=sources[0], capture_output=True, text=True).stdout.strip()
+        paths = [os.path.join(tmp, "clones", f"concurrent{i}") for i in range(8)]
+        with ThreadPoolExecutor(max_workers=8) as pool:
+            checked_out = list(pool.map(lambda p: mirrors.checkout("repo0", "file://" + sources[0], p, strategy), paths))
+        heads = {processor.head_sha(p) for p in checked_out}
+        print(f"8 concurrent checkouts of one mirror: {'all at the new HEAD' if heads == {head} else f'HEADs differ: {heads}'}")
+
+        # Eviction: with a budget no mirror fits in, all but the one in use are evicted
+        mirrors.max_bytes = 1
+        mirrors.evict()
+        kept = sorted(name for name in os.listdir(mirrors.path) if name.endswith(".git"))
+        print(f"Budget of 1 byte with repo0 in use: kept {kept}, {mirrors.total_bytes() / 1024:.0f} KB")
+        for path in checked_out:
+            mirrors.release(path)
+        mirrors.close()
+        processor.close()
+
+
+if __name__ == "__main__":
+    main()
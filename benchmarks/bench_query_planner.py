@@ -0,0 +1,93 @@
+"""
+Simulated search runs against the local stub search API: repos found per API call
+with the slice-based QueryPlanner vs. the previous random 1-2 character queries.
+
+Each strategy performs several consecutive runs; repos found by earlier runs are
+excluded from later ones, like the scan history does.
+
+Usage: python -m benchmarks.bench_query_planner [--runs 10] [--count 300] [--repos 50000]
+"""
+import argparse
+import contextlib
+import io
+import os
+import random
+import tempfile
+from datetime import date
+
+import config
+from scanner.github_client import GitHubClient
+from scanner.query_planner import QueryPlanner
+from benchmarks.stub_github import StubGitHub
+
+
+class RandomQueryPlanner:
+    """The previous search strategy: a random 1-2 character query, sort order and page (1-10)."""
+    def __init__(self, max_stars, seed=0):
+        self.max_stars = max_stars
+        self.rng = random.Random(seed)
+
+    def next_request(self):
+        chars = "abcdefghijklmnopqrstuvwxyz0123456789"
+        query = "".join(self.rng.choice(chars) for _ in range(self.rng.choice([1, 2])))
+        params = {
+            "q": f"{query} stars:<={self.max_stars} pushed:>{config.MIN_PUSHED_DATE} size:>0",
+            "sort": self.rng.choice(["updated", "stars", "forks"]),
+            "order": "desc",
+            "per_page": 100,
+            "page": self.rng.randint(1, 10),
+        }
+        return None, params
+
+    def record(self, search_slice, total_count, new_repos):
+        pass
+
+    def save(self):
+        pass
+
+    def summary(self):
+        return "random queries"
+
+
+def simulate(base_url, stub, planner, runs, count, max_stars):
+    client = GitHubClient(["bench-token"], base_url=base_url, requests_per_minute=60000)
+    exclude_ids = set()
+    found = 0
+    stub.requests = 0
+    short_runs = 0
+    for _ in range(runs):
+        with contextlib.redirect_stdout(io.StringIO()):
+            repos = client.search_repositories(max_stars=max_stars, limit=count, exclude_ids=set(exclude_ids), planner=planner)
+        found += len(repos)
+        short_runs += len(repos) < count
+        exclude_ids.update(str(r["id"]) for r in repos)
+        planner.save()
+    return found, stub.requests, short_runs
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Search planner simulation against a stub API")
+    parser.add_argument("--repos", type=int, default=50000, help="Repositories in the stub")
+    parser.add_argument("--runs", type=int, default=10)
+    parser.add_argument("--count", type=int, default=300, help="Repositories wanted per run")
+    parser.add_argument("--max-stars", type=int, default=2)
+    args = parser.parse_args()
+
+    stub = StubGitHub(total_repos=args.repos, per_token_limit=10**9)
+    base_url = stub.start()
+    try:
+        with tempfile.TemporaryDirectory() as tmp:
+            strategies = [
+                ("random 1-2 char queries", RandomQueryPlanner(args.max_stars)),
+                ("slice planner", QueryPlanner(max_stars=args.max_stars, state_file=os.path.join(tmp, "planner.json"), today=date(2026, 10, 1))),
+            ]
+            for label, planner in strategies:
+                found, requests, short_runs = simulate(base_url, stub, planner, args.runs, args.count, args.max_stars)
+                print(f"{label:<25} {found:>6} repos / {requests:>4} API calls = {found / max(requests, 1):6.1f} per call, "
+                      f"{short_runs} of {args.runs} runs short of --count")
+    finally:
+        stub.stop()
+
+
+if __name__ == "__main__":
+    main()
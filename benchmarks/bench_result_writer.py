@@ -0,0 +1,73 @@
+"""
+Benchmark of ResultWriter: time to write findings in per-repo batches with the
+streaming sinks vs. the previous JSON read-modify-write (whole file reloaded and
+rewritten for every batch).
+
+Usage: python -m benchmarks.bench_result_writer [--batches 200] [--batch-size 50]
+"""
+import argparse
+import json
+import os
+import tempfile
+import time
+
+from utils.result_writer import ResultWriter
+
+
+def legacy_save_json(results, filename):
+    """The JSON writer ResultWriter used before, kept here for comparison."""
+    current_data = []
+    if os.path.isfile(filename):
+        with open(filename, 'r', encoding='utf-8') as f:
+            current_data = json.load(f)
+    current_data.extend(results)
+    with open(filename, 'w', encoding='utf-8') as f:
+        json.dump(current_data, f, indent=4, ensure_ascii=False)
+
+
+def make_batch(batch, size):
+    return [{
+        "repo": f"https://github.com/bench/repo_{batch}",
+        "type": "AWS_ACCESS_KEY",
+        "value": f"AKIA{batch:08d}{i:08d}",
+        "commit": "current_head",
+        "location": f"file: cache/repo_{batch}/src/file_{i}.py",
+        "file_url": f"https://github.com/bench/repo_{batch}/blob/HEAD/src/file_{i}.py",
+    } for i in range(size)]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Result writer benchmark")
+    parser.add_argument("--batches", type=int, default=200, help="Repos with findings")
+    parser.add_argument("--batch-size", type=int, default=50, help="Findings per repo")
+    args = parser.parse_args()
+    batches = [make_batch(b, args.batch_size) for b in range(args.batches)]
+    total = args.batches * args.batch_size
+
+    with tempfile.TemporaryDirectory() as tmp:
+        start = time.perf_counter()
+        legacy_file = os.path.join(tmp, "legacy.json")
+        for batch in batches:
+            legacy_save_json(batch, legacy_file)
+        elapsed = time.perf_counter() - start
+        print(f"{'legacy json':<11} {total} findings in {elapsed:7.3f}s ({total / elapsed:10.0f} findings/s)")
+
+        for output_format in ("json", "jsonl", "csv", "sqlite"):
+            writer = ResultWriter(output_format)
+            filename = os.path.join(tmp, f"results.{writer.extension}")
+            start = time.perf_counter()
+            for batch in batches:
+                writer.save(batch, filename)
+            writer.close()
+            elapsed = time.perf_counter() - start
+            print(f"{output_format:<11} {total} findings in {elapsed:7.3f}s ({total / elapsed:10.0f} findings/s)")
+
+        with open(legacy_file, encoding='utf-8') as f:
+            legacy = json.load(f)
+        with open(os.path.join(tmp, "results.json"), encoding='utf-8') as f:
+            streamed = json.load(f)
+        print(f"JSON output identical: {legacy == streamed}")
+
+
+if __name__ == "__main__":
+    main()
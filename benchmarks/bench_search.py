@@ -0,0 +1,45 @@
+"""
+Benchmark of GitHubClient.search_repositories against the local stub search API:
+sequential vs. concurrent page fetches, with tight per-token rate limits so the
+retry/backoff and token rotation paths are exercised.
+
+Usage: python -m benchmarks.bench_search [--limit 300] [--tokens 2] [--latency 0.2]
+"""
+import argparse
+import time
+
+import scanner.github_client as github_client
+from scanner.github_client import GitHubClient
+from benchmarks.stub_github import StubGitHub
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Search client benchmark against a stub API")
+    parser.add_argument("--limit", type=int, default=300, help="Repositories to find")
+    parser.add_argument("--tokens", type=int, default=2)
+    parser.add_argument("--per-token-limit", type=int, default=10, help="Requests per token per window")
+    parser.add_argument("--window", type=float, default=3.0, help="Rate limit window in seconds")
+    parser.add_argument("--latency", type=float, default=0.2, help="Stub response latency in seconds")
+    args = parser.parse_args()
+
+    # Keep the rate-limit waits short enough for a benchmark
+    github_client.BACKOFF_BASE_SECONDS = 0.1
+
+    stub = StubGitHub(per_token_limit=args.per_token_limit, window_seconds=args.window, latency=args.latency)
+    base_url = stub.start()
+    tokens = [f"token-{i}" for i in range(args.tokens)]
+    try:
+        for workers in (1, 4):
+            stub.requests = stub.rate_limited = 0
+            client = GitHubClient(tokens, base_url=base_url, max_workers=workers, requests_per_minute=6000)
+            start = time.perf_counter()
+            repos = client.search_repositories(max_stars=10, limit=args.limit, exclude_ids=set())
+            elapsed = time.perf_counter() - start
+            print(f"workers={workers}: {len(repos)} repos in {elapsed:.2f}s, "
+                  f"{stub.requests} requests, {stub.rate_limited} rate-limited responses retried")
+    finally:
+        stub.stop()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,128 @@
+"""
+Benchmark of the shared work queue: local repositories are queued once and scanned by
+1, 2 and 4 worker processes (`ScannerEngine.run` with --queue), reporting wall time,
+repos/s, how many jobs were leased more than once and findings written more than once.
+As in real use, the workers share the scan history and the scan cache (each run gets
+its own, so runs don't skip each other's repos). A last run kills one of two workers
+mid-scan: its leased jobs expire and the surviving worker scans them.
+
+Usage: python -m benchmarks.bench_work_queue [--repos 24] [--workers 1,2,4]
+"""
+import argparse
+import csv
+import logging
+import multiprocessing
+import os
+import sqlite3
+import sys
+import tempfile
+import time
+
+import scanner.scan_cache
+import utils.history
+from main import build_parser
+from scanner.scanner_engine import ScannerEngine
+from scanner.work_queue import SqliteWorkQueue
+from utils.result_writer import ResultWriter
+from benchmarks.local_repos import create_repos
+
+
+def engine_args(queue_path, lease_seconds):
+    return build_parser().parse_args([
+        "--mode", "history", "--depth", "10", "--clone-workers", "2", "--scan-workers", "1", "--no-frontier", "--regex-engine", "re", "--file-budget", "0", "--repo-budget", "0", "--max-file-size", "0",
+        "--queue", queue_path, "--lease-seconds", str(lease_seconds),
+    ])
+
+
+def worker(workdir, queue_path, lease_seconds):
+    # Keep clones, results and the shared databases out of the real project directories
+    shared_dir = os.path.dirname(queue_path)
+    os.chdir(workdir)
+    utils.history.HISTORY_DB = os.path.join(shared_dir, "scan_history.sqlite")
+    utils.history.HISTORY_FILE = os.path.join(shared_dir, "scanned_repos.txt")
+    scanner.scan_cache.SCAN_CACHE_FILE = os.path.join(shared_dir, "scan_cache.sqlite")
+    logging.basicConfig(level=logging.ERROR)
+    sys.stdout = open(os.devnull, "w")  # Clone/scan progress lines
+    engine = ScannerEngine()
+    engine.result_writer = ResultWriter("csv")  # Read back by written_findings
+    engine.run(engine_args(queue_path, lease_seconds))
+
+
+def run_workers(context, workdir, queue_path, count, lease_seconds=300, kill_after=None, timeout=None):
+    """Runs count worker processes on the queue until they exit; workers still running after timeout seconds are killed."""
+    processes = [context.Process(target=worker, args=(os.path.join(workdir, f"w{i}"), queue_path, lease_seconds))
+                 for i in range(count)]
+    for i, process in enumerate(processes):
+        os.makedirs(os.path.join(workdir, f"w{i}"), exist_ok=True)
+        process.start()
+    if kill_after:
+        time.sleep(kill_after)
+        processes[0].kill()
+    deadline = time.monotonic() + timeout if timeout else None
+    for process in processes:
+        process.join(max(0.0, deadline - time.monotonic()) if deadline else None)
+        if process.is_alive():
+            process.kill()
+            process.join()
+
+
+def attempts(queue_path):
+    with sqlite3.connect(queue_path) as conn:
+        return dict(conn.execute("SELECT state, SUM(attempts) FROM jobs GROUP BY state").fetchall())
+
+
+def written_findings(workdir):
+    """(findings written by all workers of a run, how many of them repeat a finding already written)."""
+    fingerprints = []
+    for root, _, files in os.walk(workdir):
+        for name in files:
+            if name.startswith("scan_results_") and name.endswith(".csv"):
+                with open(os.path.join(root, name), 'r', encoding='utf-8', newline='') as f:
+                    fingerprints.extend(row["fingerprint"] for row in csv.DictReader(f))
+    return len(fingerprints), len(fingerprints) - len(set(fingerprints))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Work queue benchmark")
+    parser.add_argument("--repos", type=int, default=24, help="Queued repositories")
+    parser.add_argument("--files", type=int, default=40, help="Files per repository")
+    parser.add_argument("--workers", type=str, default="1,2,4", help="Worker process counts to compare")
+    args = parser.parse_args()
+
+    context = multiprocessing.get_context("spawn")
+    with tempfile.TemporaryDirectory() as tmp:
+        repos = create_repos(os.path.join(tmp, "sources"), args.repos, files=args.files, commits=10)
+
+        print(f"{'workers':>7} {'time':>8} {'repos/s':>8} {'done':>5} {'leased twice':>13} {'findings':>9} {'duplicated':>11}")
+        for count in (int(c) for c in args.workers.split(",")):
+            workdir = os.path.join(tmp, f"run{count}")
+            queue_path = os.path.join(workdir, "queue.sqlite")
+            os.makedirs(workdir)
+            queue = SqliteWorkQueue(queue_path)
+            queue.put(repos, key=lambda repo: repo["id"])
+            start = time.perf_counter()
+            run_workers(context, workdir, queue_path, count)
+            elapsed = time.perf_counter() - start
+            done = queue.counts()["done"]
+            findings, duplicated = written_findings(workdir)
+            print(f"{count:>7} {elapsed:7.2f}s {done / elapsed:8.1f} {done:>5} {attempts(queue_path).get('done', 0) - done:>13} "
+                  f"{findings:>9} {duplicated:>11}")
+            queue.close()
+
+        # Kill one of two workers; with 3 s leases its jobs are rescanned by the other worker
+        workdir = os.path.join(tmp, "killed")
+        queue_path = os.path.join(workdir, "queue.sqlite")
+        os.makedirs(workdir)
+        queue = SqliteWorkQueue(queue_path, lease_seconds=3)
+        queue.put(repos, key=lambda repo: repo["id"])
+        start = time.perf_counter()
+        run_workers(context, workdir, queue_path, 2, lease_seconds=3, kill_after=2)
+        counts = queue.counts()
+        retried = attempts(queue_path).get("done", 0) - counts["done"]
+        print(f"One of 2 workers killed after 2s: {counts['done']}/{args.repos} done, {retried} jobs leased again, "
+              f"{time.perf_counter() - start:.2f}s")
+        queue.close()
+
+
+if __name__ == "__main__":
+    main()
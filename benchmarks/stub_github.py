@@ -0,0 +1,177 @@
+"""
+A local stand-in for the GitHub search API, so the search client can be
+exercised offline: deterministic repositories, search qualifiers, the
+1000-result cap, per-token rate limits with X-RateLimit-* headers and
+optional latency.
+
+Usage:
+    stub = StubGitHub(total_repos=20000, per_token_limit=30, window_seconds=60)
+    base_url = stub.start()
+    client = GitHubClient(["token-a", "token-b"], base_url=base_url)
+    ...
+    stub.stop()
+"""
+import json
+import random
+import threading
+import time
+from datetime import date, timedelta
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse, parse_qs
+
+RESULT_CAP = 1000  # GitHub never returns more than 1000 results per query
+
+
+class StubGitHub:
+    def __init__(self, total_repos=20000, per_token_limit=30, window_seconds=60.0, latency=0.0, seed=0, repos=None):
+        """repos: Repo dicts to serve (with the fields the qualifiers filter on) instead of total_repos generated ones."""
+        self.per_token_limit = per_token_limit
+        self.window_seconds = window_seconds
+        self.latency = latency
+        self.repos = list(repos) if repos is not None else _generate_repos(total_repos, seed)
+        self.requests = 0
+        self.rate_limited = 0
+        self._limits = {}  # token -> [remaining, reset_at]
+        self._lock = threading.Lock()
+        self._server = None
+
+    def start(self):
+        """Starts serving on a free localhost port in a background thread and returns the base URL."""
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                stub._handle(self)
+
+            def log_message(self, *args):
+                pass
+
+        self._server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self._server.daemon_threads = True
+        threading.Thread(target=self._server.serve_forever, daemon=True).start()
+        return f"http://127.0.0.1:{self._server.server_address[1]}"
+
+    def stop(self):
+        if self._server:
+            self._server.shutdown()
+            self._server.server_close()
+
+    def _handle(self, handler):
+        url = urlparse(handler.path)
+        if url.path != "/search/repositories":
+            return self._send(handler, 404, {"message": "Not Found"}, {})
+
+        token = handler.headers.get("Authorization", "anonymous")
+        with self._lock:
+            self.requests += 1
+            now = time.time()
+            remaining, reset_at = self._limits.get(token, [self.per_token_limit, now + self.window_seconds])
+            if now >= reset_at:
+                remaining, reset_at = self.per_token_limit, now + self.window_seconds
+            limited = remaining <= 0
+            if limited:
+                self.rate_limited += 1
+            else:
+                remaining -= 1
+            self._limits[token] = [remaining, reset_at]
+
+        headers = {
+            "X-RateLimit-Limit": str(self.per_token_limit),
+            "X-RateLimit-Remaining": str(remaining),
+            "X-RateLimit-Reset": str(int(reset_at) + 1),
+        }
+        if limited:
+            return self._send(handler, 403, {"message": "API rate limit exceeded"}, headers)
+
+        if self.latency:
+            time.sleep(self.latency)
+
+        params = parse_qs(url.query)
+        matches = self.search(params.get("q", [""])[0], params.get("sort", [""])[0], params.get("order", ["desc"])[0])
+        per_page = min(int(params.get("per_page", ["30"])[0]), 100)
+        page = int(params.get("page", ["1"])[0])
+        start = (page - 1) * per_page
+        visible = matches[:RESULT_CAP]
+        body = {
+            "total_count": len(matches),
+            "incomplete_results": False,
+            "items": visible[start:start + per_page],
+        }
+        self._send(handler, 200, body, headers)
+
+    def search(self, query, sort="", order="desc"):
+        """Returns all repos matching a search query string (before the 1000-result cap)."""
+        terms = []
+        filters = []
+        for part in query.split():
+            qualifier, sep, value = part.partition(":")
+            if sep and qualifier in ("stars", "size", "created", "pushed"):
+                filters.append((qualifier, value))
+            else:
+                terms.append(part.lower())
+
+        matches = [
+            repo for repo in self.repos
+            if all(term in repo["name"] for term in terms)
+            and all(_qualifier_matches(repo, qualifier, value) for qualifier, value in filters)
+        ]
+        key = {"updated": "pushed_at", "stars": "stargazers_count", "forks": "forks_count"}.get(sort)
+        if key:
+            matches.sort(key=lambda r: (r[key], r["id"]), reverse=(order != "asc"))
+        return matches
+
+    @staticmethod
+    def _send(handler, status, body, headers):
+        data = json.dumps(body).encode("utf-8")
+        handler.send_response(status)
+        handler.send_header("Content-Type", "application/json")
+        handler.send_header("Content-Length", str(len(data)))
+        for name, value in headers.items():
+            handler.send_header(name, value)
+        handler.end_headers()
+        handler.wfile.write(data)
+
+
+def _generate_repos(count, seed):
+    rng = random.Random(seed)
+    letters = "abcdefghijklmnopqrstuvwxyz"
+    start = date(2015, 1, 1)
+    repos = []
+    for i in range(count):
+        name = "".join(rng.choice(letters) for _ in range(rng.randint(4, 12)))
+        created = start + timedelta(days=rng.randint(0, 3800))
+        pushed = min(created + timedelta(days=rng.randint(0, 1500)), date(2026, 10, 1))
+        repo_id = 1_000_000 + i
+        repos.append({
+            "id": repo_id,
+            "name": name,
+            "full_name": f"user{i}/{name}",
+            "clone_url": f"https://github.com/user{i}/{name}.git",
+            "html_url": f"https://github.com/user{i}/{name}",
+            # Mostly low-star repos, like the real long tail
+            "stargazers_count": min(int(rng.expovariate(0.3)), 5000),
+            "forks_count": min(int(rng.expovariate(0.5)), 1000),
+            "size": int(rng.expovariate(1 / 2000)),
+            "created_at": created.isoformat() + "T00:00:00Z",
+            "pushed_at": pushed.isoformat() + "T00:00:00Z",
+        })
+    return repos
+
+
+def _qualifier_matches(repo, qualifier, value):
+    field = {"stars": "stargazers_count", "size": "size", "created": "created_at", "pushed": "pushed_at"}[qualifier]
+    actual = repo[field]
+    if qualifier in ("created", "pushed"):
+        actual = actual[:10]
+        convert = str
+    else:
+        convert = int
+
+    if ".." in value:
+        low, high = value.split("..", 1)
+        return (low == "*" or actual >= convert(low)) and (high == "*" or actual <= convert(high))
+    for op in (">=", "<=", ">", "<"):
+        if value.startswith(op):
+            bound = convert(value[len(op):])
+            return {">=": actual >= bound, "<=": actual <= bound, ">": actual > bound, "<": actual < bound}[op]
+    return actual == convert(value)
@@ -0,0 +1,411 @@
+"""
+Reproducible benchmark suite over deterministic synthetic repositories
+(benchmarks/synthetic_repos.py), fully offline.
+
+Cases: PatternMatcher.scan_text per file, RepoProcessor.scan_current_files, scan_tree
+and scan_history per repository, and ScannerEngine.run end-to-end in current and
+history mode, searching a local stub of the search API (benchmarks/stub_github.py)
+and cloning the repositories over file://. Each case runs --rounds times in its own
+process and reports throughput, latency percentiles (per file, per repository, or per
+repository through the whole pipeline), peak RSS, recall of the planted secrets the
+case should find and false positives (findings that aren't planted or that the
+default exclusions should have skipped).
+
+A report saved with --save-baseline can be compared against with --baseline: a drop
+in throughput or a rise in p95 latency or peak RSS beyond --tolerance, or any drop in
+recall or rise in false positives, is flagged as a regression (exit status 1).
+Baselines are only comparable for the same --scale, --repos, --seed and machine.
+
+Usage:
+    python -m benchmarks.suite [--scale small|medium|large] [--repos 3] [--rounds 3] [--cases scan_text,engine_current]
+    python -m benchmarks.suite --save-baseline baseline_small.json
+    python -m benchmarks.suite --baseline baseline_small.json [--output report.json]
+"""
+import argparse
+import contextlib
+import json
+import logging
+import multiprocessing
+import os
+import platform
+import shutil
+import sys
+import tempfile
+import threading
+import time
+
+import config
+import scanner.github_client
+import utils.history
+import utils.run_manifest
+from main import build_parser
+from scanner.exclusions import ExclusionRules, is_binary
+from scanner.github_client import GitHubClient
+from scanner.metrics import RunMetrics, peak_rss_bytes
+from scanner.pattern_matcher import PatternMatcher
+from scanner.repo_processor import RepoProcessor
+from scanner.scanner_engine import ScannerEngine
+from benchmarks.stub_github import StubGitHub
+from benchmarks.synthetic_repos import SCALES, create_synthetic_repos
+
+CASES = ("scan_text", "scan_current_files", "scan_tree", "scan_history", "engine_current", "engine_history")
+PERCENTILES = (50, 95, 99)
+TOLERANCE = 0.15
+
+# Metric -> (higher is better, compared relative to the baseline); absolute ones regress on any change for the worse
+COMPARED_METRICS = {
+    "throughput_mb_s": (True, True),
+    "items_per_s": (True, True),
+    "latency_p95_ms": (False, True),
+    "peak_rss_mb": (False, True),
+    "recall": (True, False),
+    "false_positives": (False, False),
+}
+
+
+def engine_args(mode, repos, depth):
+    return build_parser().parse_args([
+        "--mode", mode, "--depth", str(depth), "--count", str(len(repos)), "--clone-workers", "2", "--no-scan-cache",
+        "--no-frontier", "--regex-engine", "re", "--file-budget", "0", "--repo-budget", "0", "--max-file-size", "0",
+    ])
+
+
+def expected_secrets(repos, history):
+    """(repo name, type, value, path) of the planted secrets a scan should find: at HEAD, or anywhere in the history."""
+    return {
+        (repo["name"], *secret.key)
+        for repo in repos for secret in repo["planted"]
+        if secret.scannable and (history or (secret.path is not None and secret.removed is None))
+    }
+
+
+def _finding_keys(repo, findings):
+    return {(repo["name"], f.type, f.value, f.path) for f in findings}
+
+
+def _exclusion_rules():
+    # As a default run, but without the size limit: large files are part of what's measured
+    return ExclusionRules(config.EXCLUDE_PATTERNS)
+
+
+def run_scan_text(repos, rounds, workdir):
+    """Every file a default current-files scan reads, scanned one scan_text call at a time."""
+    matcher = PatternMatcher(config.PATTERNS)
+    rules = _exclusion_rules()
+    texts = []
+    for repo in repos:
+        for root, dirs, files in os.walk(repo["path"]):
+            rel_root = os.path.relpath(root, repo["path"]).replace(os.sep, "/")
+            rel_root = "" if rel_root == "." else rel_root + "/"
+            dirs[:] = [d for d in dirs if d != ".git" and not rules.excludes_dir(rel_root + d)]
+            for name in files:
+                if rules.check_file(rel_root + name, walked=True):
+                    continue
+                with open(os.path.join(root, name), 'rb') as f:
+                    data = f.read()
+                if not is_binary(data):
+                    texts.append((repo, rel_root + name, data))
+
+    samples = []
+    found = set()
+    for _ in range(rounds):
+        for repo, path, data in texts:
+            started = time.perf_counter()
+            matches = matcher.scan_text(data)
+            samples.append(time.perf_counter() - started)
+            found.update((repo["name"], m["type"], m["value"], path) for m in matches)
+    return {
+        "samples": samples, "bytes": rounds * sum(len(data) for _, _, data in texts),
+        "items": rounds * len(texts), "item": "files", "found": found, "expected": expected_secrets(repos, False),
+    }
+
+
+def _run_repo_scans(repos, rounds, workdir, scan):
+    matcher = PatternMatcher(config.PATTERNS)
+    processor = RepoProcessor(temp_dir=os.path.join(workdir, "clones"), exclusions=_exclusion_rules())
+    # Only for the bytes_read counter
+    processor.metrics = RunMetrics()
+    samples = []
+    found = set()
+    try:
+        for _ in range(rounds):
+            for repo in repos:
+                started = time.perf_counter()
+                findings = scan(processor, repo["path"], matcher.scan_text)
+                samples.append(time.perf_counter() - started)
+                found |= _finding_keys(repo, findings)
+    finally:
+        processor.close()
+    return {"samples": samples, "bytes": processor.metrics.counters.get("bytes_read", 0), "found": found}
+
+
+def run_scan_current_files(repos, rounds, workdir):
+    result = _run_repo_scans(repos, rounds, workdir, lambda processor, path, scanner_func: processor.scan_current_files(path, scanner_func))
+    result.update(items=rounds * len(repos), item="repos", expected=expected_secrets(repos, False))
+    return result
+
+
+def run_scan_tree(repos, rounds, workdir):
+    result = _run_repo_scans(repos, rounds, workdir, lambda processor, path, scanner_func: processor.scan_tree(path, scanner_func))
+    result.update(items=rounds * len(repos), item="repos", expected=expected_secrets(repos, False))
+    return result
+
+
+def run_scan_history(repos, rounds, workdir):
+    depth = repos[0]["commits"]
+    result = _run_repo_scans(repos, rounds, workdir, lambda processor, path, scanner_func: processor.scan_history(path, depth=depth, scanner_func=scanner_func))
+    result.update(items=rounds * len(repos) * depth, item="commits", expected=expected_secrets(repos, True))
+    return result
+
+
+class PagingPlanner:
+    """Pages through one query that all synthetic repos match, in place of the QueryPlanner's slices."""
+    def __init__(self, max_stars):
+        self.query = f"stars:<={max_stars} pushed:>{config.MIN_PUSHED_DATE}"
+        self.pages = 0
+        self._lock = threading.Lock()
+
+    def next_request(self):
+        with self._lock:
+            self.pages += 1
+            return None, {"q": self.query, "sort": "updated", "order": "desc", "per_page": 100, "page": self.pages}
+
+    def record(self, search_slice, total_count, new_repos):
+        pass
+
+    def summary(self):
+        return f"{self.pages} pages"
+
+
+class SuiteEngine(ScannerEngine):
+    """ScannerEngine searching the stub, recording each repository's time through the pipeline and its findings."""
+    def __init__(self, base_url):
+        super().__init__()
+        self._client = GitHubClient(["bench-token"], base_url=base_url, requests_per_minute=60000)
+        self.latencies = []
+        self.found = set()
+        self._bench_lock = threading.Lock()
+
+    def _get_repositories(self, args):
+        planner = PagingPlanner(args.max_stars)
+        return self.client.search_repositories(max_stars=args.max_stars, limit=args.count, exclude_ids=set(), planner=planner)
+
+    def _clone_stage(self, job, total, strategy, args):
+        job["bench_started"] = time.perf_counter()
+        return super()._clone_stage(job, total, strategy, args)
+
+    def _write_stage(self, job, results_file, args):
+        job = super()._write_stage(job, results_file, args)
+        with self._bench_lock:
+            self.latencies.append(time.perf_counter() - job["bench_started"])
+            self.found |= {(job["repo"]["name"], f.type, f.value, f.path) for f in job["findings"]}
+        return job
+
+
+def _run_engine(repos, rounds, workdir, mode, search_latency):
+    # Keep clones, results, scan history, run manifests and search results out of the real project directories
+    os.chdir(workdir)
+    utils.history.HISTORY_DB = os.path.join(workdir, "scan_history.sqlite")
+    utils.history.HISTORY_FILE = os.path.join(workdir, "scanned_repos.txt")
+    utils.run_manifest.RUNS_DIR = os.path.join(workdir, "runs")
+    scanner.github_client.FOUND_REPOS_DIR = os.path.join(workdir, "found_repos")
+
+    served = [{key: value for key, value in repo.items() if key not in ("path", "planted", "commits")} for repo in repos]
+    stub = StubGitHub(repos=served, per_token_limit=10**6, latency=search_latency)
+    base_url = stub.start()
+    samples = []
+    found = set()
+    wall = 0.0
+    try:
+        for _ in range(rounds):
+            # Every round starts without scan history, so no repository is skipped as scanned before
+            if os.path.exists(utils.history.HISTORY_DB):
+                os.remove(utils.history.HISTORY_DB)
+            engine = SuiteEngine(base_url)
+            started = time.perf_counter()
+            engine.run(engine_args(mode, repos, repos[0]["commits"]))
+            wall += time.perf_counter() - started
+            samples.extend(engine.latencies)
+            found |= engine.found
+    finally:
+        stub.stop()
+    return {
+        "samples": samples, "bytes": None, "items": rounds * len(repos), "item": "repos", "wall_seconds": wall,
+        "found": found, "expected": expected_secrets(repos, mode == "history"),
+    }
+
+
+def run_engine_current(repos, rounds, workdir, search_latency=0.0):
+    return _run_engine(repos, rounds, workdir, "current", search_latency)
+
+
+def run_engine_history(repos, rounds, workdir, search_latency=0.0):
+    return _run_engine(repos, rounds, workdir, "history", search_latency)
+
+
+def run_case(name, repos, rounds, workdir, search_latency):
+    """Runs one case (in a process of its own, for its peak RSS) and summarizes it."""
+    logging.basicConfig(level=logging.CRITICAL)
+    os.makedirs(workdir, exist_ok=True)
+    runner = globals()[f"run_{name}"]
+    kwargs = {"search_latency": search_latency} if name.startswith("engine_") else {}
+    with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):  # Clone/scan/search progress lines
+        result = runner(repos, rounds, workdir, **kwargs)
+
+    samples = result["samples"]
+    seconds = result.get("wall_seconds", sum(samples))
+    expected = result["expected"]
+    found = result["found"]
+    summary = {
+        "seconds": seconds,
+        "item": result["item"],
+        "items_per_s": result["items"] / seconds if seconds else 0.0,
+        "throughput_mb_s": result["bytes"] / seconds / 1024**2 if result["bytes"] and seconds else None,
+    }
+    for p in PERCENTILES:
+        summary[f"latency_p{p}_ms"] = percentile(samples, p) * 1000
+    rss = case_peak_rss_bytes()
+    summary["peak_rss_mb"] = rss / 1024**2 if rss is not None else None
+    summary["recall"] = len(found & expected) / len(expected) if expected else 1.0
+    summary["expected"] = len(expected)
+    summary["missed"] = len(expected - found)
+    summary["false_positives"] = len(found - expected)
+    return summary
+
+
+def case_peak_rss_bytes():
+    """
+    Peak RSS of this process. On Linux, VmHWM: ru_maxrss keeps the parent's RSS at the
+    time of the fork across the exec, which would make the case depend on the suite's own size.
+    """
+    try:
+        with open("/proc/self/status", 'r') as f:
+            for line in f:
+                if line.startswith("VmHWM:"):
+                    return int(line.split()[1]) * 1024
+    except OSError:
+        pass
+    return peak_rss_bytes()
+
+
+def percentile(samples, p):
+    """Nearest-rank percentile."""
+    if not samples:
+        return 0.0
+    ordered = sorted(samples)
+    rank = max(1, -(-len(ordered) * p // 100))
+    return ordered[int(rank) - 1]
+
+
+def compare(report, baseline, tolerance=TOLERANCE):
+    """Returns [(case, metric, baseline value, value, regressed)] for the metrics both reports have."""
+    rows = []
+    for case, metrics in report["cases"].items():
+        base_metrics = baseline.get("cases", {}).get(case)
+        if not base_metrics:
+            continue
+        for metric, (higher_better, relative) in COMPARED_METRICS.items():
+            value, base = metrics.get(metric), base_metrics.get(metric)
+            if value is None or base is None:
+                continue
+            worse = base - value if higher_better else value - base
+            if relative:
+                regressed = base > 0 and worse / base > tolerance
+            else:
+                regressed = worse > 1e-9
+            rows.append((case, metric, base, value, regressed))
+    return rows
+
+
+def _format(value):
+    if value is None:
+        return "-"
+    return f"{value:.3f}" if isinstance(value, float) else str(value)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Reproducible benchmark suite over synthetic repositories")
+    parser.add_argument("--scale", choices=sorted(SCALES), default="small")
+    parser.add_argument("--repos", type=int, default=3)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--rounds", type=int, default=3)
+    parser.add_argument("--cases", default=",".join(CASES), help=f"Comma-separated subset of {', '.join(CASES)}")
+    parser.add_argument("--search-latency", type=float, default=0.0, help="Seconds the stub search API waits per request")
+    parser.add_argument("--workdir", help="Keep the generated repositories here and reuse them (default: a temporary directory)")
+    parser.add_argument("--output", help="Write the report as JSON")
+    parser.add_argument("--save-baseline", metavar="PATH", help="Write the report as the baseline to compare later runs against")
+    parser.add_argument("--baseline", metavar="PATH", help="Compare against this baseline; exit status 1 on a regression")
+    parser.add_argument("--tolerance", type=float, default=TOLERANCE, help="Relative change of throughput, p95 latency and peak RSS tolerated")
+    args = parser.parse_args()
+
+    cases = [c.strip() for c in args.cases.split(",") if c.strip()]
+    unknown = set(cases) - set(CASES)
+    if unknown:
+        parser.error(f"Unknown cases: {', '.join(sorted(unknown))}")
+
+    baseline = None
+    if args.baseline:
+        with open(args.baseline, 'r', encoding='utf-8') as f:
+            baseline = json.load(f)
+
+    temp_dir = None
+    workdir = args.workdir
+    if not workdir:
+        workdir = temp_dir = tempfile.mkdtemp(prefix="reposcanner_suite_")
+    try:
+        params = SCALES[args.scale]
+        started = time.perf_counter()
+        repos = create_synthetic_repos(os.path.join(os.path.abspath(workdir), "repos", f"{args.scale}_{args.seed}"), args.repos, seed=args.seed, **params)
+        for repo in repos:
+            repo["commits"] = params["commits"]
+        planted = sum(len(repo["planted"]) for repo in repos)
+        print(f"{args.repos} {args.scale} repositories ({params['files']} files, {params['commits']} commits, "
+              f"{planted} planted secrets in all) ready in {time.perf_counter() - started:.1f}s")
+
+        report = {
+            "config": {"scale": args.scale, "repos": args.repos, "seed": args.seed, "rounds": args.rounds,
+                       "python": platform.python_version(), "platform": platform.platform(), "cpus": os.cpu_count()},
+            "cases": {},
+        }
+        # A fresh interpreter per case: peak RSS is the case's own
+        context = multiprocessing.get_context("spawn")
+        for case in cases:
+            case_dir = os.path.join(os.path.abspath(workdir), "runs", case)
+            shutil.rmtree(case_dir, ignore_errors=True)
+            with context.Pool(1) as pool:
+                summary = pool.apply(run_case, (case, repos, args.rounds, case_dir, args.search_latency))
+            shutil.rmtree(case_dir, ignore_errors=True)
+            report["cases"][case] = summary
+            mb_s = f"{summary['throughput_mb_s']:.1f} MB/s, " if summary["throughput_mb_s"] is not None else ""
+            rss = f"{summary['peak_rss_mb']:.0f} MB" if summary["peak_rss_mb"] is not None else "n/a"
+            print(f"{case}: {mb_s}{summary['items_per_s']:.1f} {summary['item']}/s, "
+                  f"p50/p95/p99 {summary['latency_p50_ms']:.1f}/{summary['latency_p95_ms']:.1f}/{summary['latency_p99_ms']:.1f} ms, "
+                  f"peak RSS {rss}, recall {summary['recall']:.3f} ({summary['missed']} of {summary['expected']} missed), "
+                  f"{summary['false_positives']} false positives")
+    finally:
+        if temp_dir:
+            shutil.rmtree(temp_dir, ignore_errors=True)
+
+    for path in (args.output, args.save_baseline):
+        if path:
+            with open(path, 'w', encoding='utf-8') as f:
+                json.dump(report, f, indent=4)
+            print(f"Report written to: {path}")
+
+    if baseline is None:
+        return 0
+    differing = [key for key in ("scale", "repos", "seed") if baseline.get("config", {}).get(key) != report["config"][key]]
+    if differing:
+        print(f"Warning: the baseline was run with another {', '.join(differing)}; the comparison is not meaningful.")
+    rows = compare(report, baseline, args.tolerance)
+    regressions = [row for row in rows if row[4]]
+    print(f"\nAgainst baseline {args.baseline} (tolerance {args.tolerance:.0%}):")
+    for case, metric, base, value, regressed in rows:
+        change = f"{(value / base - 1) * 100:+.1f}%" if base else ""
+        print(f"  {case:<20} {metric:<16} {_format(base):>10} -> {_format(value):>10} {change:>8}{'  REGRESSION' if regressed else ''}")
+    print(f"{len(regressions)} regressions." if regressions else "No regressions.")
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,403 @@
+"""
+Deterministic synthetic git repositories for the benchmark suite. The same scale and
+seed always give byte-identical repositories (same commit SHAs): file contents come
+from seeded generators and commit dates are fixed.
+
+A repository has source files (sizes spread around file_size) changed over `commits`
+commits, vendored and generated files (node_modules/, vendor/, *.min.js, a lockfile),
+binary files (images, and .bin files only binary sniffing catches), a few large files
+(scanned in streamed windows) and planted secrets: values sampled from each
+config.PATTERNS regex, in source files, in files the default exclusions skip and in
+commit messages. Some secrets are removed again by later commits, so only history
+scans can find them. Every planted secret is recorded (PlantedSecret) to measure recall.
+
+Usage:
+    repos = create_synthetic_repos(base_dir, count=3, **SCALES["small"])
+    for repo in repos: repo["planted"]  # [PlantedSecret, ...]
+"""
+import json
+import os
+import random
+import re
+import string
+import subprocess
+
+import config
+
+try:
+    from re import _parser as sre_parse
+    from re import _constants as sre_constants
+except ImportError:  # Python < 3.11
+    import sre_parse
+    import sre_constants
+
+# Parameters of create_synthetic_repo per scale
+SCALES = {
+    "small": dict(files=150, file_size=2048, commits=20, changes_per_commit=5, vendored_files=20, binary_files=10,
+                  large_files=0, secrets=60, message_secrets=3),
+    "medium": dict(files=1500, file_size=4096, commits=100, changes_per_commit=10, vendored_files=200, binary_files=50,
+                   large_files=1, secrets=400, message_secrets=10),
+    "large": dict(files=8000, file_size=8192, commits=300, changes_per_commit=20, vendored_files=1000, binary_files=200,
+                  large_files=3, secrets=1500, message_secrets=30),
+}
+
+# Large files are above the scanner's streaming threshold (repo_processor.STREAM_MIN_BYTES)
+LARGE_FILE_SIZE = 6 * 1024 * 1024
+BINARY_FILE_SIZE = 16 * 1024
+# Share of the secrets a later commit removes again
+REMOVED_RATE = 0.2
+# Share of the secrets planted in vendored and binary files (which the default exclusions skip)
+EXCLUDED_RATE = 0.1
+
+# Commit times: fixed, so commit SHAs don't depend on when the repository was generated
+BASE_TIMESTAMP = 1767225600  # 2026-01-01
+COMMIT_INTERVAL = 3600
+
+SAFE_CHARS = string.ascii_letters + string.digits
+SPEC_FILE = "bench_spec.json"
+
+
+class PlantedSecret:
+    """A secret the generator planted: where, since which commit and whether a default scan can see it."""
+    def __init__(self, type, value, path, commit, removed=None, scannable=True):
+        self.type = type
+        self.value = value
+        # Repo-relative path, or None for a commit message
+        self.path = path
+        # Index of the commit that added it and of the one that removed it (None: still at HEAD)
+        self.commit = commit
+        self.removed = removed
+        # False in vendored, generated and binary files, which the default exclusions skip
+        self.scannable = scannable
+
+    @property
+    def key(self):
+        return (self.type, self.value, self.path)
+
+    def to_dict(self):
+        return {name: getattr(self, name) for name in ("type", "value", "path", "commit", "removed", "scannable")}
+
+    @classmethod
+    def from_dict(cls, state):
+        return cls(**state)
+
+
+def sample_secret(regex, rng):
+    """A random string regex fully matches, e.g. a fake AWS key for the AWS_ACCESS_KEY pattern."""
+    parsed = sre_parse.parse(regex)
+    for _ in range(100):
+        value = _sample(parsed, rng)
+        if re.fullmatch(regex, value):
+            return value
+    raise ValueError(f"Can't sample a match of {regex!r}")
+
+
+def _sample(items, rng):
+    out = []
+    for op, av in items:
+        if op is sre_constants.LITERAL:
+            out.append(chr(av))
+        elif op is sre_constants.NOT_LITERAL:
+            out.append(rng.choice([c for c in SAFE_CHARS if ord(c) != av]))
+        elif op is sre_constants.ANY:
+            out.append(rng.choice(SAFE_CHARS))
+        elif op is sre_constants.IN:
+            out.append(rng.choice(_class_members(av)))
+        elif op is sre_constants.CATEGORY:
+            out.append(rng.choice(_category_members(av)))
+        elif op in (sre_constants.MAX_REPEAT, sre_constants.MIN_REPEAT):
+            low, high, sub = av
+            high = min(high, low + 12)
+            out.extend(_sample(sub, rng) for _ in range(rng.randint(low, high)))
+        elif op is sre_constants.SUBPATTERN:
+            out.append(_sample(av[3], rng))
+        elif op is sre_constants.BRANCH:
+            out.append(_sample(rng.choice(av[1]), rng))
+        # Anchors and other zero-width items add nothing
+    return "".join(out)
+
+
+def _class_members(items):
+    """The characters of a character class, limited to SAFE_CHARS plus its literals (e.g. "-", "'")."""
+    members = set()
+    negate = False
+    for op, av in items:
+        if op is sre_constants.NEGATE:
+            negate = True
+        elif op is sre_constants.LITERAL:
+            members.add(chr(av))
+        elif op is sre_constants.RANGE:
+            members.update(chr(c) for c in range(av[0], av[1] + 1) if chr(c) in SAFE_CHARS)
+        elif op is sre_constants.CATEGORY:
+            members.update(_category_members(av))
+    if negate:
+        members = set(SAFE_CHARS) - members
+    return sorted(members)
+
+
+def _category_members(category):
+    if category is sre_constants.CATEGORY_DIGIT:
+        return list(string.digits)
+    if category is sre_constants.CATEGORY_SPACE:
+        return [" "]
+    return list(SAFE_CHARS + "_")
+
+
+def _git(repo_path, *args, stdin=None):
+    subprocess.run(
+        ["git", "-c", "user.name=bench", "-c", "user.email=bench@example.com", *args],
+        cwd=repo_path, check=True, input=stdin, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+    )
+
+
+class _FastImport:
+    """Writes commits to a `git fast-import` stream."""
+    def __init__(self, repo_path):
+        self.process = subprocess.Popen(["git", "fast-import", "--quiet"], cwd=repo_path, stdin=subprocess.PIPE)
+        self.commits = 0
+
+    def commit(self, message, changes):
+        """changes: [(path, bytes)] to write, or (path, None) to delete."""
+        out = self.process.stdin
+        timestamp = BASE_TIMESTAMP + self.commits * COMMIT_INTERVAL
+        message = message.encode('utf-8')
+        out.write(b"commit refs/heads/main\n")
+        out.write(b"author Bench <bench@example.com> %d +0000\n" % timestamp)
+        out.write(b"committer Bench <bench@example.com> %d +0000\n" % timestamp)
+        out.write(b"data %d\n%s\n" % (len(message), message))
+        for path, data in changes:
+            if data is None:
+                out.write(b"D %s\n" % path.encode('utf-8'))
+            else:
+                out.write(b"M 100644 inline %s\ndata %d\n" % (path.encode('utf-8'), len(data)))
+                out.write(data)
+                out.write(b"\n")
+        out.write(b"\n")
+        self.commits += 1
+
+    def close(self):
+        self.process.stdin.close()
+        if self.process.wait() != 0:
+            raise RuntimeError("git fast-import failed")
+
+
+def _filler_lines(rng, size, path):
+    """Code-like lines without anything that looks like a secret, about size bytes in all."""
+    lines = []
+    total = 0
+    module = os.path.splitext(os.path.basename(path))[0]
+    while total < size:
+        kind = rng.randrange(6)
+        if kind == 0:
+            line = f"def handle_{module}_{rng.randrange(10**4)}(request, limit={rng.randrange(100)}):"
+        elif kind == 1:
+            line = f"    result = compute(item_{rng.randrange(10**3)}, {rng.randrange(10**6)})"
+        elif kind == 2:
+            line = f"    # Retry up to {rng.randrange(10)} times before giving up on {module}"
+        elif kind == 3:
+            line = f"    return {{'status': {rng.choice([200, 404, 500])}, 'count': {rng.randrange(10**4)}}}"
+        elif kind == 4:
+            line = f"LOG_LEVEL_{rng.randrange(100)} = \"{rng.choice(['debug', 'info', 'warning'])}\""
+        else:
+            line = ""
+        lines.append(line)
+        total += len(line) + 1
+    return lines
+
+
+def _render(seed, path, version, size, secret_lines):
+    """A source file's content at a version: filler from (seed, path, version), secrets at fixed lines."""
+    rng = random.Random(f"{seed}:{path}:{version}")
+    lines = _filler_lines(rng, size, path)
+    for position, line in secret_lines:
+        lines.insert(min(position, len(lines)), line)
+    return ("\n".join(lines) + "\n").encode('utf-8')
+
+
+def create_synthetic_repo(repo_path, files=150, file_size=2048, commits=20, changes_per_commit=5, vendored_files=20,
+                          binary_files=10, large_files=0, secrets=60, message_secrets=3, seed=0):
+    """
+    Creates the repository (a working tree checked out at HEAD) and returns its planted secrets.
+    An existing repository generated with the same arguments is reused as it is.
+    """
+    spec = dict(files=files, file_size=file_size, commits=commits, changes_per_commit=changes_per_commit,
+                vendored_files=vendored_files, binary_files=binary_files, large_files=large_files,
+                secrets=secrets, message_secrets=message_secrets, seed=seed)
+    spec_file = os.path.join(repo_path, ".git", SPEC_FILE)
+    if os.path.exists(spec_file):
+        with open(spec_file, 'r', encoding='utf-8') as f:
+            state = json.load(f)
+        if state["spec"] == spec:
+            return [PlantedSecret.from_dict(s) for s in state["planted"]]
+        raise FileExistsError(f"{repo_path} holds a synthetic repository generated with other parameters")
+
+    rng = random.Random(seed)
+    os.makedirs(repo_path, exist_ok=True)
+    _git(repo_path, "init", "-q", "-b", "main")
+
+    patterns = list(config.PATTERNS.items())
+    planted = []
+    planted_keys = set()
+
+    def new_secret(path, commit, index, scannable=True):
+        # Every pattern gets secrets, in turn; the same value is never planted twice in one file
+        name, regex = patterns[index % len(patterns)]
+        while True:
+            value = sample_secret(regex, rng)
+            if (name, value, path) not in planted_keys:
+                break
+        planted_keys.add((name, value, path))
+        secret = PlantedSecret(name, value, path, commit, scannable=scannable)
+        planted.append(secret)
+        return secret
+
+    sources = []
+    for i in range(files):
+        extension = rng.choice([".py", ".py", ".py", ".js", ".yml", ".cfg"])
+        sources.append({
+            "path": f"src/pkg{i % 20}/module_{i}{extension}",
+            "size": max(100, min(int(rng.lognormvariate(0, 0.6) * file_size), 20 * file_size)),
+            "version": 0,
+            # [(line position, line, PlantedSecret)]
+            "secrets": [],
+        })
+
+    # Secrets spread over all commits; the root commit gets the share of its files
+    secret_index = 0
+    excluded_count = int(secrets * EXCLUDED_RATE)
+    source_secrets = secrets - excluded_count
+    per_commit = [0] * commits
+    for _ in range(source_secrets):
+        per_commit[rng.randrange(commits)] += 1
+    message_commits = set(rng.sample(range(commits), min(message_secrets, commits)))
+
+    def plant_in_source(source, commit):
+        nonlocal secret_index
+        secret = new_secret(source["path"], commit, secret_index)
+        secret_index += 1
+        line = f"{rng.choice(['API_SETTING', 'connection', 'token', 'credentials'])}_{rng.randrange(1000)} = {secret.value}"
+        source["secrets"].append((rng.randrange(max(1, source["size"] // 40)), line, secret))
+
+    def render(source):
+        return _render(seed, source["path"], source["version"], source["size"],
+                       [(position, line) for position, line, _ in source["secrets"]])
+
+    importer = _FastImport(repo_path)
+    try:
+        # Root commit: every file
+        for _ in range(per_commit[0]):
+            plant_in_source(rng.choice(sources), 0)
+        changes = [(source["path"], render(source)) for source in sources]
+        changes.extend(_vendored_files(rng, vendored_files, excluded_count, new_secret))
+        changes.extend(_binary_files(rng, binary_files, new_secret))
+        changes.extend(_large_files(rng, large_files, seed, new_secret, secret_index))
+        secret_index += 2 * large_files
+        message = "Initial commit"
+        if 0 in message_commits:
+            message += f"\n\nTemporary key: {new_secret(None, 0, rng.randrange(len(patterns))).value}"
+        importer.commit(message, changes)
+
+        for commit in range(1, commits):
+            changed = rng.sample(sources, min(changes_per_commit, len(sources)))
+            for _ in range(per_commit[commit]):
+                plant_in_source(rng.choice(changed), commit)
+            for source in changed:
+                # Sometimes drop a secret planted before: only the history still has it
+                old = [s for s in source["secrets"] if s[2].commit < commit]
+                if old and rng.random() < REMOVED_RATE * 2:
+                    removed = rng.choice(old)
+                    removed[2].removed = commit
+                    source["secrets"].remove(removed)
+                source["version"] += 1
+            message = f"Update {len(changed)} modules ({commit})"
+            if commit in message_commits:
+                message += f"\n\nUse {new_secret(None, commit, rng.randrange(len(patterns))).value} for now"
+            importer.commit(message, [(source["path"], render(source)) for source in changed])
+    finally:
+        importer.close()
+    _git(repo_path, "reset", "-q", "--hard", "main")
+
+    with open(spec_file, 'w', encoding='utf-8') as f:
+        json.dump({"spec": spec, "planted": [s.to_dict() for s in planted]}, f)
+    return planted
+
+
+def _vendored_files(rng, count, secret_count, new_secret):
+    """Dependencies, minified bundles and a lockfile, which the default exclusions skip; some hold secrets."""
+    changes = []
+    paths = [f"node_modules/dep{i}/index.js" if i % 3 == 0 else f"vendor/lib{i}/lib.py" if i % 3 == 1 else f"static/bundle{i}.min.js"
+             for i in range(count)]
+    if count:
+        paths.append("package-lock.json")
+    secret_paths = [rng.choice(paths) for _ in range(secret_count)] if paths else []
+    for path in paths:
+        lines = _filler_lines(rng, rng.randrange(1024, 8192), path)
+        for index, secret_path in enumerate(secret_paths):
+            if secret_path == path:
+                secret = new_secret(path, 0, index, scannable=False)
+                lines.insert(rng.randrange(len(lines) + 1), f"var key{index} = {secret.value}")
+        changes.append((path, ("\n".join(lines) + "\n").encode('utf-8')))
+    return changes
+
+
+def _binary_files(rng, count, new_secret):
+    """Images (excluded by extension) and .bin files (caught by binary sniffing); every other one holds a secret."""
+    changes = []
+    for i in range(count):
+        path = f"assets/image{i}.png" if i % 2 == 0 else f"data/blob{i}.bin"
+        data = bytearray(rng.getrandbits(8) for _ in range(BINARY_FILE_SIZE))
+        data[8:16] = b"\x00" * 8
+        if i % 4 < 2:
+            secret = new_secret(path, 0, i, scannable=False)
+            offset = rng.randrange(64, BINARY_FILE_SIZE // 2)
+            data[offset:offset + len(secret.value)] = secret.value.encode('utf-8')
+        changes.append((path, bytes(data)))
+    return changes
+
+
+def _large_files(rng, count, seed, new_secret, secret_index):
+    """SQL-dump-like files over the streaming threshold, with a secret in the middle and one near the end."""
+    changes = []
+    for i in range(count):
+        path = f"data/dump{i}.sql"
+        file_rng = random.Random(f"{seed}:{path}")
+        rows = []
+        total = 0
+        while total < LARGE_FILE_SIZE:
+            row = f"INSERT INTO events VALUES ({len(rows)}, 'event_{file_rng.randrange(10**6)}', {file_rng.randrange(10**9)});"
+            rows.append(row)
+            total += len(row) + 1
+        for position in (len(rows) // 2, len(rows) - 3):
+            secret = new_secret(path, 0, secret_index)
+            secret_index += 1
+            rows.insert(position, f"-- connection: {secret.value}")
+        changes.append((path, ("\n".join(rows) + "\n").encode('utf-8')))
+    return changes
+
+
+def create_synthetic_repos(base_dir, count, seed=0, **params):
+    """
+    Creates count repositories under base_dir (seeds seed, seed+1, ...) and returns
+    search-API-shaped repo dicts for them (as the stub search API serves them), each
+    with its "planted" secrets and "path".
+    """
+    repos = []
+    for i in range(count):
+        name = f"synthetic_{i}"
+        path = os.path.join(base_dir, name)
+        planted = create_synthetic_repo(path, seed=seed + i, **params)
+        repos.append({
+            "id": 800000 + i,
+            "name": name,
+            "full_name": f"bench/{name}",
+            "clone_url": "file://" + os.path.abspath(path).replace("\\", "/"),
+            "html_url": f"https://example.invalid/bench/{name}",
+            "stargazers_count": 1,
+            "forks_count": 0,
+            "size": max(1, params.get("files", 150) * params.get("file_size", 2048) // 1024),
+            "created_at": "2025-06-01T00:00:00Z",
+            "pushed_at": "2026-06-01T00:00:00Z",
+            "path": path,
+            "planted": planted,
+        })
+    return repos
@@ -4,9 +4,24 @@ from dotenv import load_dotenv
 load_dotenv()
 
 GITHUB_TOKEN = os.getenv("GITHUB_TOKEN")
+# Optional comma-separated list of tokens; search requests rotate to the one with the most quota left
+GITHUB_TOKENS = [t.strip() for t in os.getenv("GITHUB_TOKENS", "").split(",") if t.strip()] or ([GITHUB_TOKEN] if GITHUB_TOKEN else [])
+GITHUB_API_URL = os.getenv("GITHUB_API_URL", "https://api.github.com")
 MIN_PUSHED_DATE = os.getenv("MIN_PUSHED_DATE", "2024-01-01")
 OUTPUT_FORMAT = os.getenv("OUTPUT_FORMAT", "csv").lower()
 SEARCH_QUERY_LIMIT = 1000  # Safety limit
+SEARCH_WORKERS = 4  # Search pages fetched concurrently
+SEARCH_REQUESTS_PER_MINUTE = 30  # Per token; GitHub allows 30 search requests/min when authenticated
+FRONTIER_MIN_CANDIDATES = 50  # Refill the candidate frontier in the background when it holds fewer repos than this
+FRONTIER_REFILL_COUNT = 200  # Repos searched for per background refill
+REGEX_ENGINE = os.getenv("REGEX_ENGINE", "re").lower()  # "re2" for linear-time matching (pip install google-re2)
+ENTROPY_DETECTOR = os.getenv("ENTROPY_DETECTOR", "false").lower() in ("1", "true", "yes")  # Also report high-entropy tokens (numpy recommended)
+SCAN_FILE_TIME_BUDGET = float(os.getenv("SCAN_FILE_TIME_BUDGET", "10"))  # Seconds per file, commit diff or message (0 = no limit)
+SCAN_REPO_TIME_BUDGET = float(os.getenv("SCAN_REPO_TIME_BUDGET", "0"))  # Seconds of scanning per repository (0 = no limit)
+SCAN_MAX_FILE_SIZE = int(os.getenv("SCAN_MAX_FILE_SIZE", str(2 * 1024 * 1024)))  # Bytes; larger files and diffs are skipped (0 = no limit)
+SCAN_CACHE_MAX_ENTRIES = int(os.getenv("SCAN_CACHE_MAX_ENTRIES", "1000000"))  # Cached file/diff scan results kept on disk
+MIRROR_CACHE_MAX_BYTES = int(os.getenv("MIRROR_CACHE_MAX_BYTES", str(10 * 1024**3)))  # Disk budget of --mirror-cache; least recently used mirrors are evicted (0 = no limit)
+WORK_QUEUE_LEASE_SECONDS = int(os.getenv("WORK_QUEUE_LEASE_SECONDS", "300"))  # Seconds a --queue worker may hold a job without a heartbeat before it is requeued
 
 # Regex Patterns for Secrets
 PATTERNS = {
@@ -28,6 +43,24 @@ PATTERNS = {
     "MONGO_URI": r"mongodb(\+srv)?:\/\/[a-zA-Z0-9_\-]+:[a-zA-Z0-9_\-]+@",
 }
 
+# Paths not worth scanning for secrets (gitignore-style; `dir/` matches directories only, `!pattern` re-includes)
+EXCLUDE_PATTERNS = [
+    # Dependencies and build output
+    "node_modules/", "bower_components/", "vendor/", "third_party/", ".venv/", "venv/", "__pycache__/", ".tox/",
+    # Generated and minified files
+    "*.min.js", "*.min.css", "*.map",
+    # Lockfiles
+    "package-lock.json", "yarn.lock", "pnpm-lock.yaml", "poetry.lock", "Pipfile.lock", "composer.lock",
+    "Cargo.lock", "go.sum", "Gemfile.lock",
+    # Images, fonts and media
+    "*.png", "*.jpg", "*.jpeg", "*.gif", "*.bmp", "*.ico", "*.webp", "*.svg", "*.psd",
+    "*.woff", "*.woff2", "*.ttf", "*.otf", "*.eot",
+    "*.mp3", "*.mp4", "*.wav", "*.ogg", "*.avi", "*.mov", "*.webm", "*.pdf",
+    # Archives and binaries
+    "*.zip", "*.tar", "*.gz", "*.tgz", "*.bz2", "*.xz", "*.7z", "*.rar", "*.jar",
+    "*.exe", "*.dll", "*.so", "*.dylib", "*.class", "*.pyc", "*.o", "*.a", "*.wasm",
+]
+
 SUSPICIOUS_REPO_NAME_PATTERN = r'^[0-9a-fA-F]{30,}$'
 
 # Search Configuration
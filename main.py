@@ -1,11 +1,10 @@
 import logging
 import argparse
+from config import REGEX_ENGINE, ENTROPY_DETECTOR, SCAN_FILE_TIME_BUDGET, SCAN_REPO_TIME_BUDGET, SCAN_MAX_FILE_SIZE, MIRROR_CACHE_MAX_BYTES, WORK_QUEUE_LEASE_SECONDS
 from utils.logger import setup_logger
-from scanner.scanner_engine import ScannerEngine
 
-def main():
-    logger = setup_logger()
-    
+def build_parser():
+    """The command-line parser; benchmarks build their engine args with it too, so they get every argument and default."""
     parser = argparse.ArgumentParser(description="GitHub Secret Scanner")
     parser.add_argument("--mode", choices=["current", "history"], default="current", help="Scan mode")
     parser.add_argument("--depth", type=int, default=10, help="Commit depth for history scan")
@@ -14,11 +13,50 @@ def main():
     parser.add_argument("--repo-age", type=int, default=0, help="Repo age in months (0=any)")
     parser.add_argument("--file-age", type=int, default=0, help="File age in months (0=any)")
     parser.add_argument("--repo", type=str, help="Specific repository URL to scan (bypasses random search)")
-    
-    args = parser.parse_args()
-    
+    parser.add_argument("--checkout", action="store_true", help="Check out a working tree and scan files on disk instead of reading them from the git object database")
+    parser.add_argument("--blob-limit", type=str, help="Partial clone: leave blobs larger than this (e.g. 1m) on the server in current mode")
+    parser.add_argument("--clone-workers", type=int, default=4, help="Parallel clone workers")
+    parser.add_argument("--scan-workers", type=int, default=2, help="Parallel scan workers")
+    parser.add_argument("--scan-processes", type=int, default=1, help="Processes for scanning files of large repos in current mode (0=one per core)")
+    parser.add_argument("--no-scan-cache", action="store_true", help="Don't reuse scan results of previously seen file contents and diffs")
+    parser.add_argument("--regex-engine", choices=["re", "re2"], default=REGEX_ENGINE, help="Regex engine (re2 = linear-time, needs google-re2)")
+    parser.add_argument("--entropy", action="store_true", default=ENTROPY_DETECTOR, help="Also report high-entropy hex/base64 tokens without a known prefix (faster with numpy installed)")
+    parser.add_argument("--file-budget", type=float, default=SCAN_FILE_TIME_BUDGET, help="Seconds a single file, diff or commit message may take to scan; slower ones are reported as partial (0=no limit)")
+    parser.add_argument("--repo-budget", type=float, default=SCAN_REPO_TIME_BUDGET, help="Seconds of scanning per repository; remaining files/commits are skipped and reported (0=no limit)")
+    parser.add_argument("--exclude", action="append", default=[], metavar="PATTERN", help="Extra gitignore-style path pattern to skip (repeatable; !PATTERN re-includes a default exclusion)")
+    parser.add_argument("--max-file-size", type=int, default=SCAN_MAX_FILE_SIZE, metavar="BYTES", help="Skip files (and per-file diffs) larger than this (0=no limit)")
+    parser.add_argument("--scan-all", action="store_true", help="Disable the default exclusions, size limit and binary sniffing")
+    parser.add_argument("--incremental", action="store_true", help="Keep clones and rescan only the commits (or changed files) since each repo's last scan")
+    parser.add_argument("--mirror-cache", action="store_true", help="Keep bare mirrors of scanned repos and check out worktrees from them, so rescans only fetch new objects")
+    parser.add_argument("--mirror-cache-size", type=int, default=MIRROR_CACHE_MAX_BYTES, metavar="BYTES", help="Disk budget of the mirror cache; least recently used mirrors are evicted (0=no limit)")
+    parser.add_argument("--no-frontier", action="store_true", help="Always search the API instead of taking candidates found by earlier searches")
+    parser.add_argument("--write-workers", type=int, default=1, help="Parallel result write/cleanup workers")
+    parser.add_argument("--metrics", action="store_true", help="Time each stage and step, count bytes cloned/read/scanned and per-pattern regex runs, and write a JSON report and a Prometheus text file next to the results")
+    parser.add_argument("--profile", action="store_true", help="Profile the scan stage with cProfile and save the stats next to the results")
+    parser.add_argument("--resume", type=str, metavar="RUN_ID", help="Continue an interrupted run: scan the repos it had left (and the rest of a checkpointed history scan), appending to its results file")
+    parser.add_argument("--queue", type=str, metavar="URL", help="Shared work queue (a SQLite path or sqlite:///path): scan the repos leased from it, sharing the work with other workers")
+    parser.add_argument("--enqueue", action="store_true", help="With --queue: add the searched (or --repo) repos to the queue and exit instead of scanning")
+    parser.add_argument("--lease-seconds", type=int, default=WORK_QUEUE_LEASE_SECONDS, help="Seconds a leased job stays ours without a heartbeat before other workers may claim it")
+    parser.add_argument("--daemon", action="store_true", help="Keep the engine warm and serve scan jobs over a local HTTP API instead of scanning once")
+    parser.add_argument("--listen", type=str, default="127.0.0.1:8765", metavar="HOST:PORT", help="Address of the daemon's job API")
+    parser.add_argument("--socket", type=str, metavar="PATH", help="Serve the daemon's job API on this Unix socket instead of --listen")
+    parser.add_argument("--max-jobs", type=int, default=2, help="Daemon jobs run at once")
+    parser.add_argument("--max-queued", type=int, default=100, help="Daemon jobs waiting to run; more are refused")
+    return parser
+
+def main():
+    logger = setup_logger()
+    args = build_parser().parse_args()
+
+    # Imported after parsing, so --help doesn't load git
+    from scanner.scanner_engine import ScannerEngine
     engine = ScannerEngine()
-    engine.run(args)
+    if args.daemon:
+        from scanner.daemon import ScanDaemon
+        host, _, port = args.listen.rpartition(":")
+        ScanDaemon(engine, args, max_jobs=args.max_jobs, max_queued=args.max_queued).serve(host=host or "127.0.0.1", port=int(port), socket_path=args.socket)
+    else:
+        engine.run(args)
 
 if __name__ == "__main__":
     main()
@@ -0,0 +1,50 @@
+from datetime import datetime, timedelta
+
+
+class CloneStrategy:
+    """
+    Options passed to `git clone` for one scan.
+    With checkout=False no working tree is written and the scan reads files
+    straight from the object database (RepoProcessor.scan_tree).
+    """
+    def __init__(self, depth=100, shallow_since=None, single_branch=False, checkout=True, blob_limit=None):
+        self.depth = depth
+        self.shallow_since = shallow_since
+        self.single_branch = single_branch
+        self.checkout = checkout
+        # e.g. "1m": blobs above this size are left on the server (partial clone)
+        self.blob_limit = blob_limit
+
+    @classmethod
+    def for_scan(cls, mode, depth=10, file_age_months=0, blob_limit=None, checkout=False):
+        """Picks the cheapest clone that still has everything the given scan mode reads."""
+        if mode == 'history':
+            # One commit past the scanned range, so the oldest scanned commit is diffed against
+            # its parent instead of looking like a root commit. No blob filter: every diffed
+            # blob would otherwise be fetched lazily, one request at a time.
+            return cls(depth=depth + 1 if isinstance(depth, int) else None, single_branch=True, checkout=checkout)
+
+        if file_age_months and file_age_months > 0:
+            # The file-age filter reads `git log --since`, so keep exactly the commits since the cutoff
+            since = (datetime.now() - timedelta(days=file_age_months*30)).strftime("%Y-%m-%d")
+            return cls(depth=None, shallow_since=since, single_branch=True, checkout=checkout, blob_limit=blob_limit)
+
+        return cls(depth=1, single_branch=True, checkout=checkout, blob_limit=blob_limit)
+
+    def clone_kwargs(self):
+        """Keyword arguments for git.Repo.clone_from (GitPython turns them into --options)."""
+        kwargs = {}
+        if self.depth:
+            kwargs['depth'] = self.depth
+        if self.shallow_since:
+            kwargs['shallow_since'] = self.shallow_since
+        if self.single_branch:
+            kwargs['single_branch'] = True
+        if not self.checkout:
+            kwargs['no_checkout'] = True
+        if self.blob_limit:
+            kwargs['filter'] = f"blob:limit={self.blob_limit}"
+        return kwargs
+
+    def __repr__(self):
+        return f"CloneStrategy({', '.join(f'{k}={v}' for k, v in self.clone_kwargs().items())})"
@@ -0,0 +1,388 @@
+import argparse
+import json
+import logging
+import os
+import queue
+import signal
+import socketserver
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from contextlib import contextmanager
+from datetime import datetime
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from utils.history import ScanHistory
+
+# Job options a request may override; everything else is fixed when the daemon starts
+JOB_OPTIONS = {
+    "mode": lambda v: v if v in ("current", "history") else _invalid("mode", v),
+    "depth": lambda v: _integer("depth", v),
+    "file_age": lambda v: _integer("file_age", v),
+    "checkout": lambda v: v if isinstance(v, bool) else _invalid("checkout", v),
+    "blob_limit": lambda v: str(v) if v else None,
+    "incremental": lambda v: v if isinstance(v, bool) else _invalid("incremental", v),
+}
+# Finished jobs (and their findings) kept for GET /jobs/<id>
+KEEP_FINISHED_JOBS = 1000
+
+STATUS_QUEUED = "queued"
+STATUS_RUNNING = "running"
+STATUS_DONE = "done"
+STATUS_FAILED = "failed"
+
+
+class QueueFull(Exception):
+    pass
+
+
+class ScanJob:
+    """
+    One submitted scan: repository URLs plus the args to scan them with. Findings are
+    added as each repository finishes, and stream() hands them to readers as they come.
+    """
+    def __init__(self, repos, args):
+        self.id = uuid.uuid4().hex[:12]
+        self.repos = repos
+        self.args = args
+        self.status = STATUS_QUEUED
+        self.error = None
+        self.failed_repos = []
+        self.submitted_at = time.time()
+        self.started_at = None
+        self.finished_at = None
+        self.findings = []
+        self._cond = threading.Condition()
+
+    @property
+    def finished(self):
+        return self.status in (STATUS_DONE, STATUS_FAILED)
+
+    def start(self):
+        with self._cond:
+            self.status = STATUS_RUNNING
+            self.started_at = time.time()
+
+    def add(self, findings):
+        with self._cond:
+            self.findings.extend(f.to_dict() for f in findings)
+            self._cond.notify_all()
+
+    def finish(self, error=None):
+        with self._cond:
+            self.status = STATUS_FAILED if error else STATUS_DONE
+            self.error = error
+            self.finished_at = time.time()
+            self._cond.notify_all()
+
+    def stream(self):
+        """Yields the job's findings (as dicts) until it finishes, waiting for new ones."""
+        sent = 0
+        while True:
+            with self._cond:
+                while sent == len(self.findings) and not self.finished:
+                    self._cond.wait()
+                batch = self.findings[sent:]
+                finished = self.finished
+            sent += len(batch)
+            yield from batch
+            if finished:
+                return
+
+    def to_dict(self):
+        def iso(t):
+            return datetime.fromtimestamp(t).isoformat(timespec='milliseconds') if t else None
+        return {
+            "id": self.id,
+            "status": self.status,
+            "repos": self.repos,
+            "options": {name: getattr(self.args, name) for name in JOB_OPTIONS},
+            "findings": len(self.findings),
+            "failed_repos": self.failed_repos,
+            "error": self.error,
+            "submitted_at": iso(self.submitted_at),
+            "started_at": iso(self.started_at),
+            "finished_at": iso(self.finished_at),
+        }
+
+
+class ScanDaemon:
+    """
+    Keeps one ScannerEngine warm (imports done, patterns compiled, history and caches
+    open) and runs scan jobs submitted over a local HTTP API, on a TCP port bound to
+    localhost or on a Unix socket:
+
+        POST /jobs               {"repo": URL} or {"repos": [URL, ...]}, plus JOB_OPTIONS
+        GET  /jobs               all known jobs
+        GET  /jobs/<id>          job status
+        GET  /jobs/<id>/results  findings as JSON lines, streamed as repositories finish,
+                                 then a last line with the job status
+        GET  /health
+
+    At most max_jobs jobs run at once and max_queued wait; more are refused with 503.
+    Findings also go to the daemon's results file, as in a normal run.
+    """
+    def __init__(self, engine, args, max_jobs=2, max_queued=100):
+        self.logger = logging.getLogger(__name__)
+        self.engine = engine
+        self.args = args
+        self.max_jobs = max_jobs
+        self._queue = queue.Queue(maxsize=max_queued)
+        self._jobs = OrderedDict()
+        self._jobs_lock = threading.Lock()
+        # A repository is scanned by one job at a time: its clone directory, kept clone
+        # and history record are per repository. Key -> [lock, jobs holding or waiting on it]
+        self._repo_locks = {}
+        self._workers = []
+        self.results_file = None
+        self.server = None
+
+    def start(self):
+        """Warms up the engine and starts the job workers."""
+        self.engine.configure(self.args)
+        self.engine.history = ScanHistory()
+        self.engine.open_caches(self.args)
+
+        timestamp = datetime.now().strftime("%Y-%m-%d_%H-%M-%S")
+        self.results_file = os.path.join("results", f"scan_results_{timestamp}.{self.engine.result_writer.extension}")
+        self.logger.info(f"Results will be saved to: {self.results_file}")
+
+        for i in range(self.max_jobs):
+            worker = threading.Thread(target=self._work, name=f"job-worker-{i}", daemon=True)
+            worker.start()
+            self._workers.append(worker)
+
+    def stop(self):
+        """Lets running jobs finish, fails queued ones and closes the engine's stores."""
+        while True:
+            try:
+                job = self._queue.get_nowait()
+            except queue.Empty:
+                break
+            if job is not None:
+                job.finish(error="Daemon stopped")
+        for _ in self._workers:
+            self._queue.put(None)
+        for worker in self._workers:
+            worker.join()
+        self._workers = []
+        self.engine.close_caches()
+        self.engine.result_writer.close()
+        self.engine.history.close()
+        self.engine.history = None
+
+    def submit(self, request):
+        """
+        Queues a job for a request dict (see the class docstring). Raises ValueError for
+        an invalid request and QueueFull when max_queued jobs are already waiting.
+        """
+        if not isinstance(request, dict):
+            raise ValueError("Request must be a JSON object")
+        repos = request.get("repos") or ([request["repo"]] if request.get("repo") else [])
+        if not repos or not all(isinstance(url, str) and url for url in repos):
+            raise ValueError("Give a repository URL as 'repo' or a list of them as 'repos'")
+        unknown = set(request) - set(JOB_OPTIONS) - {"repo", "repos"}
+        if unknown:
+            raise ValueError(f"Unknown options: {', '.join(sorted(unknown))}")
+        overrides = {}
+        for name, parse in JOB_OPTIONS.items():
+            if name in request:
+                try:
+                    overrides[name] = parse(request[name])
+                except (TypeError, ValueError):
+                    raise ValueError(f"Invalid {name}: {request[name]!r}")
+        job = ScanJob(repos, argparse.Namespace(**{**vars(self.args), **overrides}))
+
+        with self._jobs_lock:
+            self._jobs[job.id] = job
+            self._forget_finished()
+        try:
+            self._queue.put_nowait(job)
+        except queue.Full:
+            with self._jobs_lock:
+                del self._jobs[job.id]
+            raise QueueFull(f"{self._queue.maxsize} jobs are already queued")
+        self.logger.info(f"Queued job {job.id}: {', '.join(repos)}")
+        return job
+
+    def get(self, job_id):
+        with self._jobs_lock:
+            return self._jobs.get(job_id)
+
+    def jobs(self):
+        with self._jobs_lock:
+            return list(self._jobs.values())
+
+    def counts(self):
+        jobs = self.jobs()
+        return {status: sum(1 for j in jobs if j.status == status)
+                for status in (STATUS_QUEUED, STATUS_RUNNING, STATUS_DONE, STATUS_FAILED)}
+
+    def serve(self, host="127.0.0.1", port=8765, socket_path=None):
+        """Serves the job API until interrupted (Ctrl+C or SIGTERM), then stops the daemon."""
+        if socket_path:
+            if os.path.exists(socket_path):
+                os.remove(socket_path)
+            self.server = _UnixHTTPServer(socket_path, _JobRequestHandler)
+            os.chmod(socket_path, 0o600)
+            where = f"unix:{socket_path}"
+        else:
+            if host not in ("127.0.0.1", "localhost", "::1"):
+                self.logger.warning(f"Job API bound to {host}: it has no authentication.")
+            self.server = ThreadingHTTPServer((host, port), _JobRequestHandler)
+            where = f"http://{host}:{self.server.server_address[1]}"
+        self.server.daemon_threads = True
+        self.server.scan_daemon = self
+        if threading.current_thread() is threading.main_thread():
+            # shutdown() waits for serve_forever() to return, so it can't run in this thread's handler
+            signal.signal(signal.SIGTERM, lambda signum, frame: threading.Thread(target=self.server.shutdown).start())
+        self.start()
+        self.logger.info(f"Scanner daemon listening on {where} ({self.max_jobs} concurrent jobs).")
+        try:
+            self.server.serve_forever()
+        except KeyboardInterrupt:
+            self.logger.info("Stopping scanner daemon...")
+        finally:
+            self.server.server_close()
+            if socket_path and os.path.exists(socket_path):
+                os.remove(socket_path)
+            self.stop()
+
+    def _work(self):
+        while True:
+            job = self._queue.get()
+            if job is None:
+                return
+            self._run_job(job)
+
+    def _run_job(self, job):
+        job.start()
+        self.logger.info(f"Running job {job.id}")
+        errors = []
+        for url in job.repos:
+            # One failing repository doesn't cost the job the findings of the others
+            try:
+                repo = self.engine.manual_repo(url)
+                with self._repo_lock(repo):
+                    findings = self.engine.scan_repo(repo, job.args, self.results_file)
+            except Exception as e:
+                self.logger.error(f"Job {job.id}: scanning {url} failed: {e}")
+                errors.append(f"{url}: {e}")
+                findings = None
+            if findings is None:
+                job.failed_repos.append(url)
+            else:
+                job.add(findings)
+        error = None
+        if len(job.failed_repos) == len(job.repos):
+            error = "; ".join(errors) if errors else "No repository could be cloned"
+        job.finish(error=error)
+        self.logger.info(f"Finished job {job.id}: {len(job.findings)} findings in {job.finished_at - job.started_at:.2f}s")
+
+    @contextmanager
+    def _repo_lock(self, repo):
+        """Holds the repo's lock; the lock is dropped once no job holds or waits on it."""
+        # Keyed like the repo's clone directory and history record, so repos that merely share a name don't share a lock
+        key = self.engine._storage_name(self.engine._history_key(repo))
+        with self._jobs_lock:
+            entry = self._repo_locks.setdefault(key, [threading.Lock(), 0])
+            entry[1] += 1
+        try:
+            with entry[0]:
+                yield
+        finally:
+            with self._jobs_lock:
+                entry[1] -= 1
+                if not entry[1]:
+                    del self._repo_locks[key]
+
+    def _forget_finished(self):
+        finished = [job_id for job_id, job in self._jobs.items() if job.finished]
+        for job_id in finished[:max(0, len(finished) - KEEP_FINISHED_JOBS)]:
+            del self._jobs[job_id]
+
+
+class _UnixHTTPServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    pass
+
+
+class _JobRequestHandler(BaseHTTPRequestHandler):
+    # HTTP/1.1 for chunked result streams (and keep-alive between requests)
+    protocol_version = "HTTP/1.1"
+
+    @property
+    def daemon(self):
+        return self.server.scan_daemon
+
+    def do_GET(self):
+        parts = [p for p in self.path.split("?")[0].split("/") if p]
+        if parts == ["health"]:
+            return self._send_json(200, {"status": "ok", "jobs": self.daemon.counts()})
+        if parts == ["jobs"]:
+            return self._send_json(200, [job.to_dict() for job in self.daemon.jobs()])
+        if len(parts) in (2, 3) and parts[0] == "jobs":
+            job = self.daemon.get(parts[1])
+            if job is None:
+                return self._send_json(404, {"error": f"No job {parts[1]}"})
+            if len(parts) == 2:
+                return self._send_json(200, job.to_dict())
+            if parts[2] == "results":
+                return self._stream_results(job)
+        self._send_json(404, {"error": "Not found"})
+
+    def do_POST(self):
+        if [p for p in self.path.split("/") if p] != ["jobs"]:
+            return self._send_json(404, {"error": "Not found"})
+        try:
+            length = int(self.headers.get("Content-Length") or 0)
+            job = self.daemon.submit(json.loads(self.rfile.read(length) or b"{}"))
+        except (ValueError, json.JSONDecodeError) as e:
+            return self._send_json(400, {"error": str(e)})
+        except QueueFull as e:
+            return self._send_json(503, {"error": str(e)})
+        self._send_json(202, job.to_dict())
+
+    def _send_json(self, status, body):
+        data = json.dumps(body).encode('utf-8')
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def _stream_results(self, job):
+        self.send_response(200)
+        self.send_header("Content-Type", "application/x-ndjson")
+        self.send_header("Transfer-Encoding", "chunked")
+        self.end_headers()
+        try:
+            for finding in job.stream():
+                self._write_chunk(json.dumps(finding, ensure_ascii=False) + "\n")
+            self._write_chunk(json.dumps(job.to_dict()) + "\n")
+            self.wfile.write(b"0\r\n\r\n")
+        except (BrokenPipeError, ConnectionResetError):
+            self.close_connection = True  # The client went away; the job goes on
+
+    def _write_chunk(self, text):
+        data = text.encode('utf-8')
+        self.wfile.write(b"%x\r\n%s\r\n" % (len(data), data))
+        self.wfile.flush()
+
+    def address_string(self):
+        # Unix socket peers have no address
+        return self.client_address[0] if self.client_address else "unix"
+
+    def log_message(self, format, *args):
+        logging.getLogger(__name__).debug(f"{self.address_string()} {format % args}")
+
+
+def _invalid(name, value):
+    raise ValueError(f"Invalid {name}: {value!r}")
+
+
+def _integer(name, value):
+    # JSON numbers only: "5" and 5.9 are mistakes, not 5, and bool is an int subclass
+    if isinstance(value, bool) or not isinstance(value, int) or value < 0:
+        _invalid(name, value)
+    return value
@@ -0,0 +1,220 @@
+import bisect
+import hashlib
+import json
+import logging
+import math
+import re
+import time
+from collections import Counter
+
+try:
+    import numpy as np  # Optional: vectorized scoring (pip install numpy)
+except ImportError:
+    np = None
+
+from scanner.pattern_matcher import ScanTimeout
+
+# Candidate tokens: whole runs of base64 / base64url characters (so hex is covered too),
+# plus up to two "=" of padding
+TOKEN_CHARS = "A-Za-z0-9+/_\\-"
+TOKEN_PATTERN = r"(?<![%s])[%s]{%d,%d}(?![%s])={0,2}"
+MIN_TOKEN_LENGTH = 20
+MAX_TOKEN_LENGTH = 256
+
+# Per charset: finding type, minimum length and minimum Shannon entropy, as a fraction
+# of the highest entropy a token of that length can have over the charset
+# (log2(min(length, charset size)) bits per character)
+CHARSETS = {
+    "hex": ("HIGH_ENTROPY_HEX", 32, 0.86),
+    "base64": ("HIGH_ENTROPY_BASE64", 20, 0.84),
+}
+HEX_SIZE = 16
+BASE64_SIZE = 64
+
+# Hex tokens of these lengths (SHA-1, SHA-256) are hashes, not secrets, when a word like
+# these precedes them on their line (within HASH_CONTEXT_CHARS): commit IDs, checksums,
+# lockfile hashes. Subresource-integrity values ("sha512-<base64>") are always hashes.
+KNOWN_HASH_LENGTHS = (40, 64)
+HASH_CONTEXT_CHARS = 80
+HASH_CONTEXT = re.compile(r"sha|hash|checksum|digest|integrity|commit|\brev|\bref\b|\bobject\b|\bblob\b|\btree\b")
+INTEGRITY_PREFIX = re.compile(rb"sha(?:1|256|384|512)-")
+
+# Tokens scored per NumPy batch (bounds the memory of the per-token histograms)
+BATCH_TOKENS = 4096
+
+# Every byte value mapped to a small index for the histograms; only token characters occur
+_ALPHABET = b"ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghijklmnopqrstuvwxyz0123456789+/-_="
+_HEX = frozenset(b"0123456789abcdefABCDEF")
+_DIGITS = frozenset(b"0123456789")
+_LETTERS = frozenset(b"ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghijklmnopqrstuvwxyz")
+
+
+class EntropyDetector:
+    """
+    Finds generic secrets without a known prefix: high-entropy hex and base64 tokens
+    (API keys, JWT secrets, random credentials). Plugs into PatternMatcher(detectors=...).
+    With NumPy, candidate tokens are found as runs in a per-byte mask of the text and scored
+    in batches: the tokens of a batch are packed into one array and a single bincount gives
+    every token's character histogram. Without NumPy (or for str text) candidates come
+    from one regex pass, and without NumPy the same scores are computed per token.
+    Base64 tokens must mix letters and digits, so long identifiers and words don't qualify.
+    With skip_known_hashes, SHA-1/SHA-256 hex digests introduced as hashes (see HASH_CONTEXT)
+    and integrity values aren't reported; lockfiles themselves are left out by the default
+    exclusion rules.
+    """
+    def __init__(self, min_length=MIN_TOKEN_LENGTH, max_length=MAX_TOKEN_LENGTH, charsets=None, vectorized=True, skip_known_hashes=True):
+        self.min_length = min_length
+        self.max_length = max_length
+        self.charsets = dict(charsets or CHARSETS)
+        self.skip_known_hashes = skip_known_hashes
+        self.vectorized = vectorized and np is not None
+        if vectorized and np is None:
+            logging.getLogger(__name__).warning("numpy is not installed. Scoring token entropy in pure Python.")
+        token_pattern = TOKEN_PATTERN % (TOKEN_CHARS, TOKEN_CHARS, min_length, max_length, TOKEN_CHARS)
+        self._pattern = re.compile(token_pattern)
+        self._byte_pattern = re.compile(token_pattern.encode('ascii'))
+        if self.vectorized:
+            self._is_token_char = np.zeros(256, dtype=np.int8)
+            self._is_token_char[np.frombuffer(_ALPHABET[:-1], dtype=np.uint8)] = 1
+            self._lookup = np.zeros(256, dtype=np.int64)
+            self._lookup[np.frombuffer(_ALPHABET, dtype=np.uint8)] = np.arange(len(_ALPHABET))
+            self._is_hex = _byte_flags(_HEX)
+            self._is_digit = _byte_flags(_DIGITS)
+            self._is_letter = _byte_flags(_LETTERS)
+        identity = {"min_length": min_length, "max_length": max_length, "charsets": self.charsets,
+                    "skip_known_hashes": skip_known_hashes}
+        self.version = hashlib.sha256(json.dumps(identity, sort_keys=True).encode('utf-8')).hexdigest()[:16]
+
+    def __getstate__(self):
+        return {"min_length": self.min_length, "max_length": self.max_length,
+                "charsets": self.charsets, "vectorized": self.vectorized, "skip_known_hashes": self.skip_known_hashes}
+
+    def __setstate__(self, state):
+        self.__init__(**state)
+
+    def scan_text(self, text, exclude=(), deadline=None):
+        """
+        Returns matches ({"type", "value", "start", "end"}) for the high-entropy tokens in
+        text (str or bytes-like), skipping tokens overlapping a span in exclude (sorted
+        (start, end) pairs, e.g. PatternMatcher's own matches).
+        Raises ScanTimeout (with the matches so far) past the time.monotonic() deadline.
+        """
+        spans = []
+        tokens = []
+        starts = [s for s, _ in exclude]
+        for start, end, token in self._candidates(text):
+            if starts:
+                i = bisect.bisect_right(starts, start)
+                if (i and exclude[i - 1][1] > start) or (i < len(starts) and starts[i] < end):
+                    continue
+            spans.append((start, end))
+            tokens.append(token)
+
+        matches = []
+        for batch_start in range(0, len(tokens), BATCH_TOKENS):
+            if deadline and time.monotonic() > deadline:
+                raise ScanTimeout(matches)
+            batch = tokens[batch_start:batch_start + BATCH_TOKENS]
+            if isinstance(text, str):
+                batch = [token.encode('ascii') for token in batch]
+            else:
+                batch = [bytes(token) for token in batch]
+            classify = self._classify_vectorized if self.vectorized else self._classify
+            for i, finding_type in classify(batch):
+                start, end = spans[batch_start + i]
+                if self.skip_known_hashes and _known_hash(text, start, batch[i]):
+                    continue
+                matches.append({"type": finding_type, "value": batch[i].decode('ascii'), "start": start, "end": end})
+        return matches
+
+    def _candidates(self, text):
+        """Yields (start, end, token) for each candidate token of text."""
+        if not self.vectorized or isinstance(text, str):
+            pattern = self._pattern if isinstance(text, str) else self._byte_pattern
+            for match in pattern.finditer(text):
+                yield match.start(), match.end(), match.group(0)
+            return
+
+        data = np.frombuffer(text, dtype=np.uint8)
+        if not len(data):
+            return
+        # Runs of token characters start where the mask goes 0 -> 1 and end where it goes 1 -> 0
+        mask = self._is_token_char[data]
+        edges = np.flatnonzero(np.diff(mask, prepend=0, append=0))
+        run_starts, run_ends = edges[::2], edges[1::2]
+        lengths = run_ends - run_starts
+        selected = (lengths >= self.min_length) & (lengths <= self.max_length)
+        for start, end in zip(run_starts[selected].tolist(), run_ends[selected].tolist()):
+            token_end = end
+            while token_end < len(data) and token_end - end < 2 and text[token_end] == 61:  # "=" padding
+                token_end += 1
+            yield start, token_end, text[start:token_end]
+
+    def _classify(self, tokens):
+        """Yields (index, finding type) for each token of the batch that qualifies."""
+        for i, token in enumerate(tokens):
+            if "hex" in self.charsets and _HEX.issuperset(token):
+                charset, size = "hex", HEX_SIZE
+            elif "base64" in self.charsets and not _DIGITS.isdisjoint(token) and not _LETTERS.isdisjoint(token):
+                charset, size = "base64", BASE64_SIZE
+            else:
+                continue
+            finding_type, min_length, threshold = self.charsets[charset]
+            if len(token) >= min_length and _entropy(token) >= threshold * math.log2(min(len(token), size)):
+                yield i, finding_type
+
+    def _classify_vectorized(self, tokens):
+        """
+        _classify for a whole batch at once: the tokens are packed into one array, and
+        per-token character histograms, charset flags and entropies come from bincounts.
+        """
+        count = len(tokens)
+        lengths = np.fromiter((len(t) for t in tokens), dtype=np.int64, count=count)
+        chars = np.frombuffer(b"".join(tokens), dtype=np.uint8)
+        owners = np.repeat(np.arange(count), lengths)
+
+        # Row i of the histogram counts the characters of token i
+        width = len(_ALPHABET)
+        counts = np.bincount(owners * width + self._lookup[chars], minlength=count * width).reshape(count, width)
+        p = counts / lengths[:, None]
+        with np.errstate(divide='ignore', invalid='ignore'):
+            entropy = -np.where(counts > 0, p * np.log2(p), 0.0).sum(axis=1)
+
+        hex_chars = np.bincount(owners, weights=self._is_hex[chars], minlength=count)
+        digits = np.bincount(owners, weights=self._is_digit[chars], minlength=count)
+        letters = np.bincount(owners, weights=self._is_letter[chars], minlength=count)
+
+        is_hex = (hex_chars == lengths) if "hex" in self.charsets else np.zeros(count, dtype=bool)
+        is_base64 = ~is_hex & (digits > 0) & (letters > 0) if "base64" in self.charsets else np.zeros(count, dtype=bool)
+        found = np.zeros(count, dtype=bool)
+        for charset, selected, size in (("hex", is_hex, HEX_SIZE), ("base64", is_base64, BASE64_SIZE)):
+            if charset not in self.charsets:
+                continue
+            _, min_length, threshold = self.charsets[charset]
+            found |= selected & (lengths >= min_length) & (entropy >= threshold * np.log2(np.minimum(lengths, size)))
+        for i in np.flatnonzero(found).tolist():
+            yield i, self.charsets["hex" if is_hex[i] else "base64"][0]
+
+
+def _known_hash(text, start, token):
+    """True if token (bytes, at text[start]) is a digest rather than a secret (see KNOWN_HASH_LENGTHS)."""
+    if INTEGRITY_PREFIX.match(token):
+        return True
+    if len(token) not in KNOWN_HASH_LENGTHS or not _HEX.issuperset(token):
+        return False
+    before = text[max(0, start - HASH_CONTEXT_CHARS):start]
+    if not isinstance(before, str):
+        before = bytes(before).decode('latin-1')
+    before = before.rsplit("\n", 1)[-1].lower()
+    return HASH_CONTEXT.search(before) is not None
+
+
+def _byte_flags(byte_values):
+    flags = np.zeros(256, dtype=np.float64)
+    flags[list(byte_values)] = 1
+    return flags
+
+
+def _entropy(token):
+    length = len(token)
+    return -sum(count / length * math.log2(count / length) for count in Counter(token).values())
@@ -0,0 +1,131 @@
+import re
+
+# Bytes read from the start of a file to tell binary from text (git's heuristic: a NUL byte)
+SNIFF_BYTES = 8000
+
+# Skip reasons reported in a ScanReport
+REASON_EXCLUDED = "excluded"
+REASON_TOO_LARGE = "over size limit"
+REASON_BINARY = "binary"
+
+
+class ExclusionRules:
+    """
+    Compiled gitignore-style rules deciding which files are not worth scanning.
+    Supported syntax: `name`, `*.ext`, `dir/` (directories only), `/anchored/path`,
+    `*`, `?` and `**` globs, and `!pattern` to re-include. As in gitignore, a re-include
+    wins over the rules matching the path itself, but a file inside an excluded directory
+    can't be re-included: re-include the directory (`!vendor/`) instead.
+    Plain names and extensions are set lookups; other globs share one regex each
+    for directories and files, so checking a path costs the same for 10 or 100 rules.
+    """
+    def __init__(self, patterns=(), max_file_size=None, sniff_binary=True):
+        self.patterns = list(patterns)
+        self.max_file_size = max_file_size or None
+        self.sniff_binary = sniff_binary
+
+        self._names = set()
+        self._dir_names = set()
+        self._extensions = set()
+        file_globs, dir_globs, include_globs = [], [], []
+
+        for raw in self.patterns:
+            pattern = raw.strip()
+            if not pattern or pattern.startswith("#"):
+                continue
+            if pattern.startswith("!"):
+                include_globs.append(_glob_regex(pattern[1:].rstrip("/")))
+                continue
+            dir_only = pattern.endswith("/")
+            pattern = pattern.rstrip("/")
+            anchored = "/" in pattern
+            plain = not any(c in pattern for c in "*?[")
+
+            if not anchored and plain:
+                (self._dir_names if dir_only else self._names).add(pattern)
+            elif not anchored and not dir_only and pattern.startswith("*.") and not any(c in pattern[2:] for c in "*?[/"):
+                self._extensions.add(pattern[1:].lower())
+            else:
+                (dir_globs if dir_only else file_globs).append(_glob_regex(pattern))
+                if not dir_only:
+                    # A pattern without a trailing slash matches directories too
+                    dir_globs.append(_glob_regex(pattern))
+
+        self._suffixes = tuple(sorted(self._extensions))
+        self._file_regex = re.compile("|".join(file_globs)) if file_globs else None
+        self._dir_regex = re.compile("|".join(dir_globs)) if dir_globs else None
+        self._include_regex = re.compile("|".join(include_globs)) if include_globs else None
+
+    def excludes_dir(self, rel_dir):
+        """True if the directory (repo-relative, '/'-separated) and everything below it are excluded."""
+        name = rel_dir.rsplit("/", 1)[-1]
+        if name in self._dir_names or name in self._names or (self._dir_regex and self._dir_regex.match(rel_dir)):
+            return not self._included(rel_dir)
+        return False
+
+    def excludes_file(self, rel_path):
+        """True if the file itself matches a rule (its directories are not checked, see excludes_path)."""
+        name = rel_path.rsplit("/", 1)[-1]
+        if (name in self._names
+                or (self._suffixes and name.lower().endswith(self._suffixes))
+                or (self._file_regex and self._file_regex.match(rel_path))):
+            return not self._included(rel_path)
+        return False
+
+    def excludes_path(self, rel_path):
+        """True if the file or any directory above it is excluded (for paths not found by walking)."""
+        parts = rel_path.split("/")
+        for depth in range(1, len(parts)):
+            if self.excludes_dir("/".join(parts[:depth])):
+                return True
+        return self.excludes_file(rel_path)
+
+    def check_file(self, rel_path, size=None, walked=False):
+        """
+        Returns the reason to skip a file, or None to scan it.
+        walked: the file's directories were already checked (e.g. pruned during os.walk).
+        """
+        if self.excludes_file(rel_path) if walked else self.excludes_path(rel_path):
+            return REASON_EXCLUDED
+        if self.max_file_size and size is not None and size > self.max_file_size:
+            return REASON_TOO_LARGE
+        return None
+
+    def _included(self, rel_path):
+        return bool(self._include_regex and self._include_regex.match(rel_path))
+
+
+def is_binary(head):
+    """True if the first bytes of a file look binary."""
+    return b"\0" in head[:SNIFF_BYTES]
+
+
+def _glob_regex(pattern):
+    """Translates one gitignore glob into a regex matching a whole repo-relative path."""
+    anchored = "/" in pattern
+    pattern = pattern.lstrip("/")
+    parts = []
+    i = 0
+    while i < len(pattern):
+        if pattern.startswith("**/", i):
+            parts.append("(?:.*/)?")
+            i += 3
+        elif pattern.startswith("/**", i) and i + 3 == len(pattern):
+            parts.append("/.*")
+            i += 3
+        elif pattern[i] == "*":
+            parts.append("[^/]*")
+            i += 1
+        elif pattern[i] == "?":
+            parts.append("[^/]")
+            i += 1
+        elif pattern[i] == "[" and "]" in pattern[i + 2:]:
+            end = pattern.index("]", i + 2)
+            chars = pattern[i + 1:end]
+            parts.append("[" + ("^" + chars[1:] if chars.startswith("!") else chars).replace("\\", "\\\\") + "]")
+            i = end + 1
+        else:
+            parts.append(re.escape(pattern[i]))
+            i += 1
+    body = "".join(parts)
+    return f"(?:{body})$" if anchored else f"(?:(?:.*/)?{body})$"
@@ -0,0 +1,115 @@
+import hashlib
+
+# Where a finding was made
+KIND_FILE = "file"
+KIND_FILE_DIFF = "file_diff"
+KIND_COMMIT_MESSAGE = "commit_message"
+
+
+class Finding:
+    """
+    One secret found in a repository.
+    Repeats of the same secret at the same place (e.g. a key left in a file across many
+    commits) are collapsed by FindingIndex into one Finding spanning the first and last
+    commit it was seen in, with the number of occurrences.
+    """
+    __slots__ = ("type", "value", "start", "end", "line", "column", "context", "kind", "path",
+                 "first_seen_commit", "last_seen_commit", "occurrences", "repo", "file_url")
+
+    def __init__(self, type, value, start, end, kind, path=None, commit=None, line=None, column=None, context=None):
+        self.type = type
+        self.value = value
+        self.start = start
+        self.end = end
+        # 1-based line and column in the file (or commit message), and the lines around it
+        self.line = line
+        self.column = column
+        self.context = context
+        self.kind = kind
+        # Repo-relative path with forward slashes (None for commit messages)
+        self.path = path
+        self.first_seen_commit = commit
+        self.last_seen_commit = commit
+        self.occurrences = 1
+        self.repo = None
+        self.file_url = None
+
+    @classmethod
+    def from_match(cls, match, kind, path=None, commit=None):
+        """Builds a Finding from one of PatternMatcher.scan_text's matches."""
+        return cls(match["type"], match["value"], match["start"], match["end"], kind, path, commit,
+                   match.get("line"), match.get("column"), match.get("context"))
+
+    @property
+    def commit(self):
+        # The most recent commit the secret was seen in
+        return self.last_seen_commit
+
+    @property
+    def location(self):
+        if self.kind == KIND_COMMIT_MESSAGE:
+            return KIND_COMMIT_MESSAGE
+        return f"{self.kind}: {self.path}"
+
+    @property
+    def key(self):
+        """Identifies the secret and its place within one repository."""
+        return (self.type, self.value, self.kind, self.path)
+
+    @property
+    def fingerprint(self):
+        """Stable ID of the secret and its place: type, value hash, repo and path."""
+        value_hash = hashlib.sha256(self.value.encode('utf-8', errors='replace')).hexdigest()
+        data = "\0".join((self.type, value_hash, self.repo or "", self.path or self.kind))
+        return hashlib.sha256(data.encode('utf-8', errors='replace')).hexdigest()[:16]
+
+    def to_dict(self):
+        return {
+            "repo": self.repo,
+            "type": self.type,
+            "value": self.value,
+            "commit": self.commit,
+            "location": self.location,
+            "line": self.line,
+            "column": self.column,
+            "context": self.context,
+            "file_url": self.file_url,
+            "first_seen_commit": self.first_seen_commit,
+            "last_seen_commit": self.last_seen_commit,
+            "occurrences": self.occurrences,
+            "fingerprint": self.fingerprint,
+        }
+
+    def __eq__(self, other):
+        if not isinstance(other, Finding):
+            return NotImplemented
+        return all(getattr(self, name) == getattr(other, name) for name in self.__slots__)
+
+    def __repr__(self):
+        return f"Finding({self.type}, {self.location}, {self.last_seen_commit})"
+
+
+class FindingIndex:
+    """
+    In-order dedup of the findings of one repository scan.
+    Findings must be added newest commit first (git log order): the first occurrence
+    of a secret sets its last-seen commit, later (older) ones move its first-seen commit back.
+    """
+    def __init__(self):
+        self._findings = {}
+
+    def add(self, finding):
+        """Returns True if the finding is new, False if it was merged into an earlier one."""
+        existing = self._findings.get(finding.key)
+        if existing is None:
+            self._findings[finding.key] = finding
+            return True
+        existing.first_seen_commit = finding.first_seen_commit
+        existing.occurrences += finding.occurrences
+        return False
+
+    def findings(self):
+        return list(self._findings.values())
+
+    def __len__(self):
+        return len(self._findings)
@@ -0,0 +1,135 @@
+import glob
+import json
+import os
+import sqlite3
+import threading
+import time
+
+# Valid path relative for execution from root
+CACHE_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "cache")
+FRONTIER_FILE = os.path.join(CACHE_DIR, "frontier.sqlite")
+FOUND_REPOS_DIR = os.path.join(CACHE_DIR, "found_repos")
+
+# Candidates older than this are dropped: their star counts and push dates have likely drifted
+MAX_AGE_SECONDS = 30 * 24 * 3600
+
+
+class RepoFrontier:
+    """
+    Persistent pool of candidate repositories collected from search responses.
+    Every eligible repo a search page returns is kept here (not only the ones a run needed),
+    so later runs can take candidates without calling the search API.
+    Candidates are handed out oldest first and removed when taken.
+    """
+    def __init__(self, path=FRONTIER_FILE, found_repos_dir=FOUND_REPOS_DIR):
+        self.path = path
+        self._lock = threading.Lock()
+
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS candidates ("
+            "id TEXT PRIMARY KEY, stars INTEGER NOT NULL, created_at TEXT NOT NULL, "
+            "added_at REAL NOT NULL, item TEXT NOT NULL)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS candidates_added_at ON candidates (added_at)")
+        self._conn.execute("CREATE TABLE IF NOT EXISTS imported_files (name TEXT PRIMARY KEY)")
+        self._conn.commit()
+
+        if found_repos_dir:
+            self._import_found_repos(found_repos_dir)
+
+    def _import_found_repos(self, found_repos_dir):
+        # Result files of earlier searches are read once; scanned repos among them are dropped by take()
+        imported = {row[0] for row in self._conn.execute("SELECT name FROM imported_files")}
+        added = 0
+        for file_path in sorted(glob.glob(os.path.join(found_repos_dir, "found_repos_*.json"))):
+            name = os.path.basename(file_path)
+            if name in imported:
+                continue
+            try:
+                with open(file_path, "r", encoding="utf-8") as f:
+                    items = json.load(f)
+                # Repos were found when the file was written, not now
+                added += self.add(items, added_at=os.path.getmtime(file_path), commit=False)
+            except (OSError, ValueError) as e:
+                print(f"Skipping unreadable {file_path}: {e}")
+            with self._lock:
+                self._conn.execute("INSERT OR IGNORE INTO imported_files (name) VALUES (?)", (name,))
+        with self._lock:
+            self._conn.commit()
+        if added:
+            print(f"Imported {added} candidate repositories from {found_repos_dir}")
+
+    def add(self, items, added_at=None, commit=True):
+        """Stores search result items as candidates. Returns how many were new."""
+        added_at = added_at or time.time()
+        rows = []
+        for item in items or []:
+            if not isinstance(item, dict) or item.get("id") is None or not item.get("clone_url"):
+                continue
+            rows.append((
+                str(item["id"]),
+                int(item.get("stargazers_count") or 0),
+                item.get("created_at") or "",
+                added_at,
+                json.dumps(item, ensure_ascii=False),
+            ))
+        with self._lock:
+            before = self._conn.total_changes
+            self._conn.executemany(
+                "INSERT OR IGNORE INTO candidates (id, stars, created_at, added_at, item) VALUES (?, ?, ?, ?, ?)",
+                rows,
+            )
+            added = self._conn.total_changes - before
+            if commit:
+                self._conn.commit()
+        return added
+
+    def take(self, limit, exclude_ids=(), max_stars=None, min_created_date=None):
+        """
+        Removes and returns up to limit candidates matching the search filters, oldest first.
+        Candidates in exclude_ids (e.g. already scanned) or past MAX_AGE_SECONDS are discarded on the way.
+        """
+        taken = []
+        with self._lock:
+            self._conn.execute("DELETE FROM candidates WHERE added_at < ?", (time.time() - MAX_AGE_SECONDS,))
+            discarded = []
+            cursor = self._conn.execute(
+                "SELECT id, item FROM candidates WHERE (? IS NULL OR stars <= ?) AND (? IS NULL OR created_at > ?) "
+                "ORDER BY added_at, id",
+                (max_stars, max_stars, min_created_date, min_created_date),
+            )
+            for repo_id, item in cursor:
+                if len(taken) >= limit:
+                    break
+                if repo_id in exclude_ids:
+                    discarded.append(repo_id)
+                else:
+                    taken.append(json.loads(item))
+            cursor.close()
+            self._conn.executemany(
+                "DELETE FROM candidates WHERE id = ?",
+                [(repo_id,) for repo_id in discarded] + [(str(item["id"]),) for item in taken],
+            )
+            self._conn.commit()
+        return taken
+
+    def count(self, max_stars=None, min_created_date=None):
+        """Number of stored candidates matching the search filters."""
+        with self._lock:
+            return self._conn.execute(
+                "SELECT COUNT(*) FROM candidates WHERE (? IS NULL OR stars <= ?) AND (? IS NULL OR created_at > ?)",
+                (max_stars, max_stars, min_created_date, min_created_date),
+            ).fetchone()[0]
+
+    def ids(self):
+        """IDs of all stored candidates, so searches can treat them as already found."""
+        with self._lock:
+            return {row[0] for row in self._conn.execute("SELECT id FROM candidates")}
+
+    def close(self):
+        with self._lock:
+            self._conn.commit()
+            self._conn.close()
@@ -1,88 +1,128 @@
 import requests
+from requests.adapters import HTTPAdapter
 import random
 import os
 import json
 import re
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
 import config
+from scanner.query_planner import QueryPlanner
 
-class GitHubClient:
-    def __init__(self, token):
+MAX_RETRIES = 4
+BACKOFF_BASE_SECONDS = 1.0
+# Give up instead of sleeping longer than this for a rate limit to reset
+MAX_RATE_LIMIT_WAIT_SECONDS = 120
+# Valid path relative for execution from root
+FOUND_REPOS_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "cache", "found_repos")
+
+class TokenBucket:
+    """
+    Paces requests: allows `rate` acquisitions per second on average,
+    with bursts of up to `capacity`.
+    """
+    def __init__(self, rate, capacity=1):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                wait = (1 - self.tokens) / self.rate
+            time.sleep(wait)
+
+
+class _TokenState:
+    """Rate-limit bookkeeping for one API token (None = unauthenticated)."""
+    def __init__(self, token, requests_per_minute, burst):
         self.token = token
-        self.base_url = "https://api.github.com"
-        self.headers = {"Authorization": f"token {token}", "Accept": "application/vnd.github.v3+json"}
+        self.headers = {"Accept": "application/vnd.github.v3+json"}
+        if token:
+            self.headers["Authorization"] = f"token {token}"
+        self.remaining = None  # Unknown until the first response
+        self.reset_at = 0.0
+        self.bucket = TokenBucket(requests_per_minute / 60.0, burst)
+
+    def quota(self, now):
+        if self.remaining is None or self.reset_at <= now:
+            return float("inf")
+        return self.remaining
+
 
-    def search_repositories(self, max_stars=10, limit=5, exclude_ids=None, min_created_date=None):
+class GitHubClient:
+    def __init__(self, token, base_url=config.GITHUB_API_URL, max_workers=config.SEARCH_WORKERS,
+                 requests_per_minute=config.SEARCH_REQUESTS_PER_MINUTE):
         """
-        Finds random repositories using the GitHub Search API.
-        We use random character queries + star filters to find diverse, non-popular repos.
+        token: One token or a list of tokens; requests go to the token with the most remaining quota.
+        max_workers: Search pages fetched concurrently over a shared connection pool.
+        requests_per_minute: Pace per token (the search API allows 30/min authenticated).
+        """
+        tokens = [t for t in token if t] if isinstance(token, (list, tuple)) else [token]
+        self.token = tokens[0] if tokens else None
+        self.base_url = base_url.rstrip('/')
+        self.max_workers = max(1, max_workers)
+        self._tokens = [_TokenState(t, requests_per_minute, self.max_workers) for t in (tokens or [None])]
+        self._tokens_lock = threading.Lock()
+        self.headers = self._tokens[0].headers
+
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=self.max_workers)
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+
+        self.requests_sent = 0
+        self.rate_limited = 0
+
+    def search_repositories(self, max_stars=10, limit=5, exclude_ids=None, min_created_date=None, planner=None, frontier=None, stop=None):
+        """
+        Finds repositories using the GitHub Search API.
+        A QueryPlanner splits the search space into slices (created-date windows and size buckets)
+        and steers requests toward the slices that yield the most new, non-excluded repos.
+        Pages are fetched max_workers at a time and processed in request order.
+        Eligible repos beyond the limit are added to the frontier (a RepoFrontier) if one is given.
+        Setting stop (a threading.Event) ends the search after the pages in flight; the
+        repos found so far are returned and kept as usual.
         """
         if exclude_ids is None:
             exclude_ids = set()
+        own_planner = planner is None
+        if own_planner:
+            planner = QueryPlanner(max_stars=max_stars, min_created_date=min_created_date)
             
         found_repos = []
+        extra_repos = []
         attempts = 0
         max_attempts = 20
         
-        # Random queries to sample different parts of GitHub
-        # Using 1-2 random characters cover a huge surface area
-        chars = "abcdefghijklmnopqrstuvwxyz0123456789"
-        
-        while len(found_repos) < limit and attempts < max_attempts:
-            attempts += 1
-            
-            # Generate a random query: e.g. "a", "xk", "test"
-            query_len = random.choice([1, 2])
-            query_str = "".join(random.choice(chars) for _ in range(query_len))
-            
-            # Random sort order to further shuffle
-            sort_order = random.choice(["updated", "stars", "forks"])
-            
-            # Random page (1-10) to avoid always getting the top results for 'a'
-            page = random.randint(1, 10)
-            
-            search_url = f"{self.base_url}/search/repositories"
-            
-            # precise filter: query + max stars + recent push (optional, to avoid dead repos)
-            # precise filter: query + max stars + recent push (optional, to avoid dead repos)
-            query_parts = [
-                query_str,
-                f"stars:<={max_stars}",
-                f"pushed:>{config.MIN_PUSHED_DATE}",
-                "size:>0"
-            ]
-            
-            if min_created_date:
-                query_parts.append(f"created:>{min_created_date}")
-            
-            q = " ".join(query_parts)
-            
-            params = {
-                "q": q,
-                "sort": sort_order,
-                "order": "desc", # or asc
-                "per_page": 100, # fetch more to filter locally if needed
-                "page": page
-            }
-            
-            try:
-                print(f"Searching: {q} (Page {page})...")
-                response = requests.get(search_url, headers=self.headers, params=params, timeout=10)
-                
-                if response.status_code == 200:
-                    data = response.json()
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            while len(found_repos) < limit and attempts < max_attempts and not (stop and stop.is_set()):
+                batch = [planner.next_request() for _ in range(min(self.max_workers, max_attempts - attempts))]
+                attempts += len(batch)
+                futures = [executor.submit(self._search_page, params) for _, params in batch]
+
+                for (search_slice, _), future in zip(batch, futures):
+                    data = future.result()
+                    if not data:
+                        planner.record(search_slice, None, 0)
+                        continue
                     items = data.get("items", [])
                     
-                    if not items:
-                        continue
-                        
                     # Shuffle the page results
                     random.shuffle(items)
                     
+                    new_repos = 0
                     for item in items:
-                        if len(found_repos) >= limit:
-                            break
-                            
                         # ID Check
                         repo_id = str(item.get('id'))
                         if repo_id in exclude_ids:
@@ -97,23 +137,28 @@ class GitHubClient:
                             print(f"Skipping suspicious repo: {item.get('name')}")
                             continue
 
+                        # Counts toward the slice's yield even once the limit is reached
+                        new_repos += 1
+                        exclude_ids.add(repo_id)
+                        if len(found_repos) >= limit:
+                            extra_repos.append(item)
+                            continue
+
                         # Add to list
                         found_repos.append(item)
-                        exclude_ids.add(repo_id) # Temporary add to prevent dupes in same batch
-                        
-                elif response.status_code == 403 or response.status_code == 429:
-                    print("GitHub API Rate Limit Exceeded. Waiting...")
-                    break
-                else:
-                    print(f"Search API Error: {response.status_code}")
-                    
-            except Exception as e:
-                print(f"Network error during search: {e}")
+
+                    planner.record(search_slice, data.get("total_count", 0), new_repos)
+
+        if own_planner:
+            planner.save()
+        print(f"Search plan: {planner.summary()}")
+        if frontier is not None and extra_repos:
+            frontier.add(extra_repos)
+            print(f"Kept {len(extra_repos)} extra repositories for later runs.")
                 
         # Save results to cache
         try:
-            base_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
-            cache_repos_dir = os.path.join(base_dir, "cache", "found_repos")
+            cache_repos_dir = FOUND_REPOS_DIR
             os.makedirs(cache_repos_dir, exist_ok=True)
             
             timestamp = datetime.now().strftime("%Y-%m-%d_%H-%M-%S")
@@ -128,7 +173,96 @@ class GitHubClient:
 
         return found_repos
 
-    # Removed _search_with_filtering as it is now integrated into the main method.
+    def _search_page(self, params):
+        """Fetches one search page. Returns the decoded JSON, or None if it failed for good."""
+        print(f"Searching: {params['q']} (Page {params['page']})...")
+        response = self._get(f"{self.base_url}/search/repositories", params)
+        if response is None:
+            return None
+        if response.status_code != 200:
+            print(f"Search API Error: {response.status_code}")
+            return None
+        return response.json()
+
+    def _get(self, url, params):
+        """
+        GET with rate-limit handling: picks the token with the most remaining quota,
+        paces it with its token bucket and retries rate-limited, 5xx and network
+        failures with exponential backoff instead of giving up.
+        Returns the final response, or None when all retries failed.
+        """
+        for attempt in range(MAX_RETRIES + 1):
+            state = self._acquire_token()
+            if state is None:
+                print("GitHub API Rate Limit Exceeded on all tokens. Giving up.")
+                return None
+            state.bucket.acquire()
+
+            try:
+                with self._tokens_lock:
+                    self.requests_sent += 1
+                response = self.session.get(url, headers=state.headers, params=params, timeout=10)
+            except requests.RequestException as e:
+                print(f"Network error during search: {e}")
+                self._backoff(attempt)
+                continue
+
+            self._update_rate_limit(state, response)
+
+            if response.status_code in (403, 429):
+                with self._tokens_lock:
+                    self.rate_limited += 1
+                    retry_after = response.headers.get("Retry-After")
+                    if retry_after:
+                        # Secondary rate limit: the token must pause for the given seconds
+                        state.remaining = 0
+                        state.reset_at = max(state.reset_at, time.time() + float(retry_after))
+                    elif state.remaining != 0:
+                        # Rate limited without usable headers: back off this token a little
+                        state.remaining = 0
+                        state.reset_at = time.time() + BACKOFF_BASE_SECONDS * 2 ** attempt
+                print(f"GitHub API Rate Limit Exceeded (HTTP {response.status_code}). Retrying...")
+                continue
+
+            if response.status_code >= 500:
+                self._backoff(attempt)
+                continue
+
+            return response
+
+        return None
+
+    def _acquire_token(self):
+        """
+        Returns the token state with the most remaining quota, waiting for the earliest
+        reset when all tokens are exhausted. Returns None if that wait is too long.
+        """
+        while True:
+            with self._tokens_lock:
+                now = time.time()
+                state = max(self._tokens, key=lambda t: t.quota(now))
+                if state.quota(now) > 0:
+                    if state.remaining is not None and state.reset_at > now:
+                        state.remaining -= 1  # Reserve it so concurrent requests spread over tokens
+                    return state
+                wait = min(t.reset_at for t in self._tokens) - now
+            if wait > MAX_RATE_LIMIT_WAIT_SECONDS:
+                return None
+            print(f"Waiting {wait:.0f}s for the rate limit to reset...")
+            time.sleep(max(wait, 0) + 0.5)
+
+    def _update_rate_limit(self, state, response):
+        remaining = response.headers.get("X-RateLimit-Remaining")
+        reset = response.headers.get("X-RateLimit-Reset")
+        if remaining is None or reset is None:
+            return
+        with self._tokens_lock:
+            state.remaining = int(remaining)
+            state.reset_at = float(reset)
+
+    @staticmethod
+    def _backoff(attempt):
+        time.sleep(BACKOFF_BASE_SECONDS * 2 ** attempt * (0.5 + random.random()))
 
 
 if __name__ == "__main__":
@@ -138,7 +272,7 @@ if __name__ == "__main__":
     sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
     import config
     
-    client = GitHubClient(token=config.GITHUB_TOKEN)
+    client = GitHubClient(token=config.GITHUB_TOKENS)
     repos = client.search_repositories(max_stars=10, limit=5)
     
     print(f"Found {len(repos)} repositories.")
\ No newline at end of file
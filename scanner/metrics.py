@@ -0,0 +1,212 @@
+import json
+import os
+import sys
+import threading
+import time
+from contextlib import contextmanager
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+# Upper bounds of the histogram buckets (a last +Inf bucket is implied)
+SECONDS_BUCKETS = (0.01, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 300)
+BYTES_BUCKETS = (1024, 16 * 1024, 128 * 1024, 1024**2, 8 * 1024**2, 64 * 1024**2, 512 * 1024**2, 4 * 1024**3)
+COUNT_BUCKETS = (0, 1, 5, 10, 50, 100, 500, 1000, 5000)
+
+# Prefix of every exported Prometheus metric
+METRIC_PREFIX = "reposcanner"
+
+
+class Histogram:
+    """Counts of observed values per bucket (made cumulative on Prometheus export), with their sum and count."""
+    def __init__(self, buckets):
+        self.buckets = tuple(buckets)
+        self.counts = [0] * (len(self.buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value):
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                break
+        else:
+            i = len(self.buckets)
+        self.counts[i] += 1
+        self.sum += value
+        self.count += 1
+
+    def to_dict(self):
+        return {"buckets": list(self.buckets), "counts": list(self.counts), "sum": self.sum, "count": self.count}
+
+
+class RunMetrics:
+    """
+    Timers, counters and per-repository histograms of one run, filled in by the engine
+    (search, result writing, bytes cloned) and the RepoProcessor (file listing, bytes read).
+    A timer adds wall and CPU seconds of the calling thread; per-stage timers come from
+    the Pipeline's stages and per-pattern ones from the PatternMatcher's MatchStats, which
+    report() takes in. Thread-safe.
+    """
+    def __init__(self):
+        self.started_at = time.time()
+        self._started = time.perf_counter()
+        self._cpu_started = time.process_time()
+        # name -> [count, wall seconds, cpu seconds]
+        self.timers = {}
+        self.counters = {}
+        self.histograms = {}
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def timer(self, name):
+        started, cpu_started = time.perf_counter(), time.thread_time()
+        try:
+            yield
+        finally:
+            self.record(name, time.perf_counter() - started, time.thread_time() - cpu_started)
+
+    def record(self, name, wall, cpu=0.0):
+        with self._lock:
+            entry = self.timers.setdefault(name, [0, 0.0, 0.0])
+            entry[0] += 1
+            entry[1] += wall
+            entry[2] += cpu
+
+    def add(self, name, value=1):
+        with self._lock:
+            self.counters[name] = self.counters.get(name, 0) + value
+
+    def observe(self, name, value, buckets=SECONDS_BUCKETS):
+        """Adds value to the histogram name (created with buckets on first use)."""
+        with self._lock:
+            histogram = self.histograms.get(name)
+            if histogram is None:
+                histogram = self.histograms[name] = Histogram(buckets)
+            histogram.observe(value)
+
+    def report(self, run_id, pipeline=None, match_stats=None, extra=None):
+        """The run's metrics as a JSON-serializable dict."""
+        with self._lock:
+            report = {
+                "run_id": run_id,
+                "started_at": time.strftime("%Y-%m-%dT%H:%M:%S", time.localtime(self.started_at)),
+                "wall_seconds": time.perf_counter() - self._started,
+                "cpu_seconds": time.process_time() - self._cpu_started,
+                "peak_rss_bytes": peak_rss_bytes(),
+                "timers": {name: {"count": count, "wall_seconds": wall, "cpu_seconds": cpu}
+                           for name, (count, wall, cpu) in sorted(self.timers.items())},
+                "counters": dict(sorted(self.counters.items())),
+                "histograms": {name: h.to_dict() for name, h in sorted(self.histograms.items())},
+            }
+        if pipeline is not None:
+            report["stages"] = {
+                stage.name: {
+                    "workers": stage.workers, "processed": stage.processed, "failed": stage.failed,
+                    "wall_seconds": stage.busy_seconds, "cpu_seconds": stage.cpu_seconds,
+                    "item_seconds": stage.item_seconds.to_dict(),
+                }
+                for stage in pipeline.stages
+            }
+            report["pipeline_wall_seconds"] = pipeline.wall_seconds
+        if match_stats is not None:
+            report["matching"] = match_stats.to_dict()
+        report.update(extra or {})
+        return report
+
+    def write(self, report, json_file, prometheus_file):
+        """Writes report as JSON and in the Prometheus text format (e.g. for node_exporter's textfile collector)."""
+        _write_atomic(json_file, json.dumps(report, indent=4))
+        _write_atomic(prometheus_file, to_prometheus(report))
+
+
+def to_prometheus(report):
+    """Renders a RunMetrics report in the Prometheus text exposition format."""
+    lines = []
+
+    def metric(name, kind, help_text, samples):
+        if not samples:
+            return
+        full_name = f"{METRIC_PREFIX}_{name}"
+        lines.append(f"# HELP {full_name} {help_text}")
+        lines.append(f"# TYPE {full_name} {kind}")
+        for labels, value, suffix in samples:
+            label_text = ",".join(f'{key}="{_escape(val)}"' for key, val in labels.items())
+            lines.append(f"{full_name}{suffix}{{{label_text}}} {_number(value)}" if label_text else f"{full_name}{suffix} {_number(value)}")
+
+    def histogram_samples(histogram, labels):
+        samples = []
+        cumulative = 0
+        for bound, count in zip(list(histogram["buckets"]) + ["+Inf"], histogram["counts"]):
+            cumulative += count
+            samples.append(({**labels, "le": bound if bound == "+Inf" else _number(bound)}, cumulative, "_bucket"))
+        samples.append((labels, histogram["sum"], "_sum"))
+        samples.append((labels, histogram["count"], "_count"))
+        return samples
+
+    run = {"run_id": report["run_id"]}
+    metric("run_wall_seconds", "gauge", "Wall time of the run.", [(run, report["wall_seconds"], "")])
+    metric("run_cpu_seconds", "gauge", "CPU time of the run's process.", [(run, report["cpu_seconds"], "")])
+    if report["peak_rss_bytes"] is not None:
+        metric("run_peak_rss_bytes", "gauge", "Peak resident set size of the run's process.", [(run, report["peak_rss_bytes"], "")])
+
+    stages = report.get("stages", {})
+    metric("stage_items_total", "counter", "Items handled per pipeline stage and outcome.",
+           [({**run, "stage": name, "outcome": outcome}, stage[outcome], "") for name, stage in stages.items() for outcome in ("processed", "failed")])
+    metric("stage_wall_seconds_total", "counter", "Busy wall time per pipeline stage, summed over its workers.",
+           [({**run, "stage": name}, stage["wall_seconds"], "") for name, stage in stages.items()])
+    metric("stage_cpu_seconds_total", "counter", "CPU time of the pipeline stage's threads.",
+           [({**run, "stage": name}, stage["cpu_seconds"], "") for name, stage in stages.items()])
+    metric("stage_item_seconds", "histogram", "Wall time per repository per pipeline stage.",
+           [sample for name, stage in stages.items() for sample in histogram_samples(stage["item_seconds"], {**run, "stage": name})])
+
+    timers = report.get("timers", {})
+    metric("timer_calls_total", "counter", "Calls of each timed step.", [({**run, "step": name}, t["count"], "") for name, t in timers.items()])
+    metric("timer_wall_seconds_total", "counter", "Wall time of each timed step.", [({**run, "step": name}, t["wall_seconds"], "") for name, t in timers.items()])
+    metric("timer_cpu_seconds_total", "counter", "CPU time of each timed step's thread.", [({**run, "step": name}, t["cpu_seconds"], "") for name, t in timers.items()])
+
+    for name, value in report.get("counters", {}).items():
+        metric(f"{name}_total", "counter", f"Run counter {name}.", [(run, value, "")])
+    for name, histogram in report.get("histograms", {}).items():
+        metric(name, "histogram", f"Per-repository {name.replace('_', ' ')}.", histogram_samples(histogram, run))
+
+    matching = report.get("matching")
+    if matching:
+        metric("scanned_texts_total", "counter", "Texts (files, diffs, commit messages, windows) matched.", [(run, matching["texts"], "")])
+        metric("scanned_bytes_total", "counter", "Bytes matched against the patterns.", [(run, matching["bytes"], "")])
+        metric("match_seconds_total", "counter", "Time in PatternMatcher.scan_text.", [(run, matching["seconds"], "")])
+        metric("prefilter_seconds_total", "counter", "Time of the anchor prefilter pass.", [(run, matching["prefilter_seconds"], "")])
+        patterns = matching["patterns"]
+        metric("pattern_runs_total", "counter", "Regex runs (anchored match attempts or finditer passes) per pattern.",
+               [({**run, "pattern": name}, p["runs"], "") for name, p in patterns.items()])
+        metric("pattern_matches_total", "counter", "Matches per pattern or finding type.",
+               [({**run, "pattern": name}, p["matches"], "") for name, p in patterns.items()])
+        metric("pattern_seconds_total", "counter", "Time in each pattern's regex runs (or detector).",
+               [({**run, "pattern": name}, p["seconds"], "") for name, p in patterns.items()])
+    return "\n".join(lines) + "\n"
+
+
+def peak_rss_bytes():
+    """Peak resident set size of this process, or None where the resource module is missing (Windows)."""
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is in KB on Linux, in bytes on macOS
+    return peak if sys.platform == "darwin" else peak * 1024
+
+
+def _number(value):
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _write_atomic(path, text):
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    temp_file = f"{path}.tmp"
+    with open(temp_file, 'w', encoding='utf-8') as f:
+        f.write(text)
+    os.replace(temp_file, path)
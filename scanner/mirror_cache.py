@@ -0,0 +1,303 @@
+import os
+import shutil
+import sqlite3
+import threading
+import time
+
+import git
+
+try:
+    import fcntl
+except ImportError:  # Windows: locks only coordinate the threads of one process
+    fcntl = None
+
+# Valid path relative for execution from root
+CACHE_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "cache")
+MIRROR_DIR = os.path.join(CACHE_DIR, "mirrors")
+
+
+class MirrorCache:
+    """
+    Bare mirrors of scanned repositories, keyed by repo ID and kept between runs.
+    checkout() updates a mirror with `git fetch` (so a rescan only downloads what changed
+    since the last one) and adds a detached worktree for one scan, sharing the mirror's
+    objects; release() removes the worktree.
+    When the mirrors take more than max_bytes, the least recently used ones not in use
+    are evicted. Mirrors are locked with file locks, so worker threads and processes on
+    one machine can share them: updates are exclusive, while each checkout holds a shared
+    "in use" lock that keeps its mirror from being evicted.
+    """
+    def __init__(self, path=MIRROR_DIR, max_bytes=None):
+        self.path = path
+        self.max_bytes = max_bytes or None
+        self._lock = threading.Lock()
+        # worktree path -> (mirror path, its held "in use" lock)
+        self._checkouts = {}
+
+        os.makedirs(path, exist_ok=True)
+        self._conn = sqlite3.connect(os.path.join(path, "mirrors.sqlite"), check_same_thread=False, timeout=60)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS mirrors ("
+            "key TEXT PRIMARY KEY, url TEXT NOT NULL, size_bytes INTEGER NOT NULL, last_used REAL NOT NULL,"
+            " depth INTEGER) WITHOUT ROWID"
+        )
+        self._conn.commit()
+
+    def checkout(self, key, url, worktree_path, strategy):
+        """
+        Brings the mirror of key up to date with url (cloning it on first use, with the
+        depth and filter of strategy, a CloneStrategy) and adds a worktree at worktree_path,
+        detached at the fetched HEAD and checked out only if strategy.checkout.
+        Returns worktree_path, or None if the repository can't be cloned or fetched; a
+        failed fetch leaves the existing mirror in place.
+        """
+        mirror = self._mirror_path(key)
+        cloned = False
+        if self._row(key) is None or not os.path.isdir(mirror):
+            # Replacing a mirror takes its exclusive "in use" lock, as evict() does: a mirror
+            # left without a record may still back another process's worktrees
+            with FileLock(mirror + ".use"), FileLock(mirror + ".lock"):
+                if self._row(key) is None or not os.path.isdir(mirror):
+                    _remove(mirror)
+                    if not self._clone(url, mirror, strategy):
+                        return None
+                    self._record(key, url, _directory_size(mirror), self._depth(mirror, strategy, None))
+                    cloned = True
+
+        in_use = FileLock(mirror + ".use", shared=True)
+        in_use.acquire()
+        try:
+            with FileLock(mirror + ".lock"):
+                row = self._row(key)
+                if row is None or not os.path.isdir(mirror):
+                    print(f"Mirror of {url} was evicted before it could be checked out.")
+                    in_use.release()
+                    return None
+                depth = row[0]
+                size_before = _directory_size(mirror)
+                # A failed fetch (network, auth, a force-pushed shallow boundary) fails this
+                # checkout only; the mirror stays as it was for the scans still using it
+                if not cloned and not self._fetch(mirror, strategy, depth):
+                    in_use.release()
+                    return None
+                depth = self._depth(mirror, strategy, depth)
+                size = _directory_size(mirror)
+                downloaded = size if cloned else max(0, size - size_before)
+                print(f"Mirror of {url}: {'cloned' if cloned else 'fetched'} {downloaded / 1024:.1f} KB.")
+
+                _remove(worktree_path)
+                repo = git.Repo(mirror)
+                repo.git.worktree("prune")
+                add_args = ["add", "--detach"] + ([] if strategy.checkout else ["--no-checkout"])
+                repo.git.worktree(*add_args, os.path.abspath(worktree_path), "HEAD")
+                repo.close()
+        except Exception as e:
+            print(f"Failed to check out {url} from its mirror: {e}")
+            in_use.release()
+            return None
+
+        with self._lock:
+            self._checkouts[os.path.abspath(worktree_path)] = (mirror, in_use)
+        self._record(key, url, size, depth)
+        self.evict()
+        return worktree_path
+
+    def release(self, worktree_path):
+        """Removes a worktree made by checkout() and lets its mirror be evicted again."""
+        with self._lock:
+            mirror, in_use = self._checkouts.pop(os.path.abspath(worktree_path), (None, None))
+        if mirror is None:
+            _remove(worktree_path)
+            return
+        try:
+            with FileLock(mirror + ".lock"):
+                repo = git.Repo(mirror)
+                try:
+                    repo.git.worktree("remove", "--force", os.path.abspath(worktree_path))
+                except git.GitCommandError:
+                    _remove(worktree_path)
+                    repo.git.worktree("prune")
+                repo.close()
+        except Exception as e:
+            print(f"Error removing worktree {worktree_path}: {e}")
+            _remove(worktree_path)
+        finally:
+            in_use.release()
+
+    def evict(self):
+        """Deletes least recently used mirrors that aren't in use until the total fits max_bytes."""
+        if not self.max_bytes:
+            return
+        with self._lock:
+            rows = self._conn.execute("SELECT key, size_bytes FROM mirrors ORDER BY last_used").fetchall()
+        total = sum(size for _, size in rows)
+        for key, size in rows:
+            if total <= self.max_bytes:
+                break
+            mirror = self._mirror_path(key)
+            in_use = FileLock(mirror + ".use", blocking=False)
+            if not in_use.acquire():
+                continue # Being scanned
+            try:
+                with FileLock(mirror + ".lock"):
+                    _remove(mirror)
+                    with self._lock:
+                        self._conn.execute("DELETE FROM mirrors WHERE key = ?", (key,))
+                        self._conn.commit()
+                total -= size
+                print(f"Evicted mirror {key} ({size / 1024 / 1024:.1f} MB).")
+            finally:
+                in_use.release()
+
+    def total_bytes(self):
+        with self._lock:
+            return self._conn.execute("SELECT COALESCE(SUM(size_bytes), 0) FROM mirrors").fetchone()[0]
+
+    def close(self):
+        for worktree_path in list(self._checkouts):
+            self.release(worktree_path)
+        with self._lock:
+            self._conn.close()
+
+    def _mirror_path(self, key):
+        return os.path.join(self.path, f"{key}.git")
+
+    def _row(self, key):
+        """The mirror's (depth,) record, or None if it has none (never cloned, evicted or left half-cloned)."""
+        with self._lock:
+            return self._conn.execute("SELECT depth FROM mirrors WHERE key = ?", (key,)).fetchone()
+
+    def _record(self, key, url, size, depth):
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO mirrors (key, url, size_bytes, last_used, depth) VALUES (?, ?, ?, ?, ?)",
+                (key, url, size, time.time(), depth),
+            )
+            self._conn.commit()
+
+    @staticmethod
+    def _clone(url, mirror, strategy):
+        kwargs = strategy.clone_kwargs()
+        kwargs.pop('no_checkout', None)
+        try:
+            print(f"Mirroring {url} to {mirror} ({strategy})...")
+            git.Repo.clone_from(url, mirror, bare=True, **kwargs).close()
+        except git.GitCommandError as e:
+            if not strategy.shallow_since:
+                print(f"Failed to clone {url}: {e}")
+                return False
+            # --shallow-since fails when no commit is that recent; the tip alone is enough then
+            _remove(mirror)
+            kwargs.pop('shallow_since')
+            kwargs['depth'] = 1
+            try:
+                git.Repo.clone_from(url, mirror, bare=True, **kwargs).close()
+            except git.GitCommandError as e:
+                print(f"Failed to clone {url}: {e}")
+                return False
+        # Objects a worktree may still use must not be pruned by an automatic gc
+        with git.Repo(mirror).config_writer() as config:
+            config.set_value("gc", "auto", "0")
+        return True
+
+    @staticmethod
+    def _depth(mirror, strategy, depth):
+        """The mirror's depth after a clone or fetch with strategy (see _fetch)."""
+        if not os.path.exists(os.path.join(mirror, "shallow")):
+            return 0
+        if strategy.shallow_since:
+            return None
+        if depth and (not strategy.depth or depth >= strategy.depth):
+            return depth
+        return strategy.depth
+
+    @staticmethod
+    def _fetch(mirror, strategy, depth):
+        """
+        Fetches the remote's HEAD (only objects the mirror lacks) and detaches HEAD at it.
+        A shallow mirror (cloned with depth commits, 0 = full history, None = since a date)
+        keeps its boundary and grows by the new commits, unless strategy needs more history.
+        """
+        repo = git.Repo(mirror)
+        try:
+            args = ["origin", "HEAD"]
+            if depth != 0 and os.path.exists(os.path.join(mirror, "shallow")):
+                if strategy.shallow_since:
+                    args.insert(0, f"--shallow-since={strategy.shallow_since}")
+                elif not strategy.depth:
+                    args.insert(0, "--unshallow")
+                elif depth is None or strategy.depth > depth:
+                    args.insert(0, f"--depth={strategy.depth}")
+            try:
+                repo.git.fetch(*args)
+            except git.GitCommandError:
+                if not args[0].startswith("--shallow-since"):
+                    raise
+                # As in _clone: no commit is that recent, so the new tip alone is enough
+                repo.git.fetch("--depth=1", "origin", "HEAD")
+            repo.git.update_ref("--no-deref", "HEAD", "FETCH_HEAD")
+            return True
+        except git.GitCommandError as e:
+            print(f"Failed to update mirror {mirror}: {e}")
+            return False
+        finally:
+            repo.close()
+
+
+class FileLock:
+    """
+    Advisory lock on a file (flock), exclusive or shared. Each FileLock opens its own
+    file description, so locks also exclude each other between threads of one process.
+    """
+    def __init__(self, path, shared=False, blocking=True):
+        self.path = path
+        self.shared = shared
+        self.blocking = blocking
+        self._file = None
+
+    def acquire(self):
+        """Returns False if the lock is held elsewhere and blocking is off."""
+        self._file = open(self.path, "a+")
+        if fcntl is None:
+            return True
+        flags = fcntl.LOCK_SH if self.shared else fcntl.LOCK_EX
+        if not self.blocking:
+            flags |= fcntl.LOCK_NB
+        try:
+            fcntl.flock(self._file.fileno(), flags)
+            return True
+        except BlockingIOError:
+            self._file.close()
+            self._file = None
+            return False
+
+    def release(self):
+        if self._file is not None:
+            if fcntl is not None:
+                fcntl.flock(self._file.fileno(), fcntl.LOCK_UN)
+            self._file.close()
+            self._file = None
+
+    def __enter__(self):
+        self.acquire()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.release()
+
+
+def _directory_size(path):
+    total = 0
+    for root, _, files in os.walk(path):
+        for name in files:
+            try:
+                total += os.path.getsize(os.path.join(root, name))
+            except OSError:
+                pass
+    return total
+
+
+def _remove(path):
+    if os.path.isdir(path):
+        shutil.rmtree(path, ignore_errors=True)
@@ -0,0 +1,81 @@
+import git
+
+# Tree entry modes of regular files (symlinks and submodules are skipped)
+FILE_MODES = (b"100644", b"100755")
+# ScanReport reason for files whose blob a partial clone left on the server
+REASON_NOT_FETCHED = "not fetched"
+
+
+class ObjectStoreReader:
+    """
+    Reads a commit's files straight from a repository's object database, so a
+    clone made with --no-checkout (or a bare repo) can be scanned without writing
+    a working tree. Blob contents come from one long-lived `git cat-file --batch`.
+    """
+    def __init__(self, repo_path):
+        self.repo = git.Repo(repo_path)
+        self._partial = self._is_partial_clone()
+
+    def _is_partial_clone(self):
+        # Partial clones mark their remote as a promisor (and may set extensions.partialClone)
+        try:
+            output = self.repo.git.config("--get-regexp", r"^(remote\..*\.promisor|extensions\.partialclone)$")
+        except git.GitCommandError:
+            return False # No such keys
+        return any(value.lower() not in ("false", "") for _, _, value in (line.partition(" ") for line in output.splitlines()))
+
+    def iter_tree(self, rev="HEAD"):
+        """
+        Yields (path, blob_sha, size) for every regular file in rev's tree.
+        In a partial clone, blobs that were filtered out are not fetched one by one from
+        the remote: they are yielded with size None, so the caller can report them.
+        """
+        if self._partial:
+            sizes = self._local_blob_sizes()
+            output = self.repo.git.execute(["git", "ls-tree", "-r", "-z", rev], stdout_as_string=False)
+        else:
+            sizes = None
+            output = self.repo.git.execute(["git", "ls-tree", "-r", "-z", "--long", rev], stdout_as_string=False)
+
+        for entry in output.split(b"\0"):
+            if not entry:
+                continue
+            meta, _, raw_path = entry.partition(b"\t")
+            fields = meta.split()
+            if fields[0] not in FILE_MODES:
+                continue
+            sha = fields[2].decode()
+            if sizes is None:
+                size = int(fields[3])
+            else:
+                size = sizes.get(sha) # None: filtered out of the partial clone
+            yield raw_path.decode('utf-8', errors='replace'), sha, size
+
+    def _local_blob_sizes(self):
+        # --batch-all-objects only lists objects that are present locally and never fetches
+        output = self.repo.git.execute(
+            ["git", "cat-file", "--batch-all-objects", "--batch-check=%(objectname) %(objecttype) %(objectsize)"],
+            stdout_as_string=False,
+        )
+        sizes = {}
+        for line in output.splitlines():
+            sha, object_type, size = line.split()
+            if object_type == b"blob":
+                sizes[sha.decode()] = int(size)
+        return sizes
+
+    def read_blob(self, sha):
+        """Returns the raw bytes of a blob."""
+        return self.repo.git.get_object_data(sha)[3]
+
+    def open_blob(self, sha):
+        """
+        Returns a stream of a blob's bytes, for reading large blobs in chunks.
+        It must be read to the end before the next blob is read.
+        """
+        return self.repo.git.stream_object_data(sha)[3]
+
+    def close(self):
+        # Stops the persistent cat-file processes
+        self.repo.git.clear_cache()
+        self.repo.close()
@@ -1,19 +1,554 @@
+import bisect
+import hashlib
+import json
+import logging
 import re
+import threading
+import time
+
+try:
+    from re import _parser as sre_parse
+    from re import _constants as sre_constants
+except ImportError:  # Python < 3.11
+    import sre_parse
+    import sre_constants
+
+try:
+    import re2  # Optional linear-time engine (pip install google-re2)
+except ImportError:
+    re2 = None
+
+# A pattern is only prefiltered when every match must start with one of a small
+# set of literal anchors that are long enough to be selective.
+MIN_ANCHOR_LENGTH = 3
+MAX_ANCHORS_PER_PATTERN = 64
+MAX_CLASS_EXPANSION = 16
+
+# No match is longer than this, so each anchored match attempt reads a bounded window
+MAX_MATCH_LENGTH = 512
+# The time budget is checked after this many candidate positions or matches
+DEADLINE_CHECK_EVERY = 256
+# Under a time budget, patterns without an anchor run on windows of this many characters
+# (bytes for bytes text), as large files are streamed (repo_processor.STREAM_CHUNK_BYTES),
+# and the budget is also checked between windows. One window's regex run can't be cut
+# short with re, so the budget is only exact with re2's linear-time matching.
+BUDGET_WINDOW = 1024 * 1024
+
+# Lines of context scan_text gives each finding before and after its line
+CONTEXT_LINES = 2
+# Context lines are cut to this many characters (the matched line around the match), so
+# a finding in a minified bundle doesn't carry the whole bundle
+MAX_CONTEXT_LINE_LENGTH = 200
+
+NEWLINE = re.compile("\n")
+BYTES_NEWLINE = re.compile(b"\n")
+
+
+class ScanTimeout(Exception):
+    """Raised by scan_text when a text takes longer than the time budget. matches holds what was found until then."""
+    def __init__(self, matches):
+        super().__init__(f"scan time budget exceeded after {len(matches)} matches")
+        self.matches = matches
+
+
+class MatchStats:
+    """
+    Per-pattern counters of a PatternMatcher: regex runs (one per anchored match attempt,
+    one finditer pass per text for unanchored patterns), matches found and seconds spent
+    in those runs, plus the texts and bytes scanned and the time of the prefilter pass.
+    Detectors are timed as a whole, under their class name; their matches count under
+    their finding types. Each scan_text call adds its counts at once, under a lock.
+    """
+    def __init__(self):
+        self.texts = 0
+        self.bytes = 0
+        self.seconds = 0.0
+        self.prefilter_seconds = 0.0
+        # name -> [runs, matches, seconds]
+        self.patterns = {}
+        self._lock = threading.Lock()
+
+    def add(self, size, seconds, prefilter_seconds, patterns):
+        with self._lock:
+            self.texts += 1
+            self.bytes += size
+            self.seconds += seconds
+            self.prefilter_seconds += prefilter_seconds
+            self._add_patterns(patterns)
+
+    def take(self):
+        """Returns the counts (as for merge()) and resets them, e.g. to send a worker process's counts to the parent."""
+        with self._lock:
+            state = {"texts": self.texts, "bytes": self.bytes, "seconds": self.seconds,
+                     "prefilter_seconds": self.prefilter_seconds, "patterns": self.patterns}
+            self.texts, self.bytes, self.seconds, self.prefilter_seconds, self.patterns = 0, 0, 0.0, 0.0, {}
+        return state
+
+    def merge(self, state):
+        with self._lock:
+            self.texts += state["texts"]
+            self.bytes += state["bytes"]
+            self.seconds += state["seconds"]
+            self.prefilter_seconds += state["prefilter_seconds"]
+            self._add_patterns(state["patterns"])
+
+    def to_dict(self):
+        with self._lock:
+            return {
+                "texts": self.texts, "bytes": self.bytes, "seconds": self.seconds, "prefilter_seconds": self.prefilter_seconds,
+                "patterns": {name: {"runs": runs, "matches": matches, "seconds": seconds}
+                             for name, (runs, matches, seconds) in sorted(self.patterns.items())},
+            }
+
+    def _add_patterns(self, patterns):
+        for name, (runs, matches, seconds) in patterns.items():
+            entry = self.patterns.setdefault(name, [0, 0, 0.0])
+            entry[0] += runs
+            entry[1] += matches
+            entry[2] += seconds
+
 
 class PatternMatcher:
-    def __init__(self, patterns):
+    """
+    Finds config.PATTERNS in text (str) or raw bytes (bytes, mmap or a read-only memoryview).
+    Bytes are matched as they are, without decoding; their offsets are byte offsets.
+    engine: "re" or "re2" (linear-time, needs the optional google-re2 package; patterns
+    it can't compile, and everything when it isn't installed, use re).
+    max_match_length: Upper bound on the length of any match.
+    time_budget: Seconds one scan_text call may take before it raises ScanTimeout (None = no limit).
+    With re it's best-effort: it's checked between anchored match attempts and between
+    BUDGET_WINDOW windows of the other patterns, so one slow regex run on a window can
+    overshoot it; with re2 no run can take long.
+    detectors: Extra detectors run on the same text after the patterns, e.g. an EntropyDetector.
+    Each has scan_text(text, exclude, deadline) and a version; exclude holds the spans already
+    matched, so a secret isn't reported twice.
+    stats: Collect per-pattern MatchStats in self.stats (None otherwise).
+    """
+    def __init__(self, patterns, prefilter=True, engine="re", max_match_length=MAX_MATCH_LENGTH, time_budget=None, detectors=(), stats=False):
         self.patterns = patterns
-        self.compiled_patterns = {name: re.compile(regex) for name, regex in patterns.items()}
+        self.detectors = list(detectors)
+        self.stats = MatchStats() if stats else None
+        self.engine = engine
+        self.max_match_length = max_match_length
+        self.time_budget = time_budget
+        self._prefilter_enabled = prefilter
+        if engine == "re2" and re2 is None:
+            logging.getLogger(__name__).warning("google-re2 is not installed. Using the re engine.")
+        self.compiled_patterns = {name: _compile(regex, engine) for name, regex in patterns.items()}
+        self._byte_patterns = {name: _compile(regex.encode('utf-8'), engine) for name, regex in patterns.items()}
+        # Identifies the pattern set (and match cap), e.g. to invalidate cached scan results when patterns change
+        identity = {"patterns": patterns, "max_match_length": max_match_length, "offsets": "bytes", "positions": True}
+        if self.detectors:
+            identity["detectors"] = [d.version for d in self.detectors]
+        self.version = hashlib.sha256(json.dumps(identity, sort_keys=True).encode('utf-8')).hexdigest()[:16]
+
+        # anchor literal -> names of the patterns whose matches start with it
+        self.anchors = {}
+        # patterns without a usable literal prefix fall back to a full finditer
+        self.unanchored = []
+        self.prefilter = None
+
+        if prefilter:
+            for name, regex in patterns.items():
+                prefixes = _required_prefixes(re.compile(regex))
+                if not prefixes:
+                    self.unanchored.append(name)
+                    continue
+                for prefix in prefixes:
+                    self.anchors.setdefault(prefix, []).append(name)
+
+            if self.anchors:
+                trie = _trie_regex(self.anchors)
+                self.prefilter = re.compile(trie)
+                self._anchor_lengths = sorted({len(a) for a in self.anchors})
+                # The same anchors for bytes, as the UTF-8 encoding every match starts with
+                self._byte_anchors = {a.encode('utf-8'): names for a, names in self.anchors.items()}
+                self._byte_prefilter = re.compile(trie.encode('utf-8'))
+                self._byte_anchor_lengths = sorted({len(a) for a in self._byte_anchors})
+            else:
+                self.unanchored = list(self.compiled_patterns)
+
+    def __getstate__(self):
+        # Compiled patterns (re2's especially) aren't always picklable; worker processes recompile
+        return {
+            "patterns": self.patterns, "prefilter": self._prefilter_enabled, "engine": self.engine,
+            "max_match_length": self.max_match_length, "time_budget": self.time_budget,
+            "detectors": self.detectors, "stats": self.stats is not None,
+        }
+
+    def __setstate__(self, state):
+        self.__init__(**state)
+
+    def scan_text(self, text, context_lines=CONTEXT_LINES):
+        """
+        Finds every pattern in text (str or bytes-like, see the class docstring).
+        With the prefilter enabled, a single pass over the text locates the literal
+        anchors of all patterns and each full regex only runs where its anchor occurs,
+        on a window of max_match_length characters.
+        Findings (and their order) are identical to running every pattern's finditer,
+        except that no match is longer than max_match_length.
+        Each finding also gets its 1-based line and column and context_lines lines of
+        context around it (see LineIndex); context_lines=None leaves them out.
+        Raises ScanTimeout when the time budget runs out.
+        """
+        if self.stats is not None:
+            return self._scan_text_timed(text, context_lines)
+        try:
+            matches = self._scan(text)
+            if self.detectors:
+                matches.extend(self._detect(text, matches))
+        except ScanTimeout as e:
+            if context_lines is not None:
+                _add_positions(text, e.matches, context_lines)
+            raise
+        if context_lines is not None:
+            _add_positions(text, matches, context_lines)
+        return matches
+
+    def _scan_text_timed(self, text, context_lines):
+        """scan_text, adding what each pattern cost and found to self.stats."""
+        started = time.perf_counter()
+        timings = {}
+        matches = None
+        scan_seconds = None
+        try:
+            matches = self._scan(text, timings)
+            scan_seconds = time.perf_counter() - started
+            if self.detectors:
+                matches.extend(self._detect(text, matches, timings))
+        except ScanTimeout as e:
+            matches = e.matches
+            raise
+        finally:
+            if scan_seconds is None:
+                scan_seconds = time.perf_counter() - started
+            if matches is not None and context_lines is not None:
+                _add_positions(text, matches, context_lines)
+            seconds = time.perf_counter() - started
+            for m in matches or ():
+                timings.setdefault(m["type"], [0, 0, 0.0])[1] += 1
+            # What the pattern pass took beyond the regex runs went to the prefilter search
+            prefilter_seconds = 0.0
+            if self.prefilter is not None:
+                prefilter_seconds = scan_seconds - sum(entry[2] for name, entry in timings.items() if name in self.compiled_patterns)
+            self.stats.add(len(text), seconds, max(0.0, prefilter_seconds), timings)
+        return matches
+
+    def _detect(self, text, matches, timings=None):
+        deadline = time.monotonic() + self.time_budget if self.time_budget else None
+        found = []
+        exclude = sorted((m["start"], m["end"]) for m in matches)
+        for detector in self.detectors:
+            started = time.perf_counter()
+            try:
+                found.extend(detector.scan_text(text, exclude, deadline))
+            except ScanTimeout as e:
+                raise ScanTimeout(matches + found + e.matches)
+            finally:
+                if timings is not None:
+                    entry = timings.setdefault(type(detector).__name__, [0, 0, 0.0])
+                    entry[0] += 1
+                    entry[2] += time.perf_counter() - started
+        return found
+
+    def _scan(self, text, timings=None):
+        deadline = time.monotonic() + self.time_budget if self.time_budget else None
+        compiled_patterns = self.compiled_patterns if isinstance(text, str) else self._byte_patterns
+        if self.prefilter is None:
+            return self._scan_each(text, compiled_patterns, deadline, timings)
+
+        try:
+            hits = self._scan_anchored(text, compiled_patterns, deadline, timings)
+        except ScanTimeout as e:
+            hits = e.matches
+            deadline = 0 # Report what was found and stop
 
-    def scan_text(self, text, context_lines=2):
         matches = []
-        for name, pattern in self.compiled_patterns.items():
-            for match in pattern.finditer(text):
-                # Simple finding only for now. TODO: Add context.
-                matches.append({
-                    "type": name,
-                    "value": match.group(0),
-                    "start": match.start(),
-                    "end": match.end()
-                })
+        for name, pattern in compiled_patterns.items():
+            if name in hits:
+                matches.extend(self._to_finding(name, match) for match in hits[name])
+            elif name in self.unanchored and deadline != 0:
+                try:
+                    matches.extend(self._scan_each(text, {name: pattern}, deadline, timings))
+                except ScanTimeout as e:
+                    matches.extend(e.matches)
+                    deadline = 0
+        if deadline == 0:
+            raise ScanTimeout(matches)
         return matches
+
+    def _scan_anchored(self, text, compiled_patterns, deadline=None, timings=None):
+        """
+        Single pass over text: returns {name: [match, ...]} for anchored patterns.
+        Matches of one pattern never overlap, exactly like finditer.
+        Raises ScanTimeout (with the hits so far) past the deadline.
+        timings: Optional {name: [runs, matches, seconds]} the match attempts are added to.
+        """
+        hits = {}
+        last_end = {}
+        if isinstance(text, str):
+            anchors, lengths, search = self.anchors, self._anchor_lengths, self.prefilter.search
+        else:
+            anchors, lengths, search = self._byte_anchors, self._byte_anchor_lengths, self._byte_prefilter.search
+        max_length = self.max_match_length
+        checks = 0
+
+        candidate = search(text)
+        while candidate:
+            pos = candidate.start()
+            checks += 1
+            if deadline and checks % DEADLINE_CHECK_EVERY == 0 and time.monotonic() > deadline:
+                raise ScanTimeout(hits)
+            for length in lengths:
+                names = anchors.get(text[pos:pos + length])
+                if not names:
+                    continue
+                for name in names:
+                    if pos < last_end.get(name, 0):
+                        continue
+                    if timings is None:
+                        match = compiled_patterns[name].match(text, pos, pos + max_length)
+                    else:
+                        started = time.perf_counter()
+                        match = compiled_patterns[name].match(text, pos, pos + max_length)
+                        entry = timings.setdefault(name, [0, 0, 0.0])
+                        entry[0] += 1
+                        entry[2] += time.perf_counter() - started
+                    if match:
+                        hits.setdefault(name, []).append(match)
+                        last_end[name] = match.end()
+            # Anchors may overlap (e.g. "sk-" followed by "-----BEGIN"), so resume right after pos
+            candidate = search(text, pos + 1)
+        return hits
+
+    def _scan_each(self, text, compiled_patterns, deadline=None, timings=None):
+        # finditer per pattern; matches longer than the cap are cut to max_match_length
+        matches = []
+        for name, pattern in compiled_patterns.items():
+            started = time.perf_counter()
+            windowed = deadline and isinstance(pattern, re.Pattern) and len(text) > BUDGET_WINDOW
+            try:
+                found = self._finditer_windows(text, pattern, deadline) if windowed else pattern.finditer(text)
+                for count, match in enumerate(found, 1):
+                    if match.end() - match.start() > self.max_match_length:
+                        match = pattern.match(text, match.start(), match.start() + self.max_match_length) or match
+                    matches.append(self._to_finding(name, match))
+                    if deadline and count % DEADLINE_CHECK_EVERY == 0 and time.monotonic() > deadline:
+                        raise ScanTimeout(matches)
+            except ScanTimeout:
+                raise ScanTimeout(matches)
+            finally:
+                if timings is not None:
+                    entry = timings.setdefault(name, [0, 0, 0.0])
+                    entry[0] += 1
+                    entry[2] += time.perf_counter() - started
+            if deadline and time.monotonic() > deadline:
+                raise ScanTimeout(matches)
+        return matches
+
+    def _finditer_windows(self, text, pattern, deadline):
+        """
+        pattern.finditer(text) run window by window: each yields the matches starting in
+        its BUDGET_WINDOW characters, reading max_match_length past them so no match up to
+        the cap is cut. Raises ScanTimeout (without matches) past the deadline between windows.
+        """
+        pos = 0
+        while True:
+            limit = pos + BUDGET_WINDOW
+            for match in pattern.finditer(text, pos, limit + self.max_match_length):
+                if match.start() >= limit:
+                    break
+                yield match
+                # As finditer: the next match starts after this one
+                pos = max(match.end(), match.start() + 1)
+            if limit >= len(text):
+                return
+            if time.monotonic() > deadline:
+                raise ScanTimeout(())
+            pos = max(pos, limit)
+
+    @staticmethod
+    def _to_finding(name, match):
+        value = match.group(0)
+        return {
+            "type": name,
+            "value": value if isinstance(value, str) else bytes(value).decode('utf-8', errors='replace'),
+            "start": match.start(),
+            "end": match.end()
+        }
+
+
+class LineIndex:
+    """
+    Start offsets of the lines of a text, found in one pass when it's created, so
+    locating a match is a binary search however many matches or lines there are.
+    """
+    def __init__(self, text):
+        self.text = text
+        newline = NEWLINE if isinstance(text, str) else BYTES_NEWLINE
+        self.starts = [0]
+        self.starts.extend(m.end() for m in newline.finditer(text))
+
+    def line_of(self, offset):
+        """The 1-based line holding offset."""
+        return bisect.bisect_right(self.starts, offset)
+
+    def line_bounds(self, line):
+        """(start, end) offsets of a 1-based line, without its line break."""
+        start = self.starts[line - 1]
+        end = self.starts[line] - 1 if line < len(self.starts) else len(self.text)
+        return start, end
+
+    def column_of(self, offset, line, known=None):
+        """
+        The 1-based column of offset, counted in characters.
+        known: (offset, column) of an earlier position on the same line to count from,
+        so columns of many matches on one long line cost one pass over it.
+        """
+        start, column = known or (self.starts[line - 1], 1)
+        return column + len(_as_str(self.text[start:offset]))
+
+    def context(self, line, lines, start=None, end=None):
+        """
+        Lines line-lines..line+lines, each cut to MAX_CONTEXT_LINE_LENGTH
+        (the line itself around start..end, when given).
+        """
+        first, last = max(1, line - lines), min(len(self.starts), line + lines)
+        block_start, block_end = self.starts[first - 1], self.line_bounds(last)[1]
+        if all(self.starts[n] - self.starts[n - 1] <= MAX_CONTEXT_LINE_LENGTH for n in range(first, last)) \
+                and block_end - self.starts[last - 1] <= MAX_CONTEXT_LINE_LENGTH:
+            # No line to cut (the usual case): one slice for the whole block
+            return _as_str(self.text[block_start:block_end]).replace("\r\n", "\n")
+        context = []
+        for number in range(first, last + 1):
+            line_start, line_end = self.line_bounds(number)
+            if number == line and start is not None and line_end - line_start > MAX_CONTEXT_LINE_LENGTH:
+                margin = max(0, (MAX_CONTEXT_LINE_LENGTH - (end - start)) // 2)
+                line_start = max(line_start, start - margin)
+                line_end = min(line_end, max(end + margin, line_start + MAX_CONTEXT_LINE_LENGTH))
+            context.append(_as_str(self.text[line_start:line_end]).rstrip("\r")[:MAX_CONTEXT_LINE_LENGTH])
+        return "\n".join(context)
+
+
+def _add_positions(text, matches, context_lines):
+    """Adds "line", "column" and "context" to each match, with one LineIndex for the text."""
+    if not matches:
+        return
+    index = LineIndex(text)
+    previous_line, known = None, None
+    for m in sorted(matches, key=lambda m: m["start"]):
+        line = index.line_of(m["start"])
+        m["line"] = line
+        m["column"] = index.column_of(m["start"], line, known if line == previous_line else None)
+        previous_line, known = line, (m["start"], m["column"])
+        m["context"] = index.context(line, context_lines, m["start"], m["end"])
+
+
+def _as_str(data):
+    return data if isinstance(data, str) else bytes(data).decode('utf-8', errors='replace')
+
+
+def _compile(regex, engine):
+    if engine == "re2" and re2 is not None:
+        try:
+            return re2.compile(regex)
+        except Exception as e:
+            logging.getLogger(__name__).warning(f"re2 can't compile {regex!r} ({e}). Using re for it.")
+    return re.compile(regex)
+
+
+def _required_prefixes(pattern):
+    """
+    Returns the literal strings one of which every match of the compiled pattern starts with,
+    or None when no selective set of anchors can be derived.
+    """
+    if pattern.flags & re.IGNORECASE:
+        return None
+    try:
+        prefixes, _ = _literal_prefixes(sre_parse.parse(pattern.pattern, pattern.flags))
+    except Exception:
+        return None
+    if not prefixes or min(len(p) for p in prefixes) < MIN_ANCHOR_LENGTH:
+        return None
+    return set(prefixes)
+
+
+def _literal_prefixes(items):
+    """
+    Walks a parsed regex sequence and collects the literal prefixes it can start with.
+    Returns (prefixes, complete) where complete means the whole sequence is a fixed literal,
+    so the caller may keep extending the prefixes with whatever follows it.
+    """
+    prefixes = [""]
+    for op, av in items:
+        if op is sre_constants.LITERAL:
+            prefixes = [p + chr(av) for p in prefixes]
+            continue
+
+        if op is sre_constants.IN:
+            chars = _class_chars(av)
+            if not chars or len(prefixes) * len(chars) > MAX_ANCHORS_PER_PATTERN:
+                return prefixes, False
+            prefixes = [p + c for p in prefixes for c in chars]
+            continue
+
+        if op is sre_constants.SUBPATTERN:
+            _, add_flags, _, sub_items = av
+            if add_flags & re.IGNORECASE:
+                return prefixes, False
+            sub_prefixes, complete = _literal_prefixes(sub_items)
+        elif op is sre_constants.BRANCH:
+            sub_prefixes, complete = [], True
+            for alternative in av[1]:
+                alt_prefixes, alt_complete = _literal_prefixes(alternative)
+                sub_prefixes.extend(alt_prefixes)
+                complete = complete and alt_complete
+        else:
+            # Repeats, categories, anchors etc. end the literal prefix
+            return prefixes, False
+
+        if len(prefixes) * len(sub_prefixes) > MAX_ANCHORS_PER_PATTERN:
+            return prefixes, False
+        prefixes = [p + s for p in prefixes for s in sub_prefixes]
+        if not complete:
+            return prefixes, False
+
+    return prefixes, True
+
+
+def _class_chars(items):
+    """Expands a small character class like ["'] or [sr] into its characters."""
+    chars = []
+    for op, av in items:
+        if op is sre_constants.LITERAL:
+            chars.append(chr(av))
+        elif op is sre_constants.RANGE and av[1] - av[0] < MAX_CLASS_EXPANSION:
+            chars.extend(chr(c) for c in range(av[0], av[1] + 1))
+        else:
+            return None
+    return sorted(set(chars))
+
+
+def _trie_regex(words):
+    """
+    Builds a regex matching any of the words, factored as a trie so the engine
+    only tries the branches sharing the next character instead of every word.
+    A word that is a prefix of a longer one ends its branch: the caller checks
+    all anchor lengths at each candidate position anyway.
+    """
+    trie = {}
+    for word in words:
+        node = trie
+        for char in word:
+            node = node.setdefault(char, {})
+        node[""] = {}
+
+    def build(node):
+        if "" in node:
+            return ""
+        branches = [re.escape(char) + build(child) for char, child in sorted(node.items())]
+        if len(branches) == 1:
+            return branches[0]
+        return "(?:" + "|".join(branches) + ")"
+
+    return build(trie)
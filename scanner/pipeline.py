@@ -0,0 +1,138 @@
+import logging
+import queue
+import threading
+import time
+
+from scanner.metrics import Histogram, SECONDS_BUCKETS
+
+# Marks the end of the input for a stage's workers
+_DONE = object()
+
+
+class Stage:
+    """
+    One step of a Pipeline.
+    func(item) returns the item handed to the next stage, or None to drop it.
+    If func raises, the item is dropped and on_error(item, exception) is called.
+    """
+    def __init__(self, name, func, workers=1, queue_size=None, on_error=None):
+        self.name = name
+        self.func = func
+        self.on_error = on_error
+        self.workers = max(1, int(workers))
+        # Bounded input queue: upstream stages block instead of running arbitrarily far ahead
+        self.queue_size = queue_size or 2 * self.workers
+        self.processed = 0
+        self.failed = 0
+        self.busy_seconds = 0.0
+        self.cpu_seconds = 0.0
+        # Wall time per item, e.g. per repository
+        self.item_seconds = Histogram(SECONDS_BUCKETS)
+        self._lock = threading.Lock()
+
+    def _record(self, elapsed, cpu, ok):
+        with self._lock:
+            self.busy_seconds += elapsed
+            self.cpu_seconds += cpu
+            self.item_seconds.observe(elapsed)
+            if ok:
+                self.processed += 1
+            else:
+                self.failed += 1
+
+
+class Pipeline:
+    """
+    Runs items through a chain of stages, each with its own pool of worker threads
+    connected by bounded queues, so different items can be in different stages at once.
+    """
+    def __init__(self, stages):
+        self.stages = stages
+        self.logger = logging.getLogger(__name__)
+        self.wall_seconds = 0.0
+
+    def run(self, items):
+        """
+        Feeds items through all stages and blocks until every item has left the pipeline.
+        Returns the outputs of the last stage (in completion order).
+        """
+        start = time.perf_counter()
+        queues = [queue.Queue(maxsize=stage.queue_size) for stage in self.stages]
+        outputs = []
+        outputs_lock = threading.Lock()
+        threads = []
+
+        for index, stage in enumerate(self.stages):
+            next_queue = queues[index + 1] if index + 1 < len(self.stages) else None
+            next_workers = self.stages[index + 1].workers if next_queue else 0
+            remaining = [stage.workers]
+            remaining_lock = threading.Lock()
+
+            for worker in range(stage.workers):
+                thread = threading.Thread(
+                    target=self._worker,
+                    args=(stage, queues[index], next_queue, next_workers, remaining, remaining_lock, outputs, outputs_lock),
+                    name=f"{stage.name}-{worker}",
+                    daemon=True,
+                )
+                thread.start()
+                threads.append(thread)
+
+        for item in items:
+            queues[0].put(item)
+        for _ in range(self.stages[0].workers):
+            queues[0].put(_DONE)
+
+        for thread in threads:
+            thread.join()
+
+        self.wall_seconds = time.perf_counter() - start
+        return outputs
+
+    def _worker(self, stage, in_queue, next_queue, next_workers, remaining, remaining_lock, outputs, outputs_lock):
+        while True:
+            item = in_queue.get()
+            if item is _DONE:
+                break
+
+            started, cpu_started = time.perf_counter(), time.thread_time()
+            try:
+                result = stage.func(item)
+                ok = True
+            except Exception as e:
+                self.logger.error(f"Pipeline stage '{stage.name}' failed: {e}")
+                result = None
+                ok = False
+                if stage.on_error:
+                    try:
+                        stage.on_error(item, e)
+                    except Exception as hook_error:
+                        self.logger.error(f"Pipeline stage '{stage.name}' error handler failed: {hook_error}")
+            stage._record(time.perf_counter() - started, time.thread_time() - cpu_started, ok)
+
+            if result is None:
+                continue
+            if next_queue is not None:
+                next_queue.put(result)
+            else:
+                with outputs_lock:
+                    outputs.append(result)
+
+        # The last worker of a stage to finish closes the next stage's input
+        with remaining_lock:
+            remaining[0] -= 1
+            last = remaining[0] == 0
+        if last and next_queue is not None:
+            for _ in range(next_workers):
+                next_queue.put(_DONE)
+
+    def summary(self):
+        """One line per stage with item counts and busy time, plus the overall wall time."""
+        lines = []
+        for stage in self.stages:
+            lines.append(
+                f"{stage.name}: {stage.processed} ok, {stage.failed} failed, "
+                f"{stage.busy_seconds:.2f}s busy ({stage.cpu_seconds:.2f}s CPU) across {stage.workers} worker(s)"
+            )
+        lines.append(f"wall: {self.wall_seconds:.2f}s")
+        return lines
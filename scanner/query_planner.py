@@ -0,0 +1,220 @@
+import json
+import math
+import os
+import threading
+from datetime import date, datetime, timedelta
+import config
+
+# Valid path relative for execution from root
+CACHE_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "cache")
+QUERY_PLANNER_FILE = os.path.join(CACHE_DIR, "query_planner.json")
+
+PER_PAGE = 100
+RESULT_CAP = 1000  # The search API never returns more than this many results per query
+GITHUB_LAUNCH = date(2008, 1, 1)
+# Repo size buckets in KB (None = unbounded); "size:>0" skips empty repos as before
+SIZE_BUCKETS = [(1, 100), (101, 1000), (1001, 10000), (10001, None)]
+# Weight of the global average when estimating a slice's yield from few requests
+PRIOR_REQUESTS = 2
+# Weight of the exploration bonus for slices with few requests
+EXPLORATION = 0.5
+
+
+class SearchSlice:
+    """
+    A disjoint part of the search space: a created-date window and a size bucket.
+    Slices are split until each holds at most RESULT_CAP results, so every result is reachable by paging.
+    """
+    def __init__(self, created_from, created_to, size_min, size_max, requests=0, new_repos=0, total_count=None, next_page=1, prior=None):
+        self.created_from = created_from
+        self.created_to = created_to
+        self.size_min = size_min
+        self.size_max = size_max
+        # Expected yield before the slice's own requests say otherwise (inherited when split)
+        self.prior = prior
+        self.requests = requests
+        self.new_repos = new_repos
+        self.total_count = total_count
+        self.next_page = next_page
+
+    @property
+    def exhausted(self):
+        if self.total_count is None:
+            return False
+        return (self.next_page - 1) * PER_PAGE >= min(self.total_count, RESULT_CAP)
+
+    def qualifiers(self):
+        size = f"size:{self.size_min}..{self.size_max}" if self.size_max is not None else f"size:>={self.size_min}"
+        return [f"created:{self.created_from.isoformat()}..{self.created_to.isoformat()}", size]
+
+    @property
+    def mean_yield(self):
+        return self.new_repos / self.requests if self.requests else self.prior
+
+    def split(self):
+        """
+        Halves the date window, or the size range for single-day windows. Returns None if indivisible.
+        The halves start from this slice's yield as their prior.
+        """
+        prior = self.mean_yield
+        if self.created_from < self.created_to:
+            middle = self.created_from + (self.created_to - self.created_from) // 2
+            bounds = [(self.created_from, middle, self.size_min, self.size_max),
+                      (middle + timedelta(days=1), self.created_to, self.size_min, self.size_max)]
+        elif self.size_max is None:
+            bounds = [(self.created_from, self.created_to, self.size_min, self.size_min * 10 - 1),
+                      (self.created_from, self.created_to, self.size_min * 10, None)]
+        elif self.size_min < self.size_max:
+            middle = (self.size_min + self.size_max) // 2
+            bounds = [(self.created_from, self.created_to, self.size_min, middle),
+                      (self.created_from, self.created_to, middle + 1, self.size_max)]
+        else:
+            return None
+        return [SearchSlice(*b, prior=prior) for b in bounds]
+
+    def to_dict(self):
+        return {
+            "created_from": self.created_from.isoformat(),
+            "created_to": self.created_to.isoformat(),
+            "size_min": self.size_min,
+            "size_max": self.size_max,
+            "requests": self.requests,
+            "new_repos": self.new_repos,
+            "total_count": self.total_count,
+            "next_page": self.next_page,
+            "prior": self.prior,
+        }
+
+    @classmethod
+    def from_dict(cls, data):
+        data = dict(data)
+        data["created_from"] = date.fromisoformat(data["created_from"])
+        data["created_to"] = date.fromisoformat(data["created_to"])
+        return cls(**data)
+
+
+class QueryPlanner:
+    """
+    Plans search requests over disjoint slices of the search space instead of random queries.
+    Each slice's yield (new, non-excluded repos per request) is tracked and requests go to the
+    slice with the best upper confidence bound on it, so high-yield slices get most requests
+    while untried ones are still explored. State is kept across runs in the cache directory.
+    """
+    def __init__(self, max_stars=10, min_created_date=None, state_file=QUERY_PLANNER_FILE, today=None):
+        self.base_qualifiers = [f"stars:<={max_stars}", f"pushed:>{config.MIN_PUSHED_DATE}"]
+        self.start_date = GITHUB_LAUNCH
+        if min_created_date:
+            self.start_date = max(GITHUB_LAUNCH, date.fromisoformat(min_created_date) + timedelta(days=1))
+        self.today = today or date.today()
+        self.state_file = state_file
+        # Slices learned for other filters don't apply to these
+        self.signature = " ".join(self.base_qualifiers + [f"created:>={self.start_date.isoformat()}"])
+        self.slices = []
+        self._in_flight = set()
+        self._lock = threading.Lock()
+        self._load()
+        self._extend_to(self.today)
+
+    def next_request(self):
+        """Returns (slice, params) for the next search page to fetch."""
+        with self._lock:
+            candidates = [s for s in self.slices if not s.exhausted and id(s) not in self._in_flight]
+            if not candidates and all(s.exhausted for s in self.slices):
+                # Everything was paged through: start over, new repos keep matching old slices
+                for s in self.slices:
+                    s.next_page = 1
+                candidates = [s for s in self.slices if id(s) not in self._in_flight]
+            if not candidates:
+                candidates = [s for s in self.slices if not s.exhausted] or self.slices
+
+            total_requests = sum(s.requests for s in self.slices)
+            total_new = sum(s.new_repos for s in self.slices)
+            prior = total_new / total_requests if total_requests else PER_PAGE
+            chosen = max(candidates, key=lambda s: self._score(s, prior, total_requests))
+            page = chosen.next_page
+            chosen.next_page += 1
+            if chosen.total_count is None:
+                # Until the result count is known, don't request further pages that may be empty
+                self._in_flight.add(id(chosen))
+
+        params = {
+            "q": " ".join(self.base_qualifiers + chosen.qualifiers()),
+            "sort": "updated",
+            "order": "desc",
+            "per_page": PER_PAGE,
+            "page": page,
+        }
+        return chosen, params
+
+    def record(self, search_slice, total_count, new_repos):
+        """
+        Records the outcome of a request from next_request: the result count the API
+        reported (None if the request failed) and how many new repos it yielded.
+        """
+        with self._lock:
+            self._in_flight.discard(id(search_slice))
+            if total_count is None:
+                return # Failed requests say nothing about the slice's yield
+            search_slice.requests += 1
+            search_slice.new_repos += new_repos
+            search_slice.total_count = total_count
+
+            if total_count > RESULT_CAP and search_slice in self.slices:
+                children = search_slice.split()
+                if children:
+                    index = self.slices.index(search_slice)
+                    self.slices[index:index + 1] = children
+
+    @staticmethod
+    def _score(search_slice, prior, total_requests):
+        # Upper confidence bound on new repos per request, starting from the slice's prior
+        if search_slice.prior is not None:
+            prior = search_slice.prior
+        mean = (search_slice.new_repos + PRIOR_REQUESTS * prior) / (search_slice.requests + PRIOR_REQUESTS)
+        bonus = EXPLORATION * max(prior, 1) * math.sqrt(math.log(total_requests + 1) / (search_slice.requests + 1))
+        return mean + bonus
+
+    def _extend_to(self, today):
+        """
+        Covers the days from the last covered one up to today with one slice per size bucket.
+        Slices start coarse and are split only when the API reports more than RESULT_CAP results,
+        so empty parts of the space cost few requests.
+        """
+        covered_to = max((s.created_to for s in self.slices), default=self.start_date - timedelta(days=1))
+        start = covered_to + timedelta(days=1)
+        if start <= today:
+            for size_min, size_max in SIZE_BUCKETS:
+                self.slices.append(SearchSlice(start, today, size_min, size_max))
+
+    def _load(self):
+        if not self.state_file or not os.path.isfile(self.state_file):
+            return
+        try:
+            with open(self.state_file, "r", encoding="utf-8") as f:
+                state = json.load(f)
+            if state.get("signature") == self.signature:
+                self.slices = [SearchSlice.from_dict(s) for s in state.get("slices", [])]
+        except (OSError, ValueError, TypeError, KeyError) as e:
+            print(f"Ignoring unreadable query planner state: {e}")
+            self.slices = []
+
+    def save(self):
+        if not self.state_file:
+            return
+        try:
+            os.makedirs(os.path.dirname(self.state_file), exist_ok=True)
+            temp_file = f"{self.state_file}.tmp"
+            with open(temp_file, "w", encoding="utf-8") as f:
+                json.dump({
+                    "signature": self.signature,
+                    "saved_at": datetime.now().isoformat(timespec="seconds"),
+                    "slices": [s.to_dict() for s in self.slices],
+                }, f)
+            os.replace(temp_file, self.state_file)
+        except OSError as e:
+            print(f"Failed to save query planner state: {e}")
+
+    def summary(self):
+        requests = sum(s.requests for s in self.slices)
+        new_repos = sum(s.new_repos for s in self.slices)
+        return f"{len(self.slices)} slices, {new_repos} new repos over {requests} requests"
@@ -1,13 +1,58 @@
+import codecs
 import git
+import hashlib
+import heapq
 import os
+import pickle
+import re
 import shutil
 import stat
+import threading
+import time
 import logging
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
 from datetime import datetime, timezone, timedelta
+from scanner.clone_strategy import CloneStrategy
+from scanner.metrics import BYTES_BUCKETS
+from scanner.exclusions import is_binary, SNIFF_BYTES, REASON_BINARY, REASON_EXCLUDED, REASON_TOO_LARGE
+from scanner.finding import Finding, FindingIndex, KIND_FILE, KIND_FILE_DIFF, KIND_COMMIT_MESSAGE
+from scanner.object_store import ObjectStoreReader, REASON_NOT_FETCHED
+from scanner.pattern_matcher import ScanTimeout, MAX_MATCH_LENGTH, CONTEXT_LINES
+from scanner.scan_cache import ScanCache
+
+# Below these sizes the pool's IPC costs more than the scan itself
+PARALLEL_MIN_FILES = 64
+PARALLEL_MIN_BYTES = 1024 * 1024
+CHUNKS_PER_PROCESS = 4
+# Workers never fork from the multithreaded pipeline: a child could inherit a lock (logging,
+# sqlite, a queue) held by another thread at fork time and deadlock on it
+POOL_START_METHOD = "forkserver" if "forkserver" in multiprocessing.get_all_start_methods() else "spawn"
+
+# Files and blobs larger than this are read and scanned in windows of STREAM_CHUNK_BYTES,
+# each followed by STREAM_OVERLAP_BYTES of the next so no match is cut at a boundary
+STREAM_MIN_BYTES = 4 * 1024 * 1024
+STREAM_CHUNK_BYTES = 1024 * 1024
+STREAM_OVERLAP_BYTES = MAX_MATCH_LENGTH
+
+# Delimiters of the commit header and message in the `git log` history stream
+HISTORY_COMMIT_MARKER = b"\x1e"
+HISTORY_MESSAGE_END = b"\x1f"
+# "@@ -<old start>[,<count>] +<new start>[,<count>] @@" of a patch hunk
+HUNK_HEADER = re.compile(rb"@@ -\d+(?:,\d+)? \+(\d+)")
 
 class RepoProcessor:
-    def __init__(self, temp_dir="cache"):
+    def __init__(self, temp_dir="cache", scan_cache=None, exclusions=None):
         self.temp_dir = temp_dir
+        # Optional ScanCache consulted before scanning a file or diff
+        self.scan_cache = scan_cache
+        # Optional ExclusionRules for paths, file sizes and binary content
+        self.exclusions = exclusions
+        # Optional RunMetrics getting file listing times and bytes read
+        self.metrics = None
+        self._pool = None
+        self._pool_key = None
+        self._pool_lock = threading.Lock()
         if not os.path.exists(self.temp_dir):
             os.makedirs(self.temp_dir)
 
@@ -30,145 +75,828 @@ class RepoProcessor:
             except Exception as e:
                 print(f"Error deleting {repo_path}: {e}")
 
-    def clone_repo(self, repo_url, repo_name):
+    def clone_repo(self, repo_url, repo_name, strategy=None):
         """
         Clones a repository to the temp directory.
+        strategy: CloneStrategy picking depth, checkout and filters (default: depth 100 with checkout).
         Returns the path to the cloned repo or None if failed.
         """
         repo_path = os.path.join(self.temp_dir, repo_name)
         self.delete_repo(repo_path) # Clean up previous run if exists
+        strategy = strategy or CloneStrategy()
             
         try:
-            print(f"Cloning {repo_url} to {repo_path}...")
-            git.Repo.clone_from(repo_url, repo_path, depth=100) # Clone with depth to save time, unless we need full history
+            print(f"Cloning {repo_url} to {repo_path} ({strategy})...")
+            git.Repo.clone_from(repo_url, repo_path, **strategy.clone_kwargs())
             return repo_path
         except Exception as e:
+            if strategy.shallow_since:
+                # --shallow-since fails when no commit is that recent; the tip alone is enough then
+                self.delete_repo(repo_path)
+                fallback = CloneStrategy(depth=1, single_branch=strategy.single_branch, checkout=strategy.checkout, blob_limit=strategy.blob_limit)
+                return self.clone_repo(repo_url, repo_name, fallback)
             print(f"Failed to clone {repo_url}: {e}")
             return None
 
-    def scan_history(self, repo_path, depth=10, scanner_func=None, max_file_age_months=None):
+    def object_bytes(self, repo_path):
+        """Size of the repository's object database (loose objects and packs), or 0 if unknown."""
+        try:
+            output = git.Repo(repo_path).git.count_objects("-v")
+        except Exception:
+            return 0
+        counts = dict(line.split(": ", 1) for line in output.splitlines() if ": " in line)
+        return (int(counts.get("size", 0)) + int(counts.get("size-pack", 0))) * 1024
+
+    def head_sha(self, repo_path):
+        """Returns the commit SHA checked out (or cloned) at repo_path, or None."""
+        try:
+            return git.Repo(repo_path).head.commit.hexsha
+        except Exception:
+            return None
+
+    def update_repo(self, repo_path, checkout=False):
         """
-        Scans the commit history for secrets.
-        scanner_func: Callback function (text) -> matches
+        Fetches the remote's HEAD into an existing clone and moves HEAD (and the
+        working tree, with checkout) to it. Only objects the clone lacks are downloaded.
+        Returns False if the clone can't be updated.
         """
-        results = []
         try:
             repo = git.Repo(repo_path)
-            # Use 'main' or 'master' or 'HEAD'
-            commits = list(repo.iter_commits('HEAD', max_count=depth if isinstance(depth, int) else None))
-            
-            print(f"Scanning {len(commits)} commits...")
-            
-            # Calculate cutoff date if needed
-            cutoff_date = None
-            if max_file_age_months and max_file_age_months > 0:
-                cutoff_date = datetime.now(timezone.utc) - timedelta(days=max_file_age_months*30)
-            
-            for commit in commits:
-                # Check commit age
-                if cutoff_date and commit.committed_datetime < cutoff_date:
-                    # If this commit is too old, and we assume commits are ordered, we could break?
-                    # But branches/merges might make it non-linear. safely continue or break?
-                    # Usually iter_commits is reverse chronological.
-                    # Let's break to be efficient, assuming mostly linear history from HEAD.
-                    # Or just continue to be safe. Let's continue.
-                    continue
+            repo.git.fetch("origin", "HEAD")
+            if checkout:
+                repo.git.reset("--hard", "FETCH_HEAD")
+            else:
+                repo.git.update_ref("HEAD", "FETCH_HEAD")
+            return True
+        except Exception as e:
+            print(f"Failed to update {repo_path}: {e}")
+            return False
+
+    def deepen(self, repo_path, rev, depth):
+        """
+        Makes sure the `depth` commits from rev are in the clone with their parents, so none
+        of them is diffed as a root commit at a shallow clone's boundary. A clone made for
+        a HEAD the remote has since moved past lacks some of them: they are fetched once.
+        Returns False if the boundary is still among them.
+        """
+        try:
+            repo = git.Repo(repo_path)
+            for attempt in range(2):
+                shallow_file = os.path.join(repo.git_dir, "shallow")
+                if not os.path.exists(shallow_file):
+                    return True
+                with open(shallow_file, 'r', encoding='utf-8') as f:
+                    boundary = set(f.read().split())
+                if boundary.isdisjoint(repo.git.rev_list(f"--max-count={depth}", rev).split()):
+                    return True
+                if attempt == 0:
+                    missing = depth + 1 - int(repo.git.rev_list("--count", rev))
+                    repo.git.fetch(f"--deepen={max(missing, 1)}", "origin")
+            return False
+        except Exception as e:
+            print(f"Failed to deepen {repo_path}: {e}")
+            return False
 
-                # Scan commit message
-                if scanner_func:
-                    msg_matches = scanner_func(commit.message)
-                    for m in msg_matches:
-                        m['commit'] = commit.hexsha
-                        m['location'] = "commit_message"
-                        results.append(m)
-
-                # Scan diffs (changes in this commit)
-                # If it's the first commit, diff against empty tree
-                if not commit.parents:
-                    # Initial commit - scan all files in tree
-                     # This might be heavy, but it's only one commit.
-                     pass # TODO: Handle initial commit better?
-                else:
-                    diffs = commit.diff(commit.parents[0], create_patch=True)
-                    for diff in diffs:
-                        # We only care about added/modified content
-                        # diff.diff contains the patch text (metadata + content)
-                        # or we can read the blob if exist
-                        text_to_scan = ""
-                        
-                        # Try to get patch (diff text)
-                        try:
-                            # Decode bytes to string
-                            text_to_scan = diff.diff.decode('utf-8', errors='ignore')
-                        except:
-                            continue
-                            
-                        if scanner_func and text_to_scan:
-                            matches = scanner_func(text_to_scan)
-                            for m in matches:
-                                m['commit'] = commit.hexsha
-                                m['location'] = f"file_diff: {diff.b_path}"
-                                results.append(m)
-                                
+    def is_ancestor(self, repo_path, old_sha, new_sha="HEAD"):
+        """True if old_sha is in the clone and reachable from new_sha (i.e. history wasn't rewritten)."""
+        try:
+            git.Repo(repo_path).git.merge_base("--is-ancestor", old_sha, new_sha)
+            return True
+        except git.GitCommandError:
+            return False
+
+    def changed_files(self, repo_path, old_sha, new_sha="HEAD"):
+        """Repo-relative paths of the files added or modified between two commits."""
+        repo = git.Repo(repo_path)
+        output = repo.git.execute(
+            ["git", "-c", "core.quotePath=false", "diff", "--name-only", "-z", "--no-renames", "--diff-filter=d", old_sha, new_sha],
+            stdout_as_string=False,
+        )
+        return {path.decode('utf-8', errors='replace') for path in output.split(b"\0") if path}
+
+    def scan_history(self, repo_path, depth=10, scanner_func=None, max_file_age_months=None, since_sha=None, report=None, deadline=None, cursor=None):
+        """
+        Scans the commit history for secrets.
+        scanner_func: Callback function (bytes) -> matches, e.g. PatternMatcher.scan_text; all scans pass raw, undecoded bytes
+        since_sha: Only scan the commits after this one (incremental rescans); depth is ignored then.
+        A secret repeated across commits at the same place is returned once, with its
+        first- and last-seen commits.
+        report: Optional ScanReport recording diffs only partially scanned in time.
+        deadline: time.time() after which no further commits are scanned.
+        cursor: Optional HistoryCursor (utils.run_manifest). The scan continues from the
+        HEAD and commit the cursor's last checkpoint recorded, with its findings, and
+        checkpoints its own progress to it after each commit. If that HEAD left the clone,
+        or the clone can't be deepened to its remaining commits, it starts over.
+        """
+        results = FindingIndex()
+        rev = None
+        skip = 0
+        on_commit = None
+        if cursor is not None:
+            resumable = bool(cursor.head) and self.is_ancestor(repo_path, cursor.head)
+            if cursor.head and not resumable:
+                print(f"Checkpointed commit {cursor.head[:12]} is not in the clone anymore. Scanning from the start.")
+            elif resumable and not since_sha and depth and not self.deepen(repo_path, cursor.head, depth):
+                # The remote moved on and the clone's shallow boundary cuts into the commits left
+                print(f"History below checkpointed commit {cursor.head[:12]} is not in the clone. Scanning from the start.")
+                resumable = False
+            if resumable:
+                print(f"Continuing the history scan of {cursor.head[:12]} after {cursor.commits} commits.")
+                rev, skip = cursor.head, cursor.commits
+                for finding in cursor.findings():
+                    results.add(finding)
+            else:
+                # Later attempts must count commits from the same HEAD
+                rev = self.head_sha(repo_path)
+
+            def on_commit(commit_count):
+                cursor.save(rev, skip + commit_count, results)
+        try:
+            for finding in self.iter_history(repo_path, depth=depth, scanner_func=scanner_func, max_file_age_months=max_file_age_months, since_sha=since_sha, report=report, deadline=deadline, rev=rev, skip=skip, on_commit=on_commit):
+                results.add(finding)
         except Exception as e:
             print(f"Error scanning history: {e}")
             
-        return results
+        return results.findings()
 
-    def scan_current_files(self, repo_path, scanner_func, max_file_age_months=None):
+    def iter_history(self, repo_path, depth=10, scanner_func=None, max_file_age_months=None, since_sha=None, report=None, deadline=None, rev=None, skip=0, on_commit=None):
         """
-        Scans the current checkout files on disk.
+        Streams the last `depth` commits from a single `git log --patch` process and
+        yields a Finding for every match as each commit message and file diff is parsed.
+        rev: Commit to start from instead of HEAD; skip: commits (in log order) to leave out
+        first, of the `depth`. on_commit(count) is called once each commit's findings have
+        all been yielded, with the number of commits done.
+        Only added lines are scanned; their line numbers in the new file come from the
+        hunk headers, and context is limited to added lines adjacent in the file.
+        Root commits are diffed against the empty tree,
+        so their whole tree is scanned; merges are diffed against their first parent.
+        With a scan cache, diffs are keyed by their "<old blob>..<new blob>" pair.
         """
-        results = []
-        
-        cutoff_timestamp = 0
+        # Calculate cutoff date if needed
+        cutoff_timestamp = None
         if max_file_age_months and max_file_age_months > 0:
-             # Unix timestamp for cutoff
-             cutoff_timestamp = (datetime.now() - timedelta(days=max_file_age_months*30)).timestamp()
+            cutoff_timestamp = (datetime.now(timezone.utc) - timedelta(days=max_file_age_months*30)).timestamp()
+
+        command = [
+            "git", "-c", "core.quotePath=false", "log", f"{since_sha}..{rev or 'HEAD'}" if since_sha else rev or "HEAD",
+            "--patch", "--root", "--diff-merges=first-parent", "--unified=0",
+            "--no-color", "--no-ext-diff", "--no-textconv", "--src-prefix=a/", "--dst-prefix=b/", "--full-index",
+            f"--format={HISTORY_COMMIT_MARKER.decode()}%H %ct%n%B%n{HISTORY_MESSAGE_END.decode()}",
+        ]
+        if skip:
+            command.append(f"--skip={skip}")
+        if isinstance(depth, int) and not since_sha:
+            command.append(f"--max-count={max(0, depth - skip)}")
+
+        repo = git.Repo(repo_path)
+        process = repo.git.execute(command, as_process=True)
+
+        commit_sha = None
+        skip_commit = False
+        message_lines = None
+        path = None
+        blob_ids = None
+        in_hunk = False
+        added_lines = []
+        # New-file line number of each added line
+        line_numbers = []
+        next_line = 0
+        commit_count = 0
+        read_bytes = 0
+        cache = self.scan_cache
+        rules = self.exclusions
+
+        def flush_file():
+            # Scan the added lines of the file diff that just ended
+            if scanner_func and path and added_lines:
+                if rules and rules.max_file_size and sum(len(l) for l in added_lines) > rules.max_file_size:
+                    if report is not None:
+                        report.skip(path, REASON_TOO_LARGE, sum(len(l) for l in added_lines))
+                    added_lines.clear()
+                    line_numbers.clear()
+                    return
+                matches = cache.get(blob_ids) if cache and blob_ids else None
+                if matches is None:
+                    matches, partial = _run_scanner(scanner_func, b"".join(added_lines))
+                    if partial:
+                        if report is not None:
+                            report.partial_scan(f"{path}@{commit_sha[:12]}")
+                    elif cache and blob_ids:
+                        cache.put(blob_ids, matches)
+                for m in matches:
+                    _to_file_position(m, line_numbers)
+                    yield Finding.from_match(m, KIND_FILE_DIFF, path, commit_sha)
+            added_lines.clear()
+            line_numbers.clear()
 
-        # Initialize repo object once for git commands
         try:
-            repo = git.Repo(repo_path)
-        except:
-            repo = None
+            for line in process.stdout:
+                read_bytes += len(line)
+                if line.startswith(HISTORY_COMMIT_MARKER):
+                    yield from flush_file()
+                    if on_commit and commit_count:
+                        on_commit(commit_count)
+                    if deadline and time.time() > deadline:
+                        print(f"Repository time budget exhausted after {commit_count} commits.")
+                        if report is not None:
+                            report.budget_exhausted = True
+                        return # git is stopped below
+                    sha, timestamp = line[1:].split()
+                    commit_sha = sha.decode()
+                    commit_count += 1
+                    # Commits may be out of date order on merged branches, so keep going past old ones
+                    skip_commit = cutoff_timestamp is not None and int(timestamp) < cutoff_timestamp
+                    message_lines = []
+                    path = None
+                    continue
+
+                if message_lines is not None:
+                    if line.rstrip(b"\n") != HISTORY_MESSAGE_END:
+                        message_lines.append(line)
+                        continue
+                    # Scan commit message
+                    if scanner_func and not skip_commit:
+                        matches, partial = _run_scanner(scanner_func, b"".join(message_lines))
+                        if partial and report is not None:
+                            report.partial_scan(f"commit message@{commit_sha[:12]}")
+                        for m in matches:
+                            yield Finding.from_match(m, KIND_COMMIT_MESSAGE, commit=commit_sha)
+                    message_lines = None
+                    continue
+
+                if skip_commit:
+                    continue
+
+                if line.startswith(b"diff --git "):
+                    yield from flush_file()
+                    path = None
+                    blob_ids = None
+                    in_hunk = False
+                elif line.startswith(b"@@"):
+                    in_hunk = True
+                    header = HUNK_HEADER.match(line)
+                    next_line = int(header.group(1)) if header else 0
+                elif in_hunk:
+                    if path and line.startswith(b"+"):
+                        added_lines.append(line[1:])
+                        line_numbers.append(next_line)
+                        next_line += 1
+                elif line.startswith(b"index "):
+                    # "index <old>..<new> [mode]" identifies the diff's content
+                    blob_ids = line.split()[1].decode()
+                elif line.startswith(b"+++ "):
+                    path = _diff_path(line[4:])
+                    if path and rules and rules.excludes_path(path):
+                        # Same rules as for files on disk; the diff's added lines aren't collected
+                        if report is not None:
+                            report.skip(path, REASON_EXCLUDED)
+                        path = None
+
+            yield from flush_file()
+            process.wait()
+            if on_commit and commit_count:
+                on_commit(commit_count)
+            print(f"Scanned {commit_count} commits.")
+        finally:
+            # Stop git if the consumer stopped early
+            if process.proc and process.proc.poll() is None:
+                process.proc.kill()
+                process.proc.wait()
+            self._record_read(read_bytes)
+
+    def scan_current_files(self, repo_path, scanner_func, max_file_age_months=None, processes=1, only_paths=None, report=None, deadline=None):
+        """
+        Scans the current checkout files on disk.
+        processes: Worker processes for large repos (1 = serial, 0 = one per CPU core).
+        only_paths: Optional set of repo-relative paths to restrict the scan to (e.g. changed files).
+        report: Optional ScanReport recording skipped and partially scanned files.
+        deadline: time.time() after which the remaining files are skipped.
+        With exclusion rules set, excluded directories are pruned from the walk and
+        excluded, oversized and binary files are skipped.
+        """
+        results = []
+        listed, listed_cpu = time.perf_counter(), time.thread_time()
+        allowed_files = self._recently_modified_files(repo_path, max_file_age_months)
+        rules = self.exclusions
+
+        file_paths = []
+        rel_paths = []
+        sizes = []
+        for root, dirnames, files in os.walk(repo_path):
+            rel_root = os.path.relpath(root, repo_path).replace('\\', '/')
+            rel_root = "" if rel_root == "." else rel_root + "/"
+
+            # Prune in place so excluded trees (and .git, but not e.g. .github) are never listed
+            kept = []
+            for dirname in dirnames:
+                if dirname == ".git":
+                    continue
+                if rules and rules.excludes_dir(rel_root + dirname):
+                    if report is not None:
+                        report.skip_dir(rel_root + dirname)
+                    continue
+                kept.append(dirname)
+            dirnames[:] = kept
 
-        # Optimization: If filtering by file age, get a list of modified files in bulk
-        allowed_files = None
-        if max_file_age_months and max_file_age_months > 0:
-            cutoff_timestamp = (datetime.now() - timedelta(days=max_file_age_months*30)).timestamp()
-            if repo:
-                try:
-                    since_date = (datetime.now() - timedelta(days=max_file_age_months*30)).strftime("%Y-%m-%d")
-                    # git log --since="2023-01-01" --name-only --pretty=format:
-                    output = repo.git.log(f'--since={since_date}', '--name-only', '--pretty=format:')
-                    # Normalize paths to use forward slashes for comparison
-                    allowed_files = set([f.strip().replace('\\', '/') for f in output.splitlines() if f.strip()])
-                    logging.getLogger().info(f"Filtered to {len(allowed_files)} recently modified files.")
-                except Exception as e:
-                    logging.getLogger().warning(f"Failed to filter files by age: {e}. Scanning all files.")
-
-        for root, _, files in os.walk(repo_path):
-            if ".git" in root:
-                continue
             for file in files:
                 file_path = os.path.join(root, file)
-                
-                # Check file age if requested
-                if allowed_files is not None:
-                    # Get relative path and normalize to forward slashes
-                    rel_path = os.path.relpath(file_path, repo_path).replace('\\', '/')
-                    if rel_path not in allowed_files:
-                        continue # Skip old file
+                # Relative path with forward slashes
+                rel_path = rel_root + file
 
+                # Check file age if requested
+                if allowed_files is not None and rel_path not in allowed_files:
+                    continue # Skip old file
+                if only_paths is not None and rel_path not in only_paths:
+                    continue # Unchanged since the last scan
                 try:
-                    with open(file_path, 'r', encoding='utf-8', errors='ignore') as f:
-                        content = f.read()
-                        if scanner_func:
-                            matches = scanner_func(content)
-                            for m in matches:
-                                m['commit'] = "current_head"
-                                m['location'] = f"file: {file_path}"
-                                results.append(m)
-                except Exception:
-                    pass # Skip binary or unreadable files
-        return results
+                    size = os.path.getsize(file_path)
+                except OSError:
+                    size = 0
+                if rules:
+                    reason = rules.check_file(rel_path, size, walked=True)
+                    if reason:
+                        if report is not None:
+                            report.skip(rel_path, reason, size)
+                        continue
+                file_paths.append(file_path)
+                rel_paths.append(rel_path)
+                sizes.append(size)
+
+        if self.metrics:
+            self.metrics.record("list_files", time.perf_counter() - listed, time.thread_time() - listed_cpu)
+        if not scanner_func:
+            return results
+        # Every listed file is read, to hash it for the cache or to scan it
+        self._record_read(sum(sizes))
+
+        sniff = bool(rules and rules.sniff_binary)
+        if processes != 1:
+            statuses = {}
+            per_file = self._scan_parallel(file_paths, sizes, _scan_file_chunk, (deadline, sniff), scanner_func, processes, statuses)
+            if per_file is not None:
+                self._report_statuses(report, statuses, rel_paths, sizes)
+                return self._collect(per_file, rel_paths)
+
+        cache = self.scan_cache
+        per_file = {}
+        statuses = {}
+        for index, file_path in enumerate(file_paths):
+            if deadline and time.time() > deadline:
+                statuses.update((i, "skipped") for i in range(index, len(file_paths)))
+                break
+            try:
+                key, matches, hit, status = _scan_file(file_path, scanner_func, cache, sniff, deadline)
+            except Exception:
+                continue # Skip unreadable files
+            if status:
+                statuses[index] = status
+            elif cache and not hit:
+                cache.put(key, matches)
+            if matches:
+                per_file[index] = matches
+        self._report_statuses(report, statuses, rel_paths, sizes)
+        return self._collect(per_file, rel_paths)
+
+    def scan_tree(self, repo_path, scanner_func, max_file_age_months=None, processes=1, rev="HEAD", only_paths=None, report=None, deadline=None):
+        """
+        Scans the files of rev straight from the object database, without a checkout.
+        Findings carry the same locations as scan_current_files would give them.
+        Blob SHAs come with the tree listing, so cached blobs are never even read.
+        only_paths: Optional set of repo-relative paths to restrict the scan to (e.g. changed files).
+        report, deadline: As for scan_current_files. Exclusion rules apply as there too;
+        sizes come with the tree listing, so excluded and oversized blobs are never read.
+        """
+        results = []
+        listed, listed_cpu = time.perf_counter(), time.thread_time()
+        allowed_files = self._recently_modified_files(repo_path, max_file_age_months)
+        rules = self.exclusions
+        sniff = bool(rules and rules.sniff_binary)
+
+        reader = ObjectStoreReader(repo_path)
+        try:
+            entries = []
+            for path, sha, size in reader.iter_tree(rev):
+                if (allowed_files is not None and path not in allowed_files) or (only_paths is not None and path not in only_paths):
+                    continue
+                reason = rules.check_file(path, size) if rules else None
+                if not reason and size is None:
+                    reason = REASON_NOT_FETCHED
+                if reason:
+                    if report is not None:
+                        report.skip(path, reason, size)
+                    continue
+                entries.append((path, sha, size))
+            if self.metrics:
+                self.metrics.record("list_tree", time.perf_counter() - listed, time.thread_time() - listed_cpu)
+            if not scanner_func:
+                return results
+
+            per_file = {}
+            cache = self.scan_cache
+            pending = []
+            for index, (_, sha, _) in enumerate(entries):
+                matches = cache.get(sha) if cache else None
+                if matches is None:
+                    pending.append(index)
+                elif matches:
+                    per_file[index] = matches
+            # Cached blobs are never read
+            self._record_read(sum(entries[i][2] for i in pending))
+
+            scanned = None
+            if processes != 1:
+                blobs = [entries[i][1:] for i in pending]
+                sizes = [entries[i][2] for i in pending]
+                statuses = {}
+                scanned = self._scan_parallel(blobs, sizes, _scan_blob_chunk, (repo_path, deadline, sniff), scanner_func, processes, statuses)
+                if scanned is not None:
+                    for position, matches in scanned.items():
+                        per_file[pending[position]] = matches
+                    self._report_statuses(report, statuses, [entries[i][0] for i in pending], sizes)
+
+            if scanned is None:
+                statuses = {}
+                for position, index in enumerate(pending):
+                    _, sha, size = entries[index]
+                    if deadline and time.time() > deadline:
+                        statuses.update((i, "skipped") for i in pending[position:])
+                        break
+                    try:
+                        matches, status = _scan_blob(reader, sha, size, scanner_func, sniff, deadline)
+                    except Exception:
+                        continue # Skip unreadable blobs
+                    if status:
+                        statuses[index] = status
+                    elif cache:
+                        cache.put(sha, matches)
+                    if matches:
+                        per_file[index] = matches
+                self._report_statuses(report, statuses, [e[0] for e in entries], [e[2] for e in entries])
+        finally:
+            reader.close()
+
+        return self._collect(per_file, [path for path, _, _ in entries])
+
+    def _recently_modified_files(self, repo_path, max_file_age_months):
+        """
+        Optimization: If filtering by file age, get a list of modified files in bulk.
+        Returns None when not filtering (or the filter failed).
+        """
+        if not max_file_age_months or max_file_age_months <= 0:
+            return None
+        try:
+            repo = git.Repo(repo_path)
+            since_date = (datetime.now() - timedelta(days=max_file_age_months*30)).strftime("%Y-%m-%d")
+            # git log --since="2023-01-01" --name-only --pretty=format:
+            output = repo.git.log(f'--since={since_date}', '--name-only', '--pretty=format:')
+            # Normalize paths to use forward slashes for comparison
+            allowed_files = set([f.strip().replace('\\', '/') for f in output.splitlines() if f.strip()])
+            logging.getLogger().info(f"Filtered to {len(allowed_files)} recently modified files.")
+            return allowed_files
+        except Exception as e:
+            logging.getLogger().warning(f"Failed to filter files by age: {e}. Scanning all files.")
+            return None
+
+    @staticmethod
+    def _report_statuses(report, statuses, rel_paths, sizes):
+        """
+        Adds the files a scan didn't fully scan to report.
+        statuses: {index: "partial" (file time budget) | "skipped" (repo time budget) | "binary"}
+        """
+        if report is None:
+            return
+        for index, status in statuses.items():
+            if status == "partial":
+                report.partial_scan(rel_paths[index])
+            elif status == "binary":
+                report.skip(rel_paths[index], REASON_BINARY, sizes[index])
+            else:
+                report.skip(rel_paths[index], "over repository time budget", sizes[index])
+                report.budget_exhausted = True
+
+    @staticmethod
+    def _collect(per_file, rel_paths):
+        """Turns {index: matches} into Findings ordered by file index, one per secret and file."""
+        results = FindingIndex()
+        for index in sorted(per_file):
+            for m in per_file[index]:
+                results.add(Finding.from_match(m, KIND_FILE, rel_paths[index], "current_head"))
+        return results.findings()
+
+    def _scan_parallel(self, items, sizes, chunk_func, chunk_args, scanner_func, processes, statuses=None):
+        """
+        Scans items (file paths or blob SHAs) across the process pool in size-balanced chunks.
+        Returns {index: matches} for the items with findings, or None when there is too
+        little work to be worth it (or the pool can't be used) so the caller scans serially.
+        Items that were skipped or only partially scanned are added to statuses as {index: status}.
+        """
+        if len(items) < PARALLEL_MIN_FILES or sum(sizes) < PARALLEL_MIN_BYTES:
+            return None
+
+        processes = processes or os.cpu_count() or 1
+        pool = self._get_pool(scanner_func, processes)
+        if pool is None:
+            return None
+
+        # Longest-processing-time-first: hand the next largest item to the lightest chunk
+        chunk_count = processes * CHUNKS_PER_PROCESS
+        heap = [(0, i, []) for i in range(chunk_count)]
+        for index in sorted(range(len(items)), key=lambda i: sizes[i], reverse=True):
+            total, i, chunk = heapq.heappop(heap)
+            chunk.append((index, items[index]))
+            heapq.heappush(heap, (total + sizes[index], i, chunk))
+
+        cache = self.scan_cache
+        stats = _match_stats(scanner_func)
+        per_file = {}
+        futures = [pool.submit(chunk_func, *chunk_args, chunk) for _, _, chunk in heap if chunk]
+        for future in futures:
+            found, hits, misses, worker_stats = future.result()
+            if cache:
+                cache.record(hits, misses)
+            if stats is not None and worker_stats:
+                stats.merge(worker_stats)
+            for index, key, matches, status in found:
+                if status and statuses is not None:
+                    statuses[index] = status
+                # Workers only read the cache; results of misses are stored here
+                if cache and key:
+                    cache.put(key, matches)
+                if matches:
+                    per_file[index] = matches
+        return per_file
+
+    def _get_pool(self, scanner_func, processes):
+        """
+        Returns the shared process pool, (re)creating it when the scanner or size changes.
+        Each worker receives its own copy of scanner_func (e.g. a PatternMatcher's scan_text)
+        once at startup, so patterns are compiled once per process rather than per chunk.
+        """
+        cache = self.scan_cache
+        cache_spec = (cache.path, cache.pattern_version) if cache else None
+        with self._pool_lock:
+            if self._pool is not None and self._pool_key == (processes, scanner_func, cache_spec):
+                return self._pool
+            try:
+                pickle.dumps(scanner_func)
+            except Exception as e:
+                logging.getLogger().warning(f"Scanner can't be sent to worker processes ({e}). Scanning serially.")
+                return None
+            if self._pool is not None:
+                self._pool.shutdown()
+            if cache:
+                cache.flush()  # Make pending results visible to the workers
+            self._pool = ProcessPoolExecutor(max_workers=processes, mp_context=multiprocessing.get_context(POOL_START_METHOD),
+                                             initializer=_init_scan_worker, initargs=(scanner_func, cache_spec))
+            self._pool_key = (processes, scanner_func, cache_spec)
+            return self._pool
+
+    def _record_read(self, size):
+        if self.metrics:
+            self.metrics.add("bytes_read", size)
+            self.metrics.observe("repo_bytes_read", size, BYTES_BUCKETS)
+
+    def close(self):
+        """Shuts down the file scanning process pool, if one was started."""
+        with self._pool_lock:
+            if self._pool is not None:
+                self._pool.shutdown()
+                self._pool = None
+                self._pool_key = None
+
+
+_worker_scanner = None
+_worker_cache = None
+
+
+def _init_scan_worker(scanner_func, cache_spec):
+    # Runs in a fresh worker process (forkserver or spawn): everything it needs comes in its arguments
+    global _worker_scanner, _worker_cache
+    _worker_scanner = scanner_func
+    if cache_spec:
+        try:
+            path, pattern_version = cache_spec
+            _worker_cache = ScanCache(path, pattern_version, read_only=True)
+        except Exception:
+            _worker_cache = None
+
+
+def _scan_file_chunk(deadline, sniff, chunk):
+    """
+    Runs in a worker process. chunk is a list of (index, file_path).
+    Returns (found, cache_hits, cache_misses, match_stats). found holds (index, cache_key, matches, status)
+    for every cache miss, so the parent can store it, for cache hits with findings, and for
+    files not fully scanned (status "skipped", "partial" or "binary", no cache key).
+    match_stats: The worker's MatchStats counts since its last chunk, when its scanner keeps them.
+    """
+    found = []
+    hits, misses = (_worker_cache.hits, _worker_cache.misses) if _worker_cache else (0, 0)
+    for index, file_path in chunk:
+        if deadline and time.time() > deadline:
+            found.append((index, None, [], "skipped"))
+            continue
+        try:
+            key, matches, hit, status = _scan_file(file_path, _worker_scanner, _worker_cache, sniff, deadline)
+        except Exception:
+            continue # Skip unreadable files
+        if status:
+            found.append((index, None, matches, status))
+        elif hit:
+            if matches:
+                found.append((index, None, matches, None))
+        elif matches or key:
+            found.append((index, key, matches, None))
+    if _worker_cache:
+        return found, _worker_cache.hits - hits, _worker_cache.misses - misses, _take_worker_stats()
+    return found, 0, 0, _take_worker_stats()
+
+
+def _scan_file(file_path, scanner_func, cache=None, sniff=False, deadline=None):
+    """
+    Reads and scans one file's bytes. Returns (cache_key, matches, cache_hit, status).
+    The cache key is the file's git blob SHA, computed only when a cache is given.
+    status is None, "binary" (sniff: the first bytes look binary, the rest isn't read) or
+    "partial" (the scan ran out of time); matches with a status must not be cached.
+    Files over STREAM_MIN_BYTES are never held in memory whole (see _scan_stream);
+    deadline: time.time() after which streaming stops and the file is partial.
+    """
+    with open(file_path, 'rb') as f:
+        head = f.read(SNIFF_BYTES)
+        if sniff and is_binary(head):
+            return None, [], False, "binary"
+        size = os.fstat(f.fileno()).st_size
+
+        key = None
+        if cache:
+            if size > STREAM_MIN_BYTES:
+                key = _stream_blob_sha(head, f.read, size)
+                f.seek(len(head))
+            else:
+                head += f.read()
+                key = blob_sha(head)
+            matches = cache.get(key)
+            if matches is not None:
+                return key, matches, True, None
+
+        if size > STREAM_MIN_BYTES:
+            matches, partial = _scan_stream(scanner_func, head, f.read, deadline)
+        else:
+            matches, partial = _run_scanner(scanner_func, head + f.read())
+    return key, matches, False, "partial" if partial else None
+
+
+def _scan_blob(reader, sha, size, scanner_func, sniff=False, deadline=None):
+    """
+    Reads and scans one blob of an ObjectStoreReader, streaming large ones like _scan_file.
+    Returns (matches, status) with status as for _scan_file.
+    """
+    if size > STREAM_MIN_BYTES:
+        stream = reader.open_blob(sha)
+        head = stream.read(SNIFF_BYTES)
+        if sniff and is_binary(head):
+            return [], "binary" # The stream is drained when it's garbage collected
+        matches, partial = _scan_stream(scanner_func, head, stream.read, deadline)
+    else:
+        data = reader.read_blob(sha)
+        if sniff and is_binary(data[:SNIFF_BYTES]):
+            return [], "binary"
+        matches, partial = _run_scanner(scanner_func, data)
+    return matches, "partial" if partial else None
+
+
+def _scan_stream(scanner_func, head, read, deadline=None):
+    """
+    Scans a stream of bytes (head, then read(n) until it returns b"") in windows of
+    STREAM_CHUNK_BYTES + STREAM_OVERLAP_BYTES, so memory stays flat whatever its size.
+    A match belongs to the window it starts in and is never longer than the overlap
+    (PatternMatcher's match cap), so none is lost or reported twice at a boundary.
+    Returns (matches, partial) with offsets relative to the start of the stream.
+    """
+    matches = []
+    last_end = {}
+    offset = 0
+    # Lines before the window, and characters between the last of them and the window
+    lines_before = 0
+    columns_before = 0
+    window = head + read(STREAM_CHUNK_BYTES + STREAM_OVERLAP_BYTES - len(head))
+    while True:
+        more = read(STREAM_CHUNK_BYTES) if len(window) > STREAM_CHUNK_BYTES else b""
+        found, partial = _run_scanner(scanner_func, window)
+        limit = STREAM_CHUNK_BYTES if more else len(window)
+        for m in found:
+            start = m["start"] + offset
+            # Matches of one pattern don't overlap, as when scanning the whole file at once
+            if m["start"] >= limit or start < last_end.get(m["type"], 0):
+                continue
+            m["start"], m["end"] = start, m["end"] + offset
+            if "line" in m:
+                if m["line"] == 1:
+                    m["column"] += columns_before
+                m["line"] += lines_before
+            last_end[m["type"]] = m["end"]
+            matches.append(m)
+        if not more:
+            return matches, partial
+        if partial or (deadline and time.time() > deadline):
+            return matches, True
+        consumed = window[:STREAM_CHUNK_BYTES]
+        newlines = consumed.count(b"\n")
+        lines_before += newlines
+        tail = consumed[consumed.rfind(b"\n") + 1:]
+        columns_before = len(tail.decode('utf-8', errors='replace')) + (0 if newlines else columns_before)
+        window = window[STREAM_CHUNK_BYTES:] + more
+        offset += STREAM_CHUNK_BYTES
+
+
+def _to_file_position(match, line_numbers):
+    """
+    Moves a match in the joined added lines of a file diff to the new file's line
+    (line_numbers[i] is the line of added line i + 1) and drops context lines that
+    aren't adjacent to it in the file (other hunks).
+    """
+    if "line" not in match:
+        return
+    line = match["line"]
+    context = match["context"].split("\n")
+    first = max(1, line - CONTEXT_LINES)
+    kept = [
+        text for number, text in enumerate(context, first)
+        if number - 1 < len(line_numbers) and line_numbers[number - 1] - line_numbers[line - 1] == number - line
+    ]
+    match["context"] = "\n".join(kept)
+    match["line"] = line_numbers[line - 1]
+
+
+def _stream_blob_sha(head, read, size):
+    """blob_sha of a stream of size bytes (head, then read(n)), read in chunks."""
+    digest = hashlib.sha1(b"blob %d\0" % size + head)
+    for chunk in iter(lambda: read(STREAM_CHUNK_BYTES), b""):
+        digest.update(chunk)
+    return digest.hexdigest()
+
+
+def _run_scanner(scanner_func, text):
+    """Returns (matches, partial): partial when the scanner ran out of time (ScanTimeout)."""
+    try:
+        return scanner_func(text), False
+    except ScanTimeout as e:
+        return e.matches, True
+
+
+def _scan_blob_chunk(repo_path, deadline, sniff, chunk):
+    """
+    Runs in a worker process. chunk is a list of (index, (blob_sha, size)) the parent found
+    no cached results for. Returns (found, 0, 0, match_stats) like _scan_file_chunk.
+    """
+    found = []
+    reader = ObjectStoreReader(repo_path)
+    try:
+        for index, (sha, size) in chunk:
+            if deadline and time.time() > deadline:
+                found.append((index, None, [], "skipped"))
+                continue
+            try:
+                matches, status = _scan_blob(reader, sha, size, _worker_scanner, sniff, deadline)
+            except Exception:
+                continue # Skip unreadable blobs
+            if status:
+                found.append((index, None, matches, status))
+            else:
+                found.append((index, sha, matches, None))
+    finally:
+        reader.close()
+    return found, 0, 0, _take_worker_stats()
+
+
+def _match_stats(scanner_func):
+    """The MatchStats of the PatternMatcher whose scan_text scanner_func is, if it keeps any."""
+    return getattr(getattr(scanner_func, "__self__", None), "stats", None)
+
+
+def _take_worker_stats():
+    stats = _match_stats(_worker_scanner)
+    return stats.take() if stats is not None else None
+
+
+def blob_sha(data):
+    """The git blob SHA-1 of data, i.e. what `git hash-object` prints for it."""
+    return hashlib.sha1(b"blob %d\0" % len(data) + data).hexdigest()
+
+
+def _diff_path(raw_path):
+    """
+    Decodes the path of a '+++ b/<path>' patch header.
+    Returns None for /dev/null (deleted files).
+    """
+    raw_path = raw_path.rstrip(b"\r\n")
+    if raw_path.endswith(b"\t"):
+        # git terminates paths containing spaces with a tab
+        raw_path = raw_path[:-1]
+    if raw_path.startswith(b'"') and raw_path.endswith(b'"'):
+        # git C-quotes paths with special characters
+        raw_path = codecs.escape_decode(raw_path[1:-1])[0]
+    if raw_path == b"/dev/null":
+        return None
+    if raw_path.startswith(b"b/"):
+        raw_path = raw_path[2:]
+    return raw_path.decode('utf-8', errors='replace')
@@ -0,0 +1,153 @@
+import json
+import logging
+import os
+import sqlite3
+import threading
+
+# Valid path relative for execution from root
+CACHE_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "cache")
+SCAN_CACHE_FILE = os.path.join(CACHE_DIR, "scan_cache.sqlite")
+
+# Puts and recency updates are buffered in memory and written in one short transaction
+# (which also enforces the size bound) per this many keys
+COMMIT_EVERY = 500
+# Seconds to wait for another process's write transaction before dropping a batch
+LOCK_TIMEOUT = 5.0
+
+
+class ScanCache:
+    """
+    Persistent cache of scanner results keyed by content, so identical content is scanned once.
+    Keys are git object IDs: the blob SHA of a file, or "<old blob>..<new blob>" for a diff.
+    Entries belong to one pattern-set version; opening the cache with a different version
+    drops them. The number of entries is bounded with least-recently-used eviction.
+    The database may be shared by several scanner processes: no write transaction stays
+    open between calls, and a batch that can't be written (e.g. the database stays
+    locked) is dropped with a warning, its entries left as future misses.
+    """
+    def __init__(self, path=None, pattern_version="", max_entries=1_000_000, read_only=False):
+        path = path or SCAN_CACHE_FILE
+        self.path = path
+        self.pattern_version = pattern_version
+        self.max_entries = max_entries
+        self.read_only = read_only
+        self.hits = 0
+        self.misses = 0
+        # key -> serialized findings, and key -> last_used, not written yet
+        self._pending = {}
+        self._touched = {}
+        self._lock = threading.Lock()
+        self._logger = logging.getLogger(__name__)
+
+        if read_only:
+            self._conn = sqlite3.connect(f"file:{path}?mode=ro", uri=True, check_same_thread=False)
+            stored = self._conn.execute("SELECT value FROM meta WHERE name = 'pattern_version'").fetchone()
+            # A stale cache is never consulted
+            self._usable = stored is not None and stored[0] == pattern_version
+            self._clock = 0
+            return
+
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self._conn = sqlite3.connect(path, timeout=LOCK_TIMEOUT, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute("CREATE TABLE IF NOT EXISTS meta (name TEXT PRIMARY KEY, value TEXT NOT NULL)")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS scan_cache (key TEXT PRIMARY KEY, findings TEXT NOT NULL, last_used INTEGER NOT NULL)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS scan_cache_last_used ON scan_cache (last_used)")
+
+        stored = self._conn.execute("SELECT value FROM meta WHERE name = 'pattern_version'").fetchone()
+        if stored is None or stored[0] != pattern_version:
+            # Patterns changed: every cached result is potentially wrong
+            self._conn.execute("DELETE FROM scan_cache")
+            self._conn.execute("INSERT OR REPLACE INTO meta (name, value) VALUES ('pattern_version', ?)", (pattern_version,))
+        self._conn.commit()
+        self._usable = True
+        self._clock = self._conn.execute("SELECT COALESCE(MAX(last_used), 0) FROM scan_cache").fetchone()[0]
+
+    def get(self, key):
+        """Returns a fresh copy of the cached findings for key, or None on a miss."""
+        with self._lock:
+            data = self._pending.get(key)
+            if data is None and self._usable:
+                try:
+                    row = self._conn.execute("SELECT findings FROM scan_cache WHERE key = ?", (key,)).fetchone()
+                except sqlite3.Error as e:
+                    self._logger.warning(f"Scan cache lookup failed ({e}); scanning instead.")
+                    row = None
+                data = row[0] if row else None
+            if data is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+            if not self.read_only:
+                self._clock += 1
+                self._touched[key] = self._clock
+                if len(self._touched) >= COMMIT_EVERY:
+                    self._commit()
+        return json.loads(data)
+
+    def put(self, key, findings):
+        """Stores findings for key. Call before the findings are mutated by the caller."""
+        if self.read_only:
+            return
+        data = json.dumps(findings, ensure_ascii=False)
+        with self._lock:
+            self._clock += 1
+            self._pending[key] = data
+            self._touched[key] = self._clock
+            if len(self._touched) >= COMMIT_EVERY:
+                self._commit()
+
+    def record(self, hits, misses):
+        """Adds lookups done elsewhere (e.g. by worker processes) to the hit rate."""
+        with self._lock:
+            self.hits += hits
+            self.misses += misses
+
+    def flush(self):
+        """Commits pending writes so other connections (e.g. worker processes) see them."""
+        with self._lock:
+            if not self.read_only:
+                self._commit()
+
+    def _commit(self):
+        """Writes the buffered puts and recency updates, evicts beyond the bound and commits, in one transaction."""
+        if not self._pending and not self._touched:
+            return
+        pending, touched = self._pending, self._touched
+        self._pending, self._touched = {}, {}
+        try:
+            with self._conn:
+                self._conn.executemany(
+                    "INSERT OR REPLACE INTO scan_cache (key, findings, last_used) VALUES (?, ?, ?)",
+                    [(key, data, touched.get(key, self._clock)) for key, data in pending.items()],
+                )
+                self._conn.executemany(
+                    "UPDATE scan_cache SET last_used = ? WHERE key = ?",
+                    [(used, key) for key, used in touched.items() if key not in pending],
+                )
+                count = self._conn.execute("SELECT COUNT(*) FROM scan_cache").fetchone()[0]
+                if count > self.max_entries:
+                    self._conn.execute(
+                        "DELETE FROM scan_cache WHERE key IN (SELECT key FROM scan_cache ORDER BY last_used LIMIT ?)",
+                        (count - self.max_entries,),
+                    )
+        except sqlite3.Error as e:
+            # Rolled back: these results are just scanned again next time
+            self._logger.warning(f"Scan cache write of {len(pending)} entries failed ({e}); they stay uncached.")
+
+    def close(self):
+        with self._lock:
+            if not self.read_only:
+                self._commit()
+            self._conn.close()
+
+    @property
+    def hit_rate(self):
+        lookups = self.hits + self.misses
+        return self.hits / lookups if lookups else 0.0
+
+    def summary(self):
+        return f"{self.hits} hits / {self.hits + self.misses} lookups ({self.hit_rate:.1%} hit rate)"
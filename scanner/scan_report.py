@@ -0,0 +1,75 @@
+import threading
+
+# Partially scanned paths listed in a summary
+MAX_LISTED_PATHS = 10
+# Example paths kept per skip reason (and for pruned directories)
+MAX_SAMPLE_PATHS = 3
+
+
+class ScanReport:
+    """
+    What a repository scan left out: directories pruned by the exclusion rules, files
+    skipped entirely (by reason, with their bytes) and files only partially scanned
+    because they ran out of time. A few example paths are kept for each skip reason.
+    """
+    def __init__(self):
+        self.skipped_dirs = 0
+        self.skipped_files = {}
+        self.skipped_bytes = 0
+        # reason -> first MAX_SAMPLE_PATHS skipped paths; "" for pruned directories
+        self.samples = {}
+        self.partial = []
+        self.budget_exhausted = False
+        self._lock = threading.Lock()
+
+    def skip(self, path, reason, size=0):
+        with self._lock:
+            self.skipped_files[reason] = self.skipped_files.get(reason, 0) + 1
+            self.skipped_bytes += size or 0
+            self._sample(reason, [path])
+
+    def skip_dir(self, path):
+        with self._lock:
+            self.skipped_dirs += 1
+            self._sample("", [path + "/"])
+
+    def partial_scan(self, path):
+        with self._lock:
+            self.partial.append(path)
+
+    def merge(self, other):
+        with self._lock:
+            self.skipped_dirs += other.skipped_dirs
+            for reason, count in other.skipped_files.items():
+                self.skipped_files[reason] = self.skipped_files.get(reason, 0) + count
+            self.skipped_bytes += other.skipped_bytes
+            for reason, paths in other.samples.items():
+                self._sample(reason, paths)
+            self.partial.extend(other.partial)
+            self.budget_exhausted = self.budget_exhausted or other.budget_exhausted
+
+    def __bool__(self):
+        return bool(self.skipped_dirs or self.skipped_files or self.partial or self.budget_exhausted)
+
+    def summary(self):
+        parts = []
+        if self.skipped_dirs:
+            parts.append(f"pruned {self.skipped_dirs} excluded directories{self._examples('')}")
+        if self.skipped_files:
+            reasons = ", ".join(f"{count} {reason}{self._examples(reason)}" for reason, count in sorted(self.skipped_files.items()))
+            parts.append(f"skipped {sum(self.skipped_files.values())} files ({self.skipped_bytes / 1024:.0f} KB: {reasons})")
+        if self.partial:
+            listed = ", ".join(self.partial[:MAX_LISTED_PATHS])
+            more = f" and {len(self.partial) - MAX_LISTED_PATHS} more" if len(self.partial) > MAX_LISTED_PATHS else ""
+            parts.append(f"partially scanned {len(self.partial)} (time budget): {listed}{more}")
+        if self.budget_exhausted:
+            parts.append("stopped early: repository time budget exhausted")
+        return "; ".join(parts) or "nothing skipped"
+
+    def _sample(self, reason, paths):
+        sample = self.samples.setdefault(reason, [])
+        sample.extend(paths[:MAX_SAMPLE_PATHS - len(sample)])
+
+    def _examples(self, reason):
+        sample = self.samples.get(reason)
+        return f" (e.g. {', '.join(sample)})" if sample else ""
@@ -1,101 +1,553 @@
+import cProfile
+import hashlib
+import io
 import logging
 import os
+import pstats
+import socket
+import threading
+import time
+from functools import partial
 from datetime import datetime, timedelta
-from config import PATTERNS, GITHUB_TOKEN
-from scanner.github_client import GitHubClient
+from config import PATTERNS, EXCLUDE_PATTERNS, GITHUB_TOKENS, SCAN_CACHE_MAX_ENTRIES, FRONTIER_MIN_CANDIDATES, FRONTIER_REFILL_COUNT
 from scanner.repo_processor import RepoProcessor
+from scanner.clone_strategy import CloneStrategy
+from scanner.exclusions import ExclusionRules
+from scanner.finding import KIND_FILE, KIND_FILE_DIFF
+from scanner.frontier import RepoFrontier
+from scanner.metrics import RunMetrics, BYTES_BUCKETS, COUNT_BUCKETS
+from scanner.mirror_cache import MirrorCache
 from scanner.pattern_matcher import PatternMatcher
+from scanner.pipeline import Pipeline, Stage
+from scanner.scan_report import ScanReport
+from scanner.scan_cache import ScanCache
+from scanner.work_queue import open_work_queue, STATE_LEASED
 from utils.result_writer import ResultWriter
-from utils.history import load_scanned_ids, mark_as_scanned
+from utils.run_manifest import RunManifest
+from utils.history import ScanHistory, HistoryExclusions
+
+# Seconds to wait at exit for a stopped frontier refill to finish its pages in flight
+REFILL_STOP_TIMEOUT = 30
 
 class ScannerEngine:
     def __init__(self):
         self.logger = logging.getLogger(__name__)
-        self.client = GitHubClient(GITHUB_TOKEN)
+        self._client = None
         self.repo_processor = RepoProcessor()
         self.matcher = PatternMatcher(PATTERNS)
         self.result_writer = ResultWriter()
+        self._write_lock = threading.Lock()
+        self.total_findings = 0
+        self.scan_report = ScanReport()
+        self.pipeline = None
+        self.frontier = None
+        self.history = None
+        self.mirrors = None
+        self._refill_thread = None
+        self._refill_stop = threading.Event()
+        # Work queue mode: leases of the jobs in flight, kept alive by a heartbeat thread
+        self.work_queue = None
+        self.manifest = None
+        self._leases = {}
+        self._leases_lock = threading.Lock()
+        self._heartbeat_stop = threading.Event()
+        # --metrics: timers, counters and histograms of the run; --profile: cProfile stats of the scan stage
+        self.metrics = None
+        self._profile = None
+        self._profile_lock = threading.Lock()
+
+    @property
+    def client(self):
+        if self._client is None:
+            # Imported on first search only: scans of given repos never load requests
+            from scanner.github_client import GitHubClient
+            self._client = GitHubClient(GITHUB_TOKENS)
+        return self._client
+
+    def configure(self, args):
+        """Builds the matcher and the exclusion rules for args."""
+        # Bounded matching: no match longer than MAX_MATCH_LENGTH, no text scanned longer than --file-budget
+        detectors = []
+        if args.entropy:
+            from scanner.entropy_detector import EntropyDetector  # Loads numpy
+            detectors.append(EntropyDetector())
+        self.matcher = PatternMatcher(PATTERNS, engine=args.regex_engine, time_budget=args.file_budget or None, detectors=detectors, stats=args.metrics)
+        # Vendored, generated, oversized and binary files are skipped unless --scan-all
+        if args.scan_all:
+            self.repo_processor.exclusions = ExclusionRules(args.exclude, sniff_binary=False) if args.exclude else None
+        else:
+            self.repo_processor.exclusions = ExclusionRules(EXCLUDE_PATTERNS + args.exclude, args.max_file_size)
+
+    def open_caches(self, args):
+        """Opens the scan cache and the mirror cache, unless disabled by args."""
+        # Identical files and diffs (forks, vendored copies, unchanged files across commits) are scanned once
+        if not args.no_scan_cache:
+            self.repo_processor.scan_cache = ScanCache(pattern_version=self.matcher.version, max_entries=SCAN_CACHE_MAX_ENTRIES)
+        # Mirrors kept between runs: a rescan fetches only new objects and checks out a worktree
+        if args.mirror_cache:
+            self.mirrors = MirrorCache(max_bytes=args.mirror_cache_size)
+
+    def close_caches(self):
+        self.repo_processor.close()
+        if self.mirrors:
+            self.mirrors.close()
+            self.mirrors = None
+        if self.repo_processor.scan_cache:
+            self.repo_processor.scan_cache.close()
+            self.repo_processor.scan_cache = None
 
     def run(self, args):
         self.logger.info("Starting GitHub Secret Scanner Engine...")
-        
-        if not GITHUB_TOKEN or "your_github_pat" in GITHUB_TOKEN:
+
+        # The timestamp names the results file and identifies the run for --resume
+        run_id = datetime.now().strftime("%Y-%m-%d_%H-%M-%S")
+        if args.resume:
+            if args.queue:
+                self.logger.error("--resume can't be used with --queue: the work queue keeps its own progress.")
+                return
+            try:
+                self.manifest = RunManifest.load(args.resume)
+            except FileNotFoundError:
+                self.logger.error(f"No run {args.resume} to resume (see cache/runs/).")
+                return
+            run_id = args.resume
+            # Same scan settings and results file as the interrupted run
+            self.manifest.restore_args(args)
+            self.result_writer = ResultWriter(self.manifest.output_format)
+            results_file = self.manifest.results_file
+            self.logger.info(f"Resuming run {run_id}. Results will be appended to: {results_file}")
+        else:
+            # Setup Results File
+            results_dir = "results"
+            results_file = os.path.join(results_dir, f"scan_results_{run_id}.{self.result_writer.extension}")
+            self.logger.info(f"Results will be saved to: {results_file}")
+        self.configure(args)
+
+        if not GITHUB_TOKENS or any("your_github_pat" in t for t in GITHUB_TOKENS):
             self.logger.warning("GITHUB_TOKEN not found or invalid in .env. Search might be rate-limited.")
 
-        # Setup Results File
-        timestamp = datetime.now().strftime("%Y-%m-%d_%H-%M-%S")
-        results_dir = "results"
-        extension = "json" if self.result_writer.output_format == "json" else "csv"
-        results_file = os.path.join(results_dir, f"scan_results_{timestamp}.{extension}")
-        self.logger.info(f"Results will be saved to: {results_file}")
-
-        # Get Repositories
-        repos = self._get_repositories(args)
-        
-        if not repos:
-            self.logger.error("No repositories found via search.")
-            return
+        self.history = ScanHistory()
+        if args.queue:
+            self.work_queue = open_work_queue(args.queue, lease_seconds=args.lease_seconds)
+        if args.metrics:
+            self.metrics = RunMetrics()
+            self.repo_processor.metrics = self.metrics
+        self.pipeline = None
+        try:
+            self._run(args, results_file, run_id)
+        finally:
+            self.manifest = None
+            self._write_metrics(results_file, run_id)
+            # Flushes buffered findings (and writes the JSON array for json output)
+            self.result_writer.close()
+            self._finish_refill()
+            self.history.close()
+            self.history = None
+            if self.work_queue:
+                self.work_queue.close()
+                self.work_queue = None
 
-        self.logger.info(f"Found {len(repos)} repositories. Starting scan...")
-        
-        total_findings = 0
-        
-        for i, repo in enumerate(repos):
-            repo_name = repo.get('name', 'unknown')
-            repo_full_name = repo.get('full_name', 'unknown')
-            repo_url = repo.get('clone_url', '')
-            html_url = repo.get('html_url', '')
-            repo_id = str(repo.get('id', ''))
-            
-            self.logger.info(f"[{i+1}/{len(repos)}] Processing: {repo_full_name} ({repo_url})")
-            
-            local_path = self.repo_processor.clone_repo(repo_url, repo_name)
+    def _run(self, args, results_file, run_id):
+        if self.manifest:
+            repos = self.manifest.pending_repos(self._history_key)
+            self.logger.info(f"{len(repos)} of the run's {len(self.manifest.repos)} repositories are left to scan.")
+            if not repos:
+                return
+            items = ({"index": i, "repo": repo} for i, repo in enumerate(repos))
+            total = len(repos)
+        elif self.work_queue and not args.enqueue:
+            # Worker: the jobs come from the shared queue, as long as there are any
+            self.logger.info(f"Taking repositories from the work queue {args.queue}: {self.work_queue.counts()}")
+            items = self._claimed_jobs(args)
+            total = None
+        else:
+            # Get Repositories
+            if self.metrics:
+                with self.metrics.timer("search"):
+                    repos = self._get_repositories(args)
+            else:
+                repos = self._get_repositories(args)
+
+            if not repos:
+                self.logger.error("No repositories found via search.")
+                return
+
+            if self.work_queue:
+                added = self.work_queue.put(repos, key=self._history_key)
+                self.logger.info(f"Queued {added} of {len(repos)} repositories ({len(repos) - added} were queued before): {self.work_queue.counts()}")
+                return
+
+            # Checkpoint of the plan and of each finished repo, for --resume
+            self.manifest = RunManifest.create(run_id, results_file, self.result_writer.output_format, repos, args)
+            self.logger.info(f"Found {len(repos)} repositories. Starting scan (run {run_id}; continue it with --resume {run_id} if interrupted)...")
+            items = ({"index": i, "repo": repo} for i, repo in enumerate(repos))
+            total = len(repos)
+        self.total_findings = 0
+        self.scan_report = ScanReport()
+
+        self.open_caches(args)
+        scan_cache = self.repo_processor.scan_cache
+
+        # Clone only what the scan mode reads: depth sized to --depth, no working tree unless --checkout
+        strategy = CloneStrategy.for_scan(args.mode, depth=args.depth, file_age_months=args.file_age, blob_limit=args.blob_limit, checkout=args.checkout)
+
+        # Clone, scan and write run as separate stages so the next clones overlap with scanning.
+        # Queue workers claim a job only when a clone worker is about to be free, leaving the rest to other workers.
+        self.pipeline = Pipeline([
+            Stage("clone", partial(self._clone_stage, total=total, strategy=strategy, args=args), workers=args.clone_workers,
+                  queue_size=1 if self.work_queue else None, on_error=self._job_failed),
+            Stage("scan", partial(self._scan_stage, args=args), workers=args.scan_workers, on_error=self._job_failed),
+            Stage("write", partial(self._write_stage, results_file=results_file, args=args), workers=args.write_workers, on_error=self._job_failed),
+        ])
+        heartbeat = None
+        if self.work_queue:
+            heartbeat = threading.Thread(target=self._heartbeat, args=(args.lease_seconds,), name="lease-heartbeat", daemon=True)
+            heartbeat.start()
+        try:
+            self.pipeline.run(items)
+        finally:
+            self.close_caches()
+            if heartbeat:
+                self._heartbeat_stop.set()
+                heartbeat.join()
+                self._heartbeat_stop.clear()
+                # Interrupted: hand unfinished jobs back rather than letting their leases run out
+                with self._leases_lock:
+                    leases, self._leases = list(self._leases.values()), {}
+                for lease in leases:
+                    self.work_queue.release(lease)
+
+        for line in self.pipeline.summary():
+            self.logger.info(f"Pipeline {line}")
+        if scan_cache:
+            self.logger.info(f"Scan cache: {scan_cache.summary()}")
+        if self.scan_report:
+            incomplete = self.scan_report.partial or self.scan_report.budget_exhausted
+            (self.logger.warning if incomplete else self.logger.info)(f"Not scanned: {self.scan_report.summary()}")
+        self.logger.info(f"Scan complete. Total findings: {self.total_findings}. Results saved to {results_file}")
+        if self.manifest:
+            left = len(self.manifest.pending_repos(self._history_key))
+            if left:
+                self.logger.warning(f"{left} repositories were not scanned. Retry them with --resume {run_id}.")
+            else:
+                self.manifest.remove()
+
+    def scan_repo(self, repo, args, results_file):
+        """
+        Clones, scans and records one repo (a search-API-shaped dict) outside the pipeline,
+        as the daemon does per job. Needs configure(), open_caches() and self.history.
+        Returns its findings, or None if it couldn't be cloned.
+        """
+        strategy = CloneStrategy.for_scan(args.mode, depth=args.depth, file_age_months=args.file_age, blob_limit=args.blob_limit, checkout=args.checkout)
+        job = self._clone_stage({"index": 0, "repo": repo}, total=1, strategy=strategy, args=args)
+        if job is None:
+            return None
+        job = self._scan_stage(job, args)
+        self._write_stage(job, results_file=results_file, args=args)
+        return job["findings"]
+
+    def _clone_stage(self, job, total, strategy, args):
+        job = self._clone_job(job, total, strategy, args)
+        if job is not None and self.metrics:
+            # What a clone (or kept clone / mirror) holds after this repo's clone or fetch
+            size = self.repo_processor.object_bytes(job["local_path"])
+            self.metrics.add("bytes_cloned", size)
+            self.metrics.observe("repo_bytes_cloned", size, BYTES_BUCKETS)
+        return job
+
+    def _clone_job(self, job, total, strategy, args):
+        repo = job["repo"]
+        repo_full_name = repo.get('full_name', 'unknown')
+        repo_url = repo.get('clone_url', '')
+
+        progress = f"{job['index']+1}/{total}" if total else f"{job['index']+1}"
+        self.logger.info(f"[{progress}] Processing: {repo_full_name} ({repo_url})")
+
+        if self.mirrors:
+            return self._check_out_mirror(job, strategy, args)
+        if args.incremental:
+            return self._update_kept_clone(job, strategy, args)
+
+        # Repos with the same name can be in flight at once, so the clone directory includes the ID (or URL hash)
+        local_path = self.repo_processor.clone_repo(repo_url, self._clone_name(repo), strategy)
+        if not local_path:
+            self.logger.error(f"Skipping {repo_full_name} due to clone failure.")
+            self._job_failed(job, "Clone failed")
+            return None
+
+        job["local_path"] = local_path
+        return job
+
+    def _update_kept_clone(self, job, strategy, args):
+        """
+        Incremental mode: brings the repo's kept clone up to date and sets job["since_sha"] to
+        the HEAD of its last scan, so only later commits (or the files they changed) are scanned.
+        Falls back to a fresh clone and full scan when there is no usable previous scan: no record
+        or clone, a different scan mode or pattern set, or history rewritten since.
+        """
+        repo = job["repo"]
+        repo_full_name = repo.get('full_name', 'unknown')
+        key = self._history_key(repo)
+        kept_name = os.path.join("kept", self._storage_name(key))
+        local_path = os.path.join(self.repo_processor.temp_dir, kept_name)
+
+        record = self.history.get(key)
+        last_head = record["head_sha"] if record else None
+        job["since_sha"] = None
+        if (last_head and record["mode"] == args.mode and record["pattern_version"] == self.matcher.version
+                and os.path.isdir(local_path)
+                and self.repo_processor.update_repo(local_path, checkout=args.checkout)
+                and self.repo_processor.is_ancestor(local_path, last_head)):
+            self.logger.info(f"Rescanning {repo_full_name} since {last_head[:12]}.")
+            job["since_sha"] = last_head
+        else:
+            if last_head:
+                self.logger.info(f"Previous scan of {repo_full_name} can't be continued. Scanning it in full.")
+            local_path = self.repo_processor.clone_repo(repo.get('clone_url', ''), kept_name, strategy)
             if not local_path:
                 self.logger.error(f"Skipping {repo_full_name} due to clone failure.")
-                continue
-                
-            repo_findings = []
-            if args.mode == 'history':
-                self.logger.info(f"Scanning history (depth={args.depth}, max_file_age={args.file_age}m)...")
-                repo_findings = self.repo_processor.scan_history(local_path, depth=args.depth, scanner_func=self.matcher.scan_text, max_file_age_months=args.file_age)
+                self._job_failed(job, "Clone failed")
+                return None
+
+        job["local_path"] = local_path
+        return job
+
+    def _check_out_mirror(self, job, strategy, args):
+        """
+        Mirror cache: fetches into the repo's mirror and checks out a worktree of it for this scan.
+        In incremental mode job["since_sha"] is the HEAD of the last scan, as in _update_kept_clone.
+        """
+        repo = job["repo"]
+        repo_full_name = repo.get('full_name', 'unknown')
+        key = self._history_key(repo)
+        worktree_path = os.path.join(self.repo_processor.temp_dir, self._clone_name(repo))
+        local_path = self.mirrors.checkout(self._storage_name(key), repo.get('clone_url', ''), worktree_path, strategy)
+        if not local_path:
+            self.logger.error(f"Skipping {repo_full_name} due to clone failure.")
+            self._job_failed(job, "Clone failed")
+            return None
+
+        job["local_path"] = local_path
+        job["since_sha"] = None
+        if args.incremental:
+            record = self.history.get(key)
+            last_head = record["head_sha"] if record else None
+            if (last_head and record["mode"] == args.mode and record["pattern_version"] == self.matcher.version
+                    and self.repo_processor.is_ancestor(local_path, last_head)):
+                self.logger.info(f"Rescanning {repo_full_name} since {last_head[:12]}.")
+                job["since_sha"] = last_head
+            elif last_head:
+                self.logger.info(f"Previous scan of {repo_full_name} can't be continued. Scanning it in full.")
+        return job
+
+    def _claimed_jobs(self, args):
+        """
+        Pipeline input in work queue mode: leases jobs one at a time as the clone stage
+        takes them, until none are pending. While other workers (or this one) still hold
+        leases it keeps polling, so jobs whose worker dies or fails are picked up again.
+        """
+        worker = f"{socket.gethostname()}:{os.getpid()}"
+        poll_seconds = max(0.5, min(5.0, args.lease_seconds / 4))
+        index = 0
+        while True:
+            lease = self.work_queue.claim(worker)
+            if lease is None:
+                if self.work_queue.counts()[STATE_LEASED]:
+                    time.sleep(poll_seconds)
+                    continue
+                return
+            with self._leases_lock:
+                self._leases[lease.key] = lease
+            yield {"index": index, "repo": lease.item, "lease": lease}
+            index += 1
+
+    def _heartbeat(self, lease_seconds):
+        # Extends our leases well before they expire, so only a dead or stuck worker loses them
+        while not self._heartbeat_stop.wait(lease_seconds / 3):
+            with self._leases_lock:
+                leases = list(self._leases.values())
+            for lease in self.work_queue.heartbeat(leases):
+                self.logger.warning(f"Lost the lease on {lease.key}: it expired and another worker claimed it.")
+
+    def _job_failed(self, job, error):
+        """Ends the job's lease (if it came from the work queue) so it can be retried."""
+        lease = job.get("lease")
+        if not lease:
+            return
+        with self._leases_lock:
+            self._leases.pop(lease.key, None)
+        self.work_queue.fail(lease, error)
+
+    @staticmethod
+    def _storage_name(key):
+        # History keys can be URLs; kept clones and mirrors are named by repo ID or URL hash
+        return key if key.isdigit() else "url_" + hashlib.sha1(key.encode()).hexdigest()[:16]
+
+    @classmethod
+    def _clone_name(cls, repo):
+        # Manual repos all have the ID "manual": their clones are told apart by URL hash
+        return f"{cls._storage_name(cls._history_key(repo))}_{repo.get('name', 'unknown')}"
+
+    @staticmethod
+    def _history_key(repo):
+        # Manually given repos have no GitHub ID, so their history is keyed by URL
+        repo_id = str(repo.get('id', ''))
+        return repo_id if repo_id and repo_id != "manual" else repo.get('clone_url', '')
+
+    def _scan_stage(self, job, args):
+        if not args.profile:
+            return self._scan_job(job, args)
+        profiler = cProfile.Profile()
+        try:
+            profiler.enable()
+        except ValueError:
+            # Python 3.12+ profiles one thread at a time: this scan runs unprofiled
+            return self._scan_job(job, args)
+        try:
+            return self._scan_job(job, args)
+        finally:
+            profiler.disable()
+            with self._profile_lock:
+                if self._profile is None:
+                    self._profile = pstats.Stats(profiler)
+                else:
+                    self._profile.add(profiler)
+
+    def _scan_job(self, job, args):
+        local_path = job["local_path"]
+        repo_full_name = job["repo"].get('full_name', 'unknown')
+        since_sha = job.get("since_sha")
+        job["head_sha"] = self.repo_processor.head_sha(local_path)
+        report = ScanReport()
+        deadline = time.time() + args.repo_budget if args.repo_budget else None
+        try:
+            if since_sha and since_sha == job["head_sha"]:
+                self.logger.info(f"No new commits in {repo_full_name} since the last scan.")
+                repo_findings = []
+            elif args.mode == 'history':
+                self.logger.info(f"Scanning history of {repo_full_name} (depth={args.depth}, max_file_age={args.file_age}m)...")
+                # In a checkpointed run, a resumed history scan continues after the commits done before
+                cursor = self.manifest.cursor(self._history_key(job["repo"])) if self.manifest else None
+                repo_findings = self.repo_processor.scan_history(local_path, depth=args.depth, scanner_func=self.matcher.scan_text, max_file_age_months=args.file_age, since_sha=since_sha, report=report, deadline=deadline, cursor=cursor)
+            else:
+                self.logger.info(f"Scanning current files of {repo_full_name} (max_file_age={args.file_age}m)...")
+                only_paths = self.repo_processor.changed_files(local_path, since_sha) if since_sha else None
+                # Without a checkout the files are read straight from the object database
+                scan_files = self.repo_processor.scan_current_files if args.checkout else self.repo_processor.scan_tree
+                repo_findings = scan_files(local_path, scanner_func=self.matcher.scan_text, max_file_age_months=args.file_age, processes=args.scan_processes, only_paths=only_paths, report=report, deadline=deadline)
+        except Exception:
+            if self.mirrors:
+                self.mirrors.release(local_path)
             else:
-                self.logger.info(f"Scanning current files (max_file_age={args.file_age}m)...")
-                repo_findings = self.repo_processor.scan_current_files(local_path, scanner_func=self.matcher.scan_text, max_file_age_months=args.file_age)
-                
-            # Post-process findings
-            self._enrich_findings(repo_findings, html_url, local_path)
-                    
+                self.repo_processor.delete_repo(local_path)
+            raise
+
+        if report:
+            incomplete = report.partial or report.budget_exhausted
+            (self.logger.warning if incomplete else self.logger.info)(f"{repo_full_name}: {report.summary()}")
+            self.scan_report.merge(report)
+            if incomplete:
+                # Not everything up to HEAD was scanned: don't let an incremental rescan start from it
+                job["head_sha"] = None
+
+        # Post-process findings
+        self._enrich_findings(repo_findings, job["repo"].get('html_url', ''))
+        job["findings"] = repo_findings
+        return job
+
+    def _write_stage(self, job, results_file, args):
+        repo = job["repo"]
+        repo_full_name = repo.get('full_name', 'unknown')
+        repo_id = str(repo.get('id', ''))
+        repo_findings = job["findings"]
+
+        # Results and the history mark are written together so they never disagree
+        with self._write_lock:
+            if self.metrics:
+                self.metrics.observe("repo_findings", len(repo_findings), COUNT_BUCKETS)
             if repo_findings:
                 self.logger.warning(f"FOUND {len(repo_findings)} SECRETS in {repo_full_name}!")
-                self.result_writer.save(repo_findings, results_file)
-                total_findings += len(repo_findings)
+                if self.metrics:
+                    with self.metrics.timer("write_results"):
+                        self.result_writer.save(repo_findings, results_file)
+                else:
+                    self.result_writer.save(repo_findings, results_file)
+                self.total_findings += len(repo_findings)
             else:
                 self.logger.info(f"No secrets found in {repo_full_name}.")
-            
-            # Mark as scanned
-            if repo_id and repo_id != "manual":
-                mark_as_scanned(repo_id)
-                
-            # Cleanup
-            self.repo_processor.delete_repo(local_path)
-        
-        self.logger.info(f"Scan complete. Total findings: {total_findings}. Results saved to {results_file}")
+
+            # Mark as scanned (manual repos only in incremental mode, to remember their HEAD)
+            if (repo_id and repo_id != "manual") or args.incremental:
+                self.history.mark_as_scanned(self._history_key(repo), full_name=repo_full_name, head_sha=job.get("head_sha"), mode=args.mode, pattern_version=self.matcher.version)
+
+            if self.manifest:
+                # Findings reach the disk before the repo counts as done, so a resumed run neither loses nor repeats them
+                self.result_writer.flush()
+                self.manifest.complete(self._history_key(repo))
+
+        lease = job.get("lease")
+        if lease:
+            with self._leases_lock:
+                self._leases.pop(lease.key, None)
+            if not self.work_queue.complete(lease):
+                self.logger.warning(f"Lease on {repo_full_name} expired and another worker claimed it; it may be scanned twice.")
+
+        # Cleanup (incremental mode keeps the clone to fetch into next time, the mirror cache its mirror)
+        if self.mirrors:
+            self.mirrors.release(job["local_path"])
+        elif not args.incremental:
+            self.repo_processor.delete_repo(job["local_path"])
+        return job
+
+    def _write_metrics(self, results_file, run_id):
+        """Writes the --metrics report (JSON and Prometheus text) and the --profile stats next to the results file."""
+        results_dir = os.path.dirname(results_file)
+        if self.metrics:
+            extra = {"findings": self.total_findings}
+            if self._client is not None:
+                extra["search_requests"] = {"sent": self._client.requests_sent, "rate_limited": self._client.rate_limited}
+            report = self.metrics.report(run_id, self.pipeline, self.matcher.stats, extra)
+            json_file = os.path.join(results_dir, f"metrics_{run_id}.json")
+            try:
+                self.metrics.write(report, json_file, os.path.join(results_dir, f"metrics_{run_id}.prom"))
+                self.logger.info(f"Metrics saved to {json_file} (and .prom)")
+            except OSError as e:
+                self.logger.error(f"Failed to save metrics: {e}")
+            self.metrics = None
+            self.repo_processor.metrics = None
+        if self._profile:
+            profile_file = os.path.join(results_dir, f"profile_{run_id}.pstats")
+            try:
+                os.makedirs(results_dir, exist_ok=True)
+                self._profile.dump_stats(profile_file)
+                top = io.StringIO()
+                self._profile.stream = top
+                self._profile.sort_stats("cumulative").print_stats(15)
+                self.logger.info(f"Scan stage profile saved to {profile_file} (python -m pstats {profile_file}). Top functions:\n{top.getvalue()}")
+            except OSError as e:
+                self.logger.error(f"Failed to save the profile: {e}")
+            self._profile = None
+
+    @staticmethod
+    def manual_repo(repo_url):
+        """A repo dict, shaped like the search API's, for a repository given by URL."""
+        repo_name = repo_url.rstrip('/').split('/')[-1].replace('.git', '')
+        return {
+            "id": "manual",
+            "name": repo_name,
+            "full_name": repo_name,
+            "clone_url": repo_url,
+            "html_url": repo_url.replace('.git', '')
+        }
 
     def _get_repositories(self, args):
         if args.repo:
             self.logger.info(f"Scanning specific repository: {args.repo}")
-            repo_name = args.repo.rstrip('/').split('/')[-1].replace('.git', '')
-            return [{
-                "id": "manual",
-                "name": repo_name,
-                "full_name": repo_name,
-                "clone_url": args.repo,
-                "html_url": args.repo.replace('.git', '')
-            }]
+            return [self.manual_repo(args.repo)]
         else:
             # Load history
-            scanned_ids = load_scanned_ids()
-            self.logger.info(f"Loaded {len(scanned_ids)} previously scanned repositories.")
+            scanned_ids = HistoryExclusions(self.history)
+            self.logger.info(f"{self.history.count()} repositories were scanned before.")
             
             min_created = None
             if args.repo_age > 0:
@@ -103,17 +555,70 @@ class ScannerEngine:
                 min_created = date_threshold.strftime("%Y-%m-%d")
                 self.logger.info(f"Filtering repos created after: {min_created}")
             
-            self.logger.info(f"Searching for {args.count} random repositories (Max Stars: {args.max_stars})...")
-            return self.client.search_repositories(max_stars=args.max_stars, limit=args.count, exclude_ids=scanned_ids, min_created_date=min_created)
+            if args.no_frontier:
+                self.logger.info(f"Searching for {args.count} random repositories (Max Stars: {args.max_stars})...")
+                return self.client.search_repositories(max_stars=args.max_stars, limit=args.count, exclude_ids=scanned_ids, min_created_date=min_created)
+
+            # Candidates left over from earlier searches come first: no API call before scanning starts
+            self.frontier = RepoFrontier()
+            repos = self.frontier.take(args.count, exclude_ids=scanned_ids, max_stars=args.max_stars, min_created_date=min_created)
+            self.logger.info(f"Took {len(repos)} repositories from the candidate frontier.")
+
+            exclude_ids = HistoryExclusions(self.history, self.frontier.ids() | {str(r.get('id')) for r in repos})
+            if len(repos) < args.count:
+                missing = args.count - len(repos)
+                self.logger.info(f"Searching for {missing} random repositories (Max Stars: {args.max_stars})...")
+                repos += self.client.search_repositories(max_stars=args.max_stars, limit=missing, exclude_ids=exclude_ids, min_created_date=min_created, frontier=self.frontier)
+
+            remaining = self.frontier.count(max_stars=args.max_stars, min_created_date=min_created)
+            if remaining < FRONTIER_MIN_CANDIDATES:
+                # Refill while this run clones and scans, so the next run can start right away
+                self.logger.info(f"Candidate frontier is low ({remaining} left). Refilling in the background...")
+                self._refill_stop.clear()
+                self._refill_thread = threading.Thread(
+                    target=self._refill_frontier,
+                    args=(args.max_stars, exclude_ids.copy(), min_created),
+                    name="frontier-refill",
+                    daemon=True,
+                )
+                self._refill_thread.start()
+            return repos
 
-    def _enrich_findings(self, findings, html_url, local_path):
+    def _refill_frontier(self, max_stars, exclude_ids, min_created):
+        try:
+            found = self.client.search_repositories(max_stars=max_stars, limit=FRONTIER_REFILL_COUNT, exclude_ids=exclude_ids, min_created_date=min_created, frontier=self.frontier, stop=self._refill_stop)
+            self.frontier.add(found)
+        except Exception as e:
+            self.logger.error(f"Candidate frontier refill failed: {e}")
+
+    def _finish_refill(self):
+        """Stops the background refill after its pages in flight and keeps what it found so far."""
+        if self._refill_thread:
+            if self._refill_thread.is_alive():
+                self.logger.info("Stopping the candidate frontier refill...")
+                self._refill_stop.set()
+            self._refill_thread.join(REFILL_STOP_TIMEOUT)
+            if self._refill_thread.is_alive():
+                # Still waiting on the rate limit; it's a daemon thread, so it won't hold up exit.
+                # The frontier stays open for it: everything it stores until then is kept.
+                self.logger.warning(f"Candidate frontier refill didn't stop within {REFILL_STOP_TIMEOUT}s; leaving it behind.")
+                self._refill_thread = None
+                self.frontier = None
+                return
+            self._refill_thread = None
+        if self.frontier:
+            self.frontier.close()
+            self.frontier = None
+
+    def _enrich_findings(self, findings, html_url):
         for f in findings:
-            f['repo'] = html_url
-            if 'file_diff: ' in f.get('location', ''):
-                path = f['location'].replace('file_diff: ', '')
-                f['file_url'] = f"{html_url}/blob/{f['commit']}/{path}"
-            elif 'file: ' in f.get('location', ''):
-                rel_path = f['location'].replace('file: ', '').replace(local_path, '').replace('\\', '/').lstrip('/')
-                f['file_url'] = f"{html_url}/blob/HEAD/{rel_path}"
+            f.repo = html_url
+            if f.kind == KIND_FILE_DIFF:
+                f.file_url = f"{html_url}/blob/{f.commit}/{f.path}"
+            elif f.kind == KIND_FILE:
+                f.file_url = f"{html_url}/blob/HEAD/{f.path}"
             else:
-                f['file_url'] = "N/A"
+                f.file_url = "N/A"
+                continue
+            if f.line:
+                f.file_url += f"#L{f.line}"
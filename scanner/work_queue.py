@@ -0,0 +1,200 @@
+import json
+import os
+import sqlite3
+import threading
+import time
+import uuid
+
+# Valid path relative for execution from root
+CACHE_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "cache")
+WORK_QUEUE_DB = os.path.join(CACHE_DIR, "work_queue.sqlite")
+
+STATE_PENDING = "pending"
+STATE_LEASED = "leased"
+STATE_DONE = "done"
+STATE_FAILED = "failed"
+
+
+class Lease:
+    """A claimed job: its key, its item and the token that proves the claim is still ours."""
+    def __init__(self, key, item, token, attempts):
+        self.key = key
+        self.item = item
+        self.token = token
+        self.attempts = attempts
+
+    def __repr__(self):
+        return f"Lease({self.key!r}, attempt {self.attempts})"
+
+
+class WorkQueue:
+    """
+    Jobs shared by any number of workers, handed out under leases.
+    claim() leases the oldest pending job to one worker for lease_seconds; the worker
+    extends its leases with heartbeat() while it works and ends them with complete(),
+    fail() or release(). A lease that isn't extended in time (its worker died or hung)
+    expires and the job is claimed again, so a dead worker loses at most its leased jobs.
+    Jobs leased max_attempts times without completing are marked failed.
+    Every call on an expired lease that someone else has claimed since is a no-op
+    returning False.
+    """
+    def put(self, items, key):
+        """Adds the items not queued before (by key(item)); returns how many were added."""
+        raise NotImplementedError
+
+    def claim(self, worker):
+        """Leases the next job to worker (a name for logs); returns a Lease, or None if none is claimable."""
+        raise NotImplementedError
+
+    def heartbeat(self, leases):
+        """Extends leases; returns the ones that were lost (expired and claimed by another worker)."""
+        raise NotImplementedError
+
+    def complete(self, lease):
+        raise NotImplementedError
+
+    def fail(self, lease, error, retry=True):
+        """Ends a failed attempt: the job is pending again if retry and attempts are left, else failed."""
+        raise NotImplementedError
+
+    def release(self, lease):
+        """Gives a job back unattempted (e.g. on shutdown)."""
+        raise NotImplementedError
+
+    def counts(self):
+        """Jobs per state (STATE_PENDING, STATE_LEASED, STATE_DONE, STATE_FAILED)."""
+        raise NotImplementedError
+
+    def keys(self):
+        """Keys of every job ever queued."""
+        raise NotImplementedError
+
+    def close(self):
+        pass
+
+
+class SqliteWorkQueue(WorkQueue):
+    """
+    WorkQueue in a SQLite file. Claims run in an IMMEDIATE transaction, so concurrent
+    workers (threads or processes, on one machine or sharing a filesystem with working
+    POSIX locks) never lease the same job twice.
+    """
+    def __init__(self, path=WORK_QUEUE_DB, lease_seconds=300, max_attempts=3):
+        self.path = path
+        self.lease_seconds = lease_seconds
+        self.max_attempts = max_attempts
+        self._lock = threading.Lock()
+
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        # Transactions are explicit (isolation_level=None), so a claim can take the write lock up front
+        self._conn = sqlite3.connect(path, timeout=60, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS jobs ("
+            "id INTEGER PRIMARY KEY, key TEXT NOT NULL UNIQUE, item TEXT NOT NULL, state TEXT NOT NULL, "
+            "owner TEXT, token TEXT, lease_expires REAL, attempts INTEGER NOT NULL DEFAULT 0, "
+            "error TEXT, updated_at REAL)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS jobs_state ON jobs (state, lease_expires)")
+
+    def put(self, items, key):
+        rows = [(str(key(item)), json.dumps(item), STATE_PENDING, time.time()) for item in items]
+        with self._lock:
+            before = self._conn.total_changes
+            self._conn.execute("BEGIN IMMEDIATE")
+            self._conn.executemany("INSERT OR IGNORE INTO jobs (key, item, state, updated_at) VALUES (?, ?, ?, ?)", rows)
+            self._conn.execute("COMMIT")
+            return self._conn.total_changes - before
+
+    def claim(self, worker):
+        now = time.time()
+        token = uuid.uuid4().hex
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                # Jobs whose every lease expired likely kill or hang their worker
+                self._conn.execute(
+                    "UPDATE jobs SET state = ?, error = 'Lease expired on every attempt', updated_at = ? "
+                    "WHERE state = ? AND lease_expires < ? AND attempts >= ?",
+                    (STATE_FAILED, now, STATE_LEASED, now, self.max_attempts),
+                )
+                row = self._conn.execute(
+                    "SELECT id, key, item, attempts FROM jobs "
+                    "WHERE state = ? OR (state = ? AND lease_expires < ?) ORDER BY id LIMIT 1",
+                    (STATE_PENDING, STATE_LEASED, now),
+                ).fetchone()
+                if row:
+                    self._conn.execute(
+                        "UPDATE jobs SET state = ?, owner = ?, token = ?, lease_expires = ?, attempts = attempts + 1, updated_at = ? WHERE id = ?",
+                        (STATE_LEASED, worker, token, now + self.lease_seconds, now, row[0]),
+                    )
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+        if not row:
+            return None
+        return Lease(row[1], json.loads(row[2]), token, row[3] + 1)
+
+    def heartbeat(self, leases):
+        lost = []
+        expires = time.time() + self.lease_seconds
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            for lease in leases:
+                if not self._update(lease, "lease_expires = ?", (expires,)):
+                    lost.append(lease)
+            self._conn.execute("COMMIT")
+        return lost
+
+    def complete(self, lease):
+        with self._lock:
+            return self._update(lease, "state = ?, token = NULL, error = NULL", (STATE_DONE,))
+
+    def fail(self, lease, error, retry=True):
+        state = STATE_PENDING if retry and lease.attempts < self.max_attempts else STATE_FAILED
+        with self._lock:
+            return self._update(lease, "state = ?, token = NULL, error = ?", (state, str(error)))
+
+    def release(self, lease):
+        with self._lock:
+            return self._update(lease, "state = ?, token = NULL, attempts = attempts - 1", (STATE_PENDING,))
+
+    def counts(self):
+        with self._lock:
+            rows = self._conn.execute("SELECT state, COUNT(*) FROM jobs GROUP BY state").fetchall()
+        counts = {state: 0 for state in (STATE_PENDING, STATE_LEASED, STATE_DONE, STATE_FAILED)}
+        counts.update(rows)
+        return counts
+
+    def keys(self):
+        with self._lock:
+            return {row[0] for row in self._conn.execute("SELECT key FROM jobs")}
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+    def _update(self, lease, assignments, values):
+        """Applies assignments to the lease's job if the lease is still held; True if it was."""
+        cursor = self._conn.execute(
+            f"UPDATE jobs SET {assignments}, updated_at = ? WHERE key = ? AND token = ? AND state = ?",
+            (*values, time.time(), lease.key, lease.token, STATE_LEASED),
+        )
+        return cursor.rowcount == 1
+
+
+# Work queue backends by URL scheme; a bare path is a SQLite file
+BACKENDS = {
+    "sqlite": SqliteWorkQueue,
+}
+
+
+def open_work_queue(url, **kwargs):
+    """Opens the work queue at url, e.g. "sqlite:///shared/queue.sqlite" or just a path."""
+    scheme, sep, location = url.partition("://")
+    if not sep:
+        return SqliteWorkQueue(url, **kwargs)
+    if scheme not in BACKENDS:
+        raise ValueError(f"Unknown work queue backend '{scheme}' (known: {', '.join(sorted(BACKENDS))})")
+    return BACKENDS[scheme](location, **kwargs)
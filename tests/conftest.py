@@ -0,0 +1,147 @@
+"""
+Shared test helpers: small local git repositories built commit by commit, and the
+worker processes that scan a shared work queue as `main.py --queue` workers do.
+"""
+import csv
+import logging
+import os
+import sqlite3
+import subprocess
+import sys
+import time
+
+import pytest
+
+GIT_IDENTITY = ["-c", "user.name=test", "-c", "user.email=test@example.com"]
+
+
+def git(repo_path, *args):
+    """Runs git in repo_path and returns its stdout."""
+    return subprocess.run(
+        ["git", *GIT_IDENTITY, *args], cwd=repo_path, check=True, capture_output=True, text=True,
+    ).stdout
+
+
+def commit_files(repo_path, files, message):
+    """
+    Writes files ({path: content}, content None deletes the path) and commits them;
+    returns the new commit sha.
+    """
+    for path, content in files.items():
+        full_path = os.path.join(repo_path, path)
+        if content is None:
+            git(repo_path, "rm", "-q", path)
+            continue
+        os.makedirs(os.path.dirname(full_path) or repo_path, exist_ok=True)
+        with open(full_path, "w", encoding="utf-8", newline="\n") as f:
+            f.write(content)
+        git(repo_path, "add", path)
+    git(repo_path, "commit", "-q", "--allow-empty", "-m", message)
+    return git(repo_path, "rev-parse", "HEAD").strip()
+
+
+def init_repo(repo_path):
+    os.makedirs(repo_path, exist_ok=True)
+    git(repo_path, "init", "-q", "-b", "main")
+    git(repo_path, "config", "core.quotepath", "true")
+    return repo_path
+
+
+def repo_entry(repo_path, repo_id):
+    """A search-API-shaped repo dict for a local repository."""
+    name = os.path.basename(repo_path)
+    return {
+        "id": repo_id,
+        "name": name,
+        "full_name": f"test/{name}",
+        "clone_url": "file://" + os.path.abspath(repo_path).replace("\\", "/"),
+        "html_url": f"https://example.invalid/test/{name}",
+    }
+
+
+def secret_line(n):
+    return f'AWS_KEY = "AKIA{"ABCDEFGHIJKLMNOP"[n % 16:] + "QRSTUVWXYZABCDEF"[:n % 16]}"'
+
+
+def create_repos(base_dir, count, files=4, commits=2):
+    """count repos of files modules over commits commits, one AWS key per module; returns their repo dicts."""
+    repos = []
+    for i in range(count):
+        repo_path = init_repo(os.path.join(base_dir, f"repo_{i}"))
+        for commit in range(commits):
+            changed = {
+                f"src/module_{index}.py": f"value = {commit}\n{secret_line(i * files + index + commit)}\n"
+                for index in range(commit, files, commits)
+            }
+            commit_files(repo_path, changed, f"commit {commit}")
+        repos.append(repo_entry(repo_path, 900000 + i))
+    return repos
+
+
+@pytest.fixture
+def make_repo(tmp_path):
+    """Factory: make_repo(name) initialises an empty git repo under tmp_path and returns its path."""
+    return lambda name="repo": init_repo(str(tmp_path / name))
+
+
+def queue_args(queue_path, lease_seconds):
+    from main import build_parser
+    return build_parser().parse_args([
+        "--mode", "history", "--depth", "10", "--clone-workers", "2", "--scan-workers", "1", "--no-frontier",
+        "--regex-engine", "re", "--file-budget", "0", "--repo-budget", "0", "--max-file-size", "0",
+        "--queue", queue_path, "--lease-seconds", str(lease_seconds),
+    ])
+
+
+def queue_worker(workdir, queue_path, lease_seconds):
+    """A `main.py --queue` worker sharing the scan history and scan cache next to queue_path."""
+    import scanner.scan_cache
+    import utils.history
+    import utils.run_manifest
+    from scanner.scanner_engine import ScannerEngine
+    from utils.result_writer import ResultWriter
+
+    # Keep clones, results and the shared databases out of the real project directories
+    shared_dir = os.path.dirname(queue_path)
+    os.chdir(workdir)
+    utils.history.HISTORY_DB = os.path.join(shared_dir, "scan_history.sqlite")
+    utils.history.HISTORY_FILE = os.path.join(shared_dir, "scanned_repos.txt")
+    utils.run_manifest.RUNS_DIR = os.path.join(workdir, "runs")
+    scanner.scan_cache.SCAN_CACHE_FILE = os.path.join(shared_dir, "scan_cache.sqlite")
+    logging.basicConfig(level=logging.ERROR)
+    sys.stdout = open(os.devnull, "w")  # Clone/scan progress lines
+    engine = ScannerEngine()
+    engine.result_writer = ResultWriter("csv")  # Read back by written_findings
+    engine.run(queue_args(queue_path, lease_seconds))
+
+
+def run_queue_workers(context, workdir, queue_path, count, lease_seconds=300, timeout=None):
+    """Runs count worker processes on the queue until they exit; workers still running after timeout seconds are killed."""
+    processes = [context.Process(target=queue_worker, args=(os.path.join(workdir, f"w{i}"), queue_path, lease_seconds))
+                 for i in range(count)]
+    for i, process in enumerate(processes):
+        os.makedirs(os.path.join(workdir, f"w{i}"), exist_ok=True)
+        process.start()
+    deadline = time.monotonic() + timeout if timeout else None
+    for process in processes:
+        process.join(max(0.0, deadline - time.monotonic()) if deadline else None)
+        if process.is_alive():
+            process.kill()
+            process.join()
+
+
+def lease_attempts(queue_path):
+    """Leases handed out per final job state."""
+    with sqlite3.connect(queue_path) as conn:
+        return dict(conn.execute("SELECT state, SUM(attempts) FROM jobs GROUP BY state").fetchall())
+
+
+def written_findings(workdir):
+    """(findings written by all workers of a run, how many of them repeat a finding already written)."""
+    fingerprints = []
+    for root, _, files in os.walk(workdir):
+        for name in files:
+            if name.startswith("scan_results_") and name.endswith(".csv"):
+                with open(os.path.join(root, name), 'r', encoding='utf-8', newline='') as f:
+                    fingerprints.extend(row["fingerprint"] for row in csv.DictReader(f))
+    return len(fingerprints), len(fingerprints) - len(set(fingerprints))
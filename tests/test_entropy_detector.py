@@ -0,0 +1,46 @@
+"""
+EntropyDetector reports random hex and base64 tokens but not the SHA-1/SHA-256 digests
+(commit IDs, checksums, integrity values) that fill lockfiles and build files.
+"""
+import hashlib
+
+import pytest
+
+from scanner.entropy_detector import EntropyDetector, np
+
+SHA1 = hashlib.sha1(b"a commit").hexdigest()
+SHA256 = hashlib.sha256(b"a tarball").hexdigest()
+SECRET = hashlib.sha1(b"not a hash, a random key").hexdigest()
+INTEGRITY = "sha512-" + "Qm9vdHN0cmFwIGludGVncml0eSB2YWx1ZSBmb3IgYSB0ZXN0IHBhY2thZ2UgMTIzNDU2Nzg5MA0K+/AB=="
+
+TEXT = f"""\
+commit {SHA1}
+checksum = "{SHA256}"
+"integrity": "{INTEGRITY}"
+api_key = "{SECRET}"
+"""
+
+
+@pytest.fixture(params=[False, True], ids=["python", "numpy"])
+def detector(request):
+    if request.param and np is None:
+        pytest.skip("numpy is not installed")
+    return EntropyDetector(vectorized=request.param)
+
+
+@pytest.mark.parametrize("as_bytes", [False, True], ids=["str", "bytes"])
+def test_known_hashes_are_not_reported(detector, as_bytes):
+    text = TEXT.encode('ascii') if as_bytes else TEXT
+    assert [m["value"] for m in detector.scan_text(text)] == [SECRET]
+
+
+def test_sha1_without_hash_context_is_still_a_candidate(detector):
+    # The same digest assigned to a credential is reported
+    values = [m["value"] for m in detector.scan_text(f'token = "{SHA1}"\ncommit = 1\n')]
+    assert values == [SHA1]
+
+
+def test_filter_can_be_turned_off():
+    detector = EntropyDetector(vectorized=False, skip_known_hashes=False)
+    assert SHA1 in [m["value"] for m in detector.scan_text(TEXT)]
+    assert detector.version != EntropyDetector(vectorized=False).version
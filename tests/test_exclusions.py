@@ -0,0 +1,57 @@
+"""
+ExclusionRules follow gitignore semantics for re-includes, and the ScanReport of a
+scan names example paths for what it skipped.
+"""
+import os
+
+from scanner.exclusions import ExclusionRules, REASON_EXCLUDED
+from scanner.repo_processor import RepoProcessor
+from scanner.scan_report import ScanReport
+
+
+def test_reinclude_wins_over_rules_matching_the_path_itself():
+    rules = ExclusionRules(["*.min.js", "!keep.min.js"])
+    assert rules.check_file("dist/app.min.js") == REASON_EXCLUDED
+    assert rules.check_file("dist/keep.min.js") is None
+
+
+def test_file_under_an_excluded_directory_is_only_reincluded_with_its_directory():
+    rules = ExclusionRules(["vendor/", "!vendor/lib/config.py"])
+    assert rules.excludes_dir("vendor")
+    assert rules.check_file("vendor/lib/config.py") == REASON_EXCLUDED
+
+    rules = ExclusionRules(["vendor/", "!vendor/"])
+    assert not rules.excludes_dir("vendor")
+    assert rules.check_file("vendor/lib/config.py") is None
+
+
+def test_walk_prunes_excluded_directories_and_report_names_examples(tmp_path):
+    for rel_path in ("app.py", "vendor/lib/config.py", "logo.png"):
+        os.makedirs(os.path.dirname(tmp_path / rel_path), exist_ok=True)
+        (tmp_path / rel_path).write_text("x = 1\n")
+    rules = ExclusionRules(["vendor/", "!vendor/lib/config.py", "*.png"])
+    processor = RepoProcessor(temp_dir=str(tmp_path), exclusions=rules)
+    report = ScanReport()
+    try:
+        scanned = []
+        processor.scan_current_files(str(tmp_path), lambda text: scanned.append(text) or [], report=report)
+    finally:
+        processor.close()
+
+    assert scanned == [b"x = 1\n"]
+    # Walking prunes vendor/ just as excludes_path rejects files below it
+    assert rules.check_file("vendor/lib/config.py") == REASON_EXCLUDED
+    assert report.skipped_dirs == 1
+    assert report.samples == {"": ["vendor/"], REASON_EXCLUDED: ["logo.png"]}
+    assert "vendor/" in report.summary() and "logo.png" in report.summary()
+
+
+def test_report_keeps_a_capped_sample_per_reason():
+    report = ScanReport()
+    other = ScanReport()
+    for i in range(5):
+        report.skip(f"img{i}.png", REASON_EXCLUDED, 10)
+        other.skip(f"other{i}.png", REASON_EXCLUDED, 10)
+    report.merge(other)
+    assert report.skipped_files == {REASON_EXCLUDED: 10}
+    assert report.samples[REASON_EXCLUDED] == ["img0.png", "img1.png", "img2.png"]
@@ -0,0 +1,121 @@
+"""
+RepoProcessor.iter_history parses one `git log --patch` stream: commits start at the
+\\x1e marker, messages end at \\x1f, file diffs at "+++ b/<path>", and added lines get
+their new-file line numbers from the hunk headers. Checked against real repositories.
+"""
+import pytest
+
+from config import PATTERNS
+from conftest import commit_files, git
+from scanner.finding import KIND_COMMIT_MESSAGE, KIND_FILE_DIFF
+from scanner.pattern_matcher import PatternMatcher
+from scanner.repo_processor import HUNK_HEADER, RepoProcessor, _diff_path
+
+
+def key(n):
+    """A distinct AWS access key per n."""
+    return "AKIA" + f"{n:016d}".translate(str.maketrans("0123456789", "ABCDEFGHIJ"))
+
+
+def findings(repo_path, **kwargs):
+    processor = RepoProcessor()
+    try:
+        return list(processor.iter_history(repo_path, scanner_func=PatternMatcher(PATTERNS).scan_text, **kwargs))
+    finally:
+        processor.close()
+
+
+def by_value(found):
+    return {f.value: f for f in found}
+
+
+@pytest.mark.parametrize("header, line", [
+    (b"@@ -3 +5,2 @@ def f():\n", 5),
+    (b"@@ -0,0 +1 @@\n", 1),
+    (b"@@ -10,4 +12 @@\n", 12),
+    (b"@@ -7,2 +0,0 @@\n", 0),
+])
+def test_hunk_header_gives_the_new_start_line(header, line):
+    assert int(HUNK_HEADER.match(header).group(1)) == line
+
+
+@pytest.mark.parametrize("raw, path", [
+    (b"b/src/app.py\n", "src/app.py"),
+    (b"b/my file.py\t\n", "my file.py"),
+    (b'"b/we\\"ird\\tname.py"\n', 'we"ird\tname.py'),
+    ("b/café.py\n".encode("utf-8"), "café.py"),
+    (b"/dev/null\n", None),
+])
+def test_diff_path_decodes_patch_headers(raw, path):
+    assert _diff_path(raw) == path
+
+
+def test_root_commit_is_scanned_as_added_lines(make_repo):
+    repo = make_repo()
+    root = commit_files(repo, {"config.py": f"a = 1\nKEY = '{key(1)}'\n"}, "root")
+
+    (finding,) = findings(repo)
+    assert (finding.value, finding.kind, finding.path, finding.commit) == (key(1), KIND_FILE_DIFF, "config.py", root)
+    assert (finding.line, finding.column) == (2, 8)
+
+
+def test_lines_of_a_multi_hunk_diff_are_new_file_line_numbers(make_repo):
+    repo = make_repo()
+    lines = [f"line_{i} = {i}\n" for i in range(1, 41)]
+    commit_files(repo, {"app.py": "".join(lines)}, "base")
+    lines[4] = f"first = '{key(1)}'\n"          # line 5
+    lines.insert(20, f"second = '{key(2)}'\n")   # new line 21
+    del lines[30:33]                             # deletions shift nothing above them
+    lines.append(f"third = '{key(3)}'\n")        # last line
+    change = commit_files(repo, {"app.py": "".join(lines)}, "change")
+
+    found = by_value(f for f in findings(repo) if f.commit == change)
+    assert {value: f.line for value, f in found.items()} == {key(1): 5, key(2): 21, key(3): len(lines)}
+
+
+def test_quoted_and_renamed_paths(make_repo):
+    repo = make_repo()
+    commit_files(repo, {"old name.py": "x = 1\n" * 10}, "base")
+    git(repo, "mv", "old name.py", "new name.py")
+    renamed = commit_files(repo, {
+        "new name.py": "x = 1\n" * 10 + f"KEY = '{key(1)}'\n",
+        'odd"quote.py': f"KEY = '{key(2)}'\n",
+        "café.py": f"KEY = '{key(3)}'\n",
+    }, "rename and add")
+
+    found = by_value(f for f in findings(repo) if f.commit == renamed)
+    assert {value: (f.path, f.line) for value, f in found.items()} == {
+        key(1): ("new name.py", 11),
+        key(2): ('odd"quote.py', 1),
+        key(3): ("café.py", 1),
+    }
+
+
+def test_deleted_lines_and_files_are_not_scanned(make_repo):
+    repo = make_repo()
+    commit_files(repo, {"a.py": f"KEY = '{key(1)}'\nx = 1\n", "b.py": f"KEY = '{key(2)}'\n"}, "add")
+    removal = commit_files(repo, {"a.py": "x = 1\n", "b.py": None}, "remove keys")
+
+    assert [f for f in findings(repo) if f.commit == removal] == []
+    assert set(by_value(findings(repo))) == {key(1), key(2)}
+
+
+def test_commit_message_findings(make_repo):
+    repo = make_repo()
+    commit_files(repo, {"a.py": "x = 1\n"}, "add")
+    leaky = commit_files(repo, {"a.py": "x = 2\n"}, f"Rotate credentials\n\nold key was {key(7)}\n")
+
+    (finding,) = findings(repo)
+    assert (finding.kind, finding.path, finding.commit) == (KIND_COMMIT_MESSAGE, None, leaky)
+    assert (finding.line, finding.column) == (3, 13)
+
+
+def test_skip_and_depth_select_commits_in_log_order(make_repo):
+    repo = make_repo()
+    shas = [commit_files(repo, {f"f{i}.py": f"KEY = '{key(i)}'\n"}, f"c{i}") for i in range(5)]
+    done = []
+
+    found = findings(repo, depth=3, skip=1, on_commit=done.append)
+    # Newest first: skip c4, then c3, c2 (depth counts the skipped commit too)
+    assert [f.commit for f in found] == [shas[3], shas[2]]
+    assert done == [1, 2]
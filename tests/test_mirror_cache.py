@@ -0,0 +1,71 @@
+"""
+MirrorCache checkouts: a failed fetch fails the checkout without touching the mirror,
+and a mirror is only replaced once no checkout is using it.
+"""
+import os
+import shutil
+import threading
+
+from conftest import commit_files
+from scanner.clone_strategy import CloneStrategy
+from scanner.mirror_cache import FileLock, MirrorCache
+
+
+def source_repo(make_repo):
+    repo_path = make_repo("source")
+    commit_files(repo_path, {"app.py": "print('hello')\n"}, "first")
+    return repo_path
+
+
+def test_failed_fetch_fails_the_checkout_and_keeps_the_mirror(tmp_path, make_repo, capsys):
+    source = source_repo(make_repo)
+    cache = MirrorCache(str(tmp_path / "mirrors"))
+    strategy = CloneStrategy.for_scan("current", checkout=True)
+    try:
+        first = cache.checkout("1", "file://" + source, str(tmp_path / "wt1"), strategy)
+        assert first and os.path.exists(os.path.join(first, "app.py"))
+
+        shutil.rmtree(source)  # The remote is unreachable now
+        assert cache.checkout("1", "file://" + source, str(tmp_path / "wt2"), strategy) is None
+        assert "Failed to update mirror" in capsys.readouterr().out
+        # The first checkout still works from the mirror
+        assert os.path.isdir(cache._mirror_path("1"))
+        assert os.path.exists(os.path.join(first, "app.py"))
+        cache.release(first)
+    finally:
+        cache.close()
+
+
+def test_unrecorded_mirror_is_replaced_only_after_its_checkouts_end(tmp_path, make_repo):
+    source = source_repo(make_repo)
+    cache = MirrorCache(str(tmp_path / "mirrors"))
+    strategy = CloneStrategy.for_scan("current", checkout=True)
+    mirror = cache._mirror_path("1")
+    try:
+        assert cache.checkout("1", "file://" + source, str(tmp_path / "wt1"), strategy)
+        # Lose the record (as after a crash mid-update); the mirror is still in use by wt1
+        with cache._lock:
+            cache._conn.execute("DELETE FROM mirrors")
+            cache._conn.commit()
+        marker = os.path.join(mirror, "in-use-marker")
+        open(marker, "w").close()
+
+        done = threading.Event()
+        result = []
+        thread = threading.Thread(target=lambda: (result.append(cache.checkout(
+            "1", "file://" + source, str(tmp_path / "wt2"), strategy)), done.set()))
+        thread.start()
+        assert not done.wait(1.0)
+        assert os.path.exists(marker)
+
+        cache.release(str(tmp_path / "wt1"))
+        thread.join(60)
+        assert result and result[0]
+        assert not os.path.exists(marker)
+        cache.release(result[0])
+        # Nothing holds the mirror any more
+        lock = FileLock(mirror + ".use", blocking=False)
+        assert lock.acquire()
+        lock.release()
+    finally:
+        cache.close()
@@ -0,0 +1,114 @@
+"""
+Result sinks append findings across runs, CSV files with other columns are left alone,
+and a JSON results file is written from its partial JSON-lines file on close().
+"""
+import csv
+import json
+import os
+import sqlite3
+
+from utils.result_writer import FIELDNAMES, JsonSink, ResultWriter
+
+
+def finding(n):
+    return {"repo": "https://example.invalid/r", "type": "AWS", "value": f"AKIA{n:016d}", "line": n, "fingerprint": f"fp{n}"}
+
+
+def read_csv(path):
+    with open(path, 'r', newline='', encoding='utf-8') as f:
+        return list(csv.reader(f))
+
+
+def test_csv_appends_rows_under_one_header(tmp_path):
+    path = str(tmp_path / "results.csv")
+    for run in range(2):
+        writer = ResultWriter("csv")
+        assert writer.save([finding(run)], path) == 1
+        writer.close()
+    rows = read_csv(path)
+    assert rows[0] == FIELDNAMES
+    assert [row[FIELDNAMES.index("fingerprint")] for row in rows[1:]] == ["fp0", "fp1"]
+
+
+def test_csv_with_other_columns_rotates_to_a_new_file(tmp_path):
+    path = str(tmp_path / "results.csv")
+    with open(path, 'w', newline='', encoding='utf-8') as f:
+        f.write("repo,type,value\nold,AWS,AKIA\n")
+
+    for run in range(2):
+        writer = ResultWriter("csv")
+        writer.save([finding(run)], path)
+        writer.close()
+
+    assert read_csv(path) == [["repo", "type", "value"], ["old", "AWS", "AKIA"]]
+    rows = read_csv(str(tmp_path / "results_2.csv"))
+    assert rows[0] == FIELDNAMES and len(rows) == 3
+
+
+def test_empty_csv_gets_a_header(tmp_path):
+    path = tmp_path / "results.csv"
+    path.write_text("")
+    writer = ResultWriter("csv")
+    writer.save([finding(1)], str(path))
+    writer.close()
+    assert read_csv(str(path))[0] == FIELDNAMES
+
+
+def test_jsonl_and_sqlite_append(tmp_path):
+    jsonl_path = str(tmp_path / "results.jsonl")
+    sqlite_path = str(tmp_path / "results.sqlite")
+    for run in range(2):
+        for output_format, path in (("jsonl", jsonl_path), ("sqlite", sqlite_path)):
+            writer = ResultWriter(output_format)
+            writer.save((finding(run * 10 + i) for i in range(3)), path)
+            writer.close()
+
+    with open(jsonl_path, 'r', encoding='utf-8') as f:
+        assert [json.loads(line)["line"] for line in f] == [0, 1, 2, 10, 11, 12]
+    with sqlite3.connect(sqlite_path) as conn:
+        assert [row[0] for row in conn.execute("SELECT line FROM findings ORDER BY id")] == [0, 1, 2, 10, 11, 12]
+
+
+def test_json_is_finalized_from_the_partial_file_on_close(tmp_path):
+    path = str(tmp_path / "results.json")
+    writer = ResultWriter("json")
+    writer.save([finding(1), finding(2)], path)
+    writer.flush()
+    # Until close() the findings live in the partial JSON-lines file only
+    assert not os.path.exists(path)
+    with open(f"{path}.partial.jsonl", 'r', encoding='utf-8') as f:
+        assert len(f.readlines()) == 2
+
+    writer.close()
+    assert not os.path.exists(f"{path}.partial.jsonl")
+    with open(path, 'r', encoding='utf-8') as f:
+        assert [item["line"] for item in json.load(f)] == [1, 2]
+
+    # A resumed run appends to the finished array
+    writer = ResultWriter("json")
+    writer.save([finding(3)], path)
+    writer.close()
+    with open(path, 'r', encoding='utf-8') as f:
+        assert [item["line"] for item in json.load(f)] == [1, 2, 3]
+
+
+def test_json_partial_file_left_by_a_crash_is_finalized(tmp_path):
+    path = str(tmp_path / "results.json")
+    crashed = JsonSink(path)
+    crashed.write([finding(1)])
+    crashed.flush()  # The process dies here: no close()
+
+    sink = JsonSink(path)
+    sink.write([finding(2)])
+    sink.close()
+    with open(path, 'r', encoding='utf-8') as f:
+        assert [item["line"] for item in json.load(f)] == [1, 2]
+
+
+def test_save_logs_and_returns_zero_when_the_file_cant_be_opened(tmp_path, caplog):
+    blocked = tmp_path / "results.csv"
+    blocked.mkdir()  # A directory where the file should be
+    writer = ResultWriter("csv")
+    assert writer.save([finding(1)], str(blocked)) == 0
+    assert "Failed to save CSV results" in caplog.text
+    writer.close()
@@ -0,0 +1,210 @@
+"""
+An interrupted run continues with --resume: repos it finished aren't scanned again, and
+a repo whose history scan was cut short continues after the commits its HistoryCursor
+checkpointed, with their findings written once. A cursor the clone can't continue from
+(history rewritten upstream, or older than the clone's shallow boundary reaches) falls
+back to scanning from the start.
+"""
+import csv
+import os
+
+import pytest
+
+import scanner.scan_cache
+import utils.history
+import utils.run_manifest
+from config import PATTERNS
+from conftest import commit_files, create_repos, git, secret_line
+from main import build_parser
+from scanner.pattern_matcher import PatternMatcher
+from scanner.repo_processor import RepoProcessor
+from scanner.scanner_engine import ScannerEngine
+from utils.result_writer import ResultWriter
+from utils.run_manifest import HistoryCursor
+
+DEPTH = 4
+
+
+class Interrupted(BaseException):
+    """The process being killed: not caught by the scan's error handling."""
+
+
+def interrupt_after(cursor, commits):
+    """Makes cursor checkpoint every commit and stop the scan once commits are checkpointed."""
+    save = cursor.save
+
+    def checkpoint(head, done, findings, force=False):
+        save(head, done, findings, force=True)
+        if done == commits:
+            raise Interrupted()
+    cursor.save = checkpoint
+    return cursor
+
+
+@pytest.fixture
+def workdir(tmp_path, monkeypatch):
+    """Runs in tmp_path, with the scan history, run manifests and scan cache kept there."""
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr(utils.history, "HISTORY_DB", str(tmp_path / "scan_history.sqlite"))
+    monkeypatch.setattr(utils.history, "HISTORY_FILE", str(tmp_path / "scanned_repos.txt"))
+    monkeypatch.setattr(utils.run_manifest, "RUNS_DIR", str(tmp_path / "runs"))
+    monkeypatch.setattr(scanner.scan_cache, "SCAN_CACHE_FILE", str(tmp_path / "scan_cache.sqlite"))
+    return tmp_path
+
+
+def engine_args(*extra):
+    return build_parser().parse_args([
+        "--mode", "history", "--depth", str(DEPTH), "--clone-workers", "1", "--scan-workers", "1", "--no-frontier",
+        "--regex-engine", "re", "--file-budget", "0", "--repo-budget", "0", "--max-file-size", "0", *extra,
+    ])
+
+
+def run_engine(args, repos, scan_history):
+    """Runs a ScannerEngine on repos, with scan_history(processor_method, local_path, **kwargs) in place of RepoProcessor.scan_history."""
+    engine = ScannerEngine()
+    engine.result_writer = ResultWriter("csv")
+    engine._get_repositories = lambda args: repos
+    real_scan_history = engine.repo_processor.scan_history
+    engine.repo_processor.scan_history = lambda local_path, **kwargs: scan_history(real_scan_history, local_path, **kwargs)
+    engine.run(args)
+
+
+def results_fingerprints(workdir):
+    fingerprints = []
+    for name in os.listdir(workdir / "results"):
+        with open(workdir / "results" / name, 'r', encoding='utf-8', newline='') as f:
+            fingerprints.extend(row["fingerprint"] for row in csv.DictReader(f))
+    return fingerprints
+
+
+def repo_name(local_path):
+    return os.path.basename(local_path).split("_", 1)[1]
+
+
+def test_resumed_run_skips_finished_repos_and_writes_findings_once(workdir):
+    repos = create_repos(str(workdir / "sources"), 3, files=4, commits=3)
+
+    def interrupted(scan_history, local_path, cursor=None, **kwargs):
+        name = repo_name(local_path)
+        if name == "repo_1":
+            # Killed after checkpointing one commit of its history
+            try:
+                scan_history(local_path, cursor=interrupt_after(cursor, 1), **kwargs)
+            except Interrupted:
+                pass
+        if name != "repo_0":
+            raise RuntimeError("interrupted")
+        return scan_history(local_path, cursor=cursor, **kwargs)
+
+    run_engine(engine_args(), repos, interrupted)
+    (run_id,) = os.listdir(workdir / "runs")
+    assert len(results_fingerprints(workdir)) == 4  # repo_0: one key per module
+
+    scanned = {}
+
+    def resumed(scan_history, local_path, cursor=None, **kwargs):
+        scanned[repo_name(local_path)] = (cursor.head, cursor.commits)
+        return scan_history(local_path, cursor=cursor, **kwargs)
+
+    run_engine(engine_args("--resume", run_id), repos, resumed)
+    # repo_0 was done, repo_1 continues after its checkpoint, repo_2 starts over
+    assert set(scanned) == {"repo_1", "repo_2"}
+    assert scanned["repo_1"][1] == 1 and scanned["repo_2"] == (None, 0)
+    assert not os.path.exists(workdir / "runs" / run_id)
+
+    fingerprints = results_fingerprints(workdir)
+    assert len(fingerprints) == len(set(fingerprints)) == 12
+
+
+def make_source(make_repo, commits):
+    source = make_repo("source")
+    for i in range(commits):
+        commit_files(source, {f"f{i}.py": secret_line(i) + "\n"}, f"c{i}")
+    return source
+
+
+def shallow_clone(source, path, depth=DEPTH + 1):
+    """A clone as the history mode makes it: depth+1 commits of the default branch."""
+    git(os.path.dirname(path), "clone", "-q", "--no-checkout", "--single-branch", f"--depth={depth}", "file://" + source, path)
+    return path
+
+
+def scan(repo_path, cursor=None, scanned=None):
+    """scan_history at DEPTH; scanned collects the values of every match the scanner makes."""
+    matcher = PatternMatcher(PATTERNS)
+
+    def scanner_func(data, **kwargs):
+        matches = matcher.scan_text(data, **kwargs)
+        if scanned is not None:
+            scanned.extend(m["value"] for m in matches)
+        return matches
+    processor = RepoProcessor()
+    try:
+        return processor.scan_history(repo_path, depth=DEPTH, scanner_func=scanner_func, cursor=cursor)
+    finally:
+        processor.close()
+
+
+def summary(findings):
+    return sorted((f.value, f.path, f.line, f.commit) for f in findings)
+
+
+def test_cursor_continues_after_the_checkpointed_commits(make_repo, tmp_path):
+    source = make_source(make_repo, 6)
+    clone = shallow_clone(source, str(tmp_path / "clone"))
+    expected = scan(clone)
+    cursor_file = str(tmp_path / "cursor.json")
+
+    with pytest.raises(Interrupted):
+        scan(clone, cursor=interrupt_after(HistoryCursor(cursor_file), 2))
+    scanned = []
+    resumed = scan(clone, cursor=HistoryCursor(cursor_file), scanned=scanned)
+
+    assert summary(resumed) == summary(expected)
+    # The two newest commits (c5, c4) came from the checkpoint, not from scanning them again
+    assert sorted(scanned) == sorted(secret_line(i).split('"')[1] for i in (3, 2))
+
+
+def test_rewritten_upstream_history_is_scanned_from_the_start(make_repo, tmp_path):
+    source = make_source(make_repo, 6)
+    cursor_file = str(tmp_path / "cursor.json")
+    with pytest.raises(Interrupted):
+        scan(shallow_clone(source, str(tmp_path / "before")), cursor=interrupt_after(HistoryCursor(cursor_file), 2))
+
+    # Force-pushed: the checkpointed HEAD is gone
+    git(source, "reset", "-q", "--hard", "HEAD~3")
+    commit_files(source, {"g.py": secret_line(9) + "\n"}, "rewritten")
+    clone = shallow_clone(source, str(tmp_path / "after"))
+
+    assert summary(scan(clone, cursor=HistoryCursor(cursor_file))) == summary(scan(clone))
+
+
+def test_clone_is_deepened_when_the_remote_moved_past_the_checkpoint(make_repo, tmp_path):
+    source = make_source(make_repo, 10)
+    before = shallow_clone(source, str(tmp_path / "before"))
+    expected = scan(before)
+    cursor_file = str(tmp_path / "cursor.json")
+    with pytest.raises(Interrupted):
+        scan(before, cursor=interrupt_after(HistoryCursor(cursor_file), 2))
+
+    # Two new commits: from the new HEAD the clone's boundary is the second commit still to scan
+    for i in (10, 11):
+        commit_files(source, {f"f{i}.py": secret_line(i) + "\n"}, f"c{i}")
+    after = shallow_clone(source, str(tmp_path / "after"))
+
+    assert summary(scan(after, cursor=HistoryCursor(cursor_file))) == summary(expected)
+
+
+def test_checkpoint_past_the_boundary_is_dropped_if_the_clone_cant_be_deepened(make_repo, tmp_path, capsys):
+    source = make_source(make_repo, 10)
+    cursor_file = str(tmp_path / "cursor.json")
+    with pytest.raises(Interrupted):
+        scan(shallow_clone(source, str(tmp_path / "before")), cursor=interrupt_after(HistoryCursor(cursor_file), 2))
+
+    for i in (10, 11):
+        commit_files(source, {f"f{i}.py": secret_line(i) + "\n"}, f"c{i}")
+    after = shallow_clone(source, str(tmp_path / "after"))
+    git(after, "remote", "remove", "origin")
+
+    assert summary(scan(after, cursor=HistoryCursor(cursor_file))) == summary(scan(after))
+    assert "Scanning from the start" in capsys.readouterr().out
@@ -0,0 +1,67 @@
+"""
+Large files are scanned in overlapping windows (_scan_stream): a secret crossing a
+window boundary is found once, a secret inside the overlap isn't reported twice, and
+offsets, lines and columns are the ones a scan of the whole file gives.
+"""
+import io
+
+import pytest
+
+from config import PATTERNS
+from scanner.exclusions import SNIFF_BYTES
+from scanner.pattern_matcher import PatternMatcher
+from scanner.repo_processor import STREAM_CHUNK_BYTES, STREAM_OVERLAP_BYTES, _scan_stream
+
+KEYS = ["AKIA" + letter * 16 for letter in "ABCDEFGH"]
+FILLER = b"value = compute(item, 12345)  # padding line\n"
+
+
+def build(placements, size):
+    """size bytes of filler lines with KEYS[i] written at each offset of placements."""
+    data = bytearray((FILLER * (size // len(FILLER) + 1))[:size])
+    for i, offset in enumerate(placements):
+        data[offset:offset + len(KEYS[i])] = KEYS[i].encode('ascii')
+    return bytes(data)
+
+
+def positions(matches):
+    return [(m["type"], m["value"], m["start"], m["end"], m["line"], m["column"]) for m in matches]
+
+
+def stream_scan(data, deadline=None):
+    head, rest = data[:SNIFF_BYTES], io.BytesIO(data[SNIFF_BYTES:])
+    return _scan_stream(PatternMatcher(PATTERNS).scan_text, head, rest.read, deadline)
+
+
+@pytest.mark.parametrize("placements", [
+    # Crossing the first window boundary, starting right at it, and ending right at it
+    [STREAM_CHUNK_BYTES - 10],
+    [STREAM_CHUNK_BYTES],
+    [STREAM_CHUNK_BYTES - len(KEYS[0])],
+    # Inside the overlap the first window reads past its chunk: found by both windows
+    [STREAM_CHUNK_BYTES + 100, STREAM_CHUNK_BYTES + STREAM_OVERLAP_BYTES - len(KEYS[1])],
+    # Across the second boundary, and the last bytes of the stream
+    [2 * STREAM_CHUNK_BYTES - 5, 3 * STREAM_CHUNK_BYTES + 1000 - len(KEYS[1])],
+])
+def test_stream_finds_each_secret_once_at_whole_file_positions(placements):
+    data = build(placements, 3 * STREAM_CHUNK_BYTES + 1000)
+    matches, partial = stream_scan(data)
+
+    assert not partial
+    assert sorted(m["value"] for m in matches) == sorted(KEYS[:len(placements)])
+    whole = PatternMatcher(PATTERNS).scan_text(data)
+    assert positions(matches) == positions(whole)
+
+
+def test_stream_shorter_than_a_window_is_scanned_at_once():
+    data = build([0, 5000], STREAM_CHUNK_BYTES // 2)
+    matches, partial = stream_scan(data)
+    assert not partial
+    assert positions(matches) == positions(PatternMatcher(PATTERNS).scan_text(data))
+
+
+def test_stream_stops_between_windows_past_the_deadline():
+    data = build([10, 2 * STREAM_CHUNK_BYTES + 10], 3 * STREAM_CHUNK_BYTES)
+    matches, partial = stream_scan(data, deadline=1)  # Long past
+    assert partial
+    assert [m["value"] for m in matches] == [KEYS[0]]
@@ -0,0 +1,120 @@
+"""
+SqliteWorkQueue leases, and two worker processes scanning one work queue while sharing
+the scan history and the scan cache as `main.py --queue` workers on one machine do:
+every repository is scanned once and no finding is written twice.
+
+Run from the project directory: python -m pytest tests
+"""
+import multiprocessing
+import os
+import time
+
+from conftest import create_repos, lease_attempts, run_queue_workers, written_findings
+from scanner.work_queue import STATE_DONE, STATE_FAILED, STATE_LEASED, STATE_PENDING, SqliteWorkQueue
+
+WORKER_TIMEOUT = 120
+SHORT_LEASE = 0.2
+
+
+def open_queue(tmp_path, **kwargs):
+    queue = SqliteWorkQueue(str(tmp_path / "queue.sqlite"), **kwargs)
+    queue.put([{"id": 1}, {"id": 2}], key=lambda item: item["id"])
+    return queue
+
+
+def test_expired_lease_is_claimed_again_and_loses_its_calls(tmp_path):
+    queue = open_queue(tmp_path, lease_seconds=SHORT_LEASE)
+    try:
+        first = queue.claim("a")
+        assert first.key == "1" and first.attempts == 1
+        time.sleep(SHORT_LEASE * 2)
+
+        second = queue.claim("b")
+        assert second.key == "1" and second.attempts == 2
+        assert second.token != first.token
+        # The first worker's late calls are no-ops: the job is b's now
+        assert not queue.complete(first)
+        assert not queue.fail(first, "late")
+        assert not queue.release(first)
+        assert queue.complete(second)
+        assert queue.counts()[STATE_DONE] == 1
+    finally:
+        queue.close()
+
+
+def test_lease_expiring_on_every_attempt_fails_the_job(tmp_path):
+    queue = open_queue(tmp_path, lease_seconds=SHORT_LEASE, max_attempts=2)
+    try:
+        for _ in range(2):
+            assert queue.claim("w").key == "1"
+            time.sleep(SHORT_LEASE * 2)
+        # Job 1 used up its attempts, so the next claim fails it and moves on
+        assert queue.claim("w").key == "2"
+        assert queue.counts()[STATE_FAILED] == 1
+    finally:
+        queue.close()
+
+
+def test_release_returns_the_job_unattempted(tmp_path):
+    queue = open_queue(tmp_path)
+    try:
+        lease = queue.claim("a")
+        assert queue.release(lease)
+        assert queue.counts()[STATE_PENDING] == 2
+        # Released twice would undo an attempt that isn't ours
+        assert not queue.release(lease)
+
+        again = queue.claim("b")
+        assert again.key == lease.key
+        assert again.attempts == 1
+    finally:
+        queue.close()
+
+
+def test_heartbeat_extends_held_leases_and_reports_lost_ones(tmp_path):
+    queue = open_queue(tmp_path, lease_seconds=SHORT_LEASE)
+    try:
+        lost = queue.claim("a")
+        kept = queue.claim("a")
+        time.sleep(SHORT_LEASE * 2)
+        # Both leases expired, but only the first job was claimed by another worker since
+        other = SqliteWorkQueue(queue.path, lease_seconds=60)
+        try:
+            assert other.claim("b").key == lost.key
+        finally:
+            other.close()
+
+        assert queue.heartbeat([kept, lost]) == [lost]
+        assert queue.complete(kept)
+        assert not queue.complete(lost)
+        counts = queue.counts()
+        assert counts[STATE_DONE] == 1 and counts[STATE_LEASED] == 1
+    finally:
+        queue.close()
+
+
+def run_queue(tmp_path, name, repos, workers):
+    workdir = str(tmp_path / name)
+    queue_path = os.path.join(workdir, "queue.sqlite")
+    os.makedirs(workdir)
+    queue = SqliteWorkQueue(queue_path)
+    try:
+        queue.put(repos, key=lambda repo: repo["id"])
+        run_queue_workers(multiprocessing.get_context("spawn"), workdir, queue_path, workers, timeout=WORKER_TIMEOUT)
+        counts = queue.counts()
+    finally:
+        queue.close()
+    return counts, lease_attempts(queue_path), written_findings(workdir)
+
+
+def test_two_workers_share_one_queue(tmp_path):
+    repos = create_repos(str(tmp_path / "sources"), 8, files=6, commits=3)
+    _, _, (expected, _) = run_queue(tmp_path, "one_worker", repos, 1)
+    counts, tries, (findings, duplicated) = run_queue(tmp_path, "two_workers", repos, 2)
+
+    assert expected > 0
+    assert counts[STATE_DONE] == len(repos)
+    # No lease was retried, e.g. after a write stage failed on a locked database
+    assert tries.get(STATE_DONE, 0) == len(repos)
+    assert duplicated == 0
+    assert findings == expected
@@ -1,26 +1,142 @@
+import logging
 import os
+import sqlite3
+import threading
+import time
 
 
 # Valid path relative for execution from root
 CACHE_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "cache")
+HISTORY_DB = os.path.join(CACHE_DIR, "scan_history.sqlite")
+# Plain-text history of earlier versions, migrated into HISTORY_DB once
 HISTORY_FILE = os.path.join(CACHE_DIR, "scanned_repos.txt")
 
+MIGRATION_BATCH = 10000
+
+logger = logging.getLogger(__name__)
+
 # Ensure cache directory exists
 os.makedirs(CACHE_DIR, exist_ok=True)
 
-def load_scanned_ids():
-    """Returns a set of scanned repository IDs (as strings)."""
-    if not os.path.exists(HISTORY_FILE):
-        return set()
-    
-    with open(HISTORY_FILE, 'r', encoding='utf-8') as f:
-        # Read non-empty lines and strip whitespace
-        return set(line.strip() for line in f if line.strip())
-
-def mark_as_scanned(repo_id):
-    """Appends a repository ID to the history file."""
-    if not repo_id:
-        return
-        
-    with open(HISTORY_FILE, 'a', encoding='utf-8') as f:
-        f.write(f"{repo_id}\n")
+
+class ScanHistory:
+    """
+    Indexed on-disk record of scanned repositories (SQLite), with the HEAD, time,
+    mode and pattern-set version of each repo's last scan.
+    Membership checks are single index lookups, so nothing is loaded into memory up front.
+    """
+    def __init__(self, path=None, legacy_file=None):
+        self.path = path or HISTORY_DB
+        self._lock = threading.Lock()
+
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        # Other scanner processes may write at the same time; wait for their locks instead of failing
+        self._conn = sqlite3.connect(self.path, timeout=30, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS scanned_repos ("
+            "repo_id TEXT PRIMARY KEY, full_name TEXT, head_sha TEXT, scanned_at TEXT, "
+            "mode TEXT, pattern_version TEXT) WITHOUT ROWID"
+        )
+        self._conn.commit()
+        self._migrate(legacy_file or HISTORY_FILE)
+
+    def _migrate(self, legacy_file):
+        # One-time import of the text history; the file is renamed so it isn't read again.
+        # Processes starting together may race for it: INSERT OR IGNORE makes importing it
+        # twice harmless, and whoever finds it already renamed just skips it.
+        if not os.path.exists(legacy_file):
+            return
+        imported = 0
+        try:
+            with open(legacy_file, 'r', encoding='utf-8') as f:
+                batch = []
+                for line in f:
+                    repo_id = line.strip()
+                    if not repo_id:
+                        continue
+                    batch.append((repo_id,))
+                    if len(batch) >= MIGRATION_BATCH:
+                        imported += self._insert_ids(batch)
+                        batch = []
+                imported += self._insert_ids(batch)
+            self._conn.commit()
+            os.replace(legacy_file, f"{legacy_file}.migrated")
+        except FileNotFoundError:
+            # Another process migrated and renamed it first
+            self._conn.commit()
+            return
+        logger.info(f"Migrated {imported} scanned repositories from {legacy_file} to {self.path}")
+
+    def _insert_ids(self, batch):
+        before = self._conn.total_changes
+        self._conn.executemany("INSERT OR IGNORE INTO scanned_repos (repo_id) VALUES (?)", batch)
+        return self._conn.total_changes - before
+
+    def __contains__(self, repo_id):
+        with self._lock:
+            row = self._conn.execute("SELECT 1 FROM scanned_repos WHERE repo_id = ?", (str(repo_id),)).fetchone()
+        return row is not None
+
+    def count(self):
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM scanned_repos").fetchone()[0]
+
+    def get(self, repo_id):
+        """Returns the metadata of the repo's last scan as a dict, or None if it was never scanned."""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT full_name, head_sha, scanned_at, mode, pattern_version FROM scanned_repos WHERE repo_id = ?",
+                (str(repo_id),),
+            ).fetchone()
+        if row is None:
+            return None
+        return dict(zip(("full_name", "head_sha", "scanned_at", "mode", "pattern_version"), row))
+
+    def mark_as_scanned(self, repo_id, full_name=None, head_sha=None, mode=None, pattern_version=None):
+        """
+        Records a scan, replacing the repo's previous record. Each mark is committed right
+        away: an open write transaction would lock out every other process sharing the database.
+        """
+        if not repo_id:
+            return
+        scanned_at = time.strftime("%Y-%m-%dT%H:%M:%S")
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO scanned_repos (repo_id, full_name, head_sha, scanned_at, mode, pattern_version) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                (str(repo_id), full_name, head_sha, scanned_at, mode, pattern_version),
+            )
+            self._conn.commit()
+
+    def flush(self):
+        with self._lock:
+            self._conn.commit()
+
+    def close(self):
+        with self._lock:
+            self._conn.commit()
+            self._conn.close()
+
+
+class HistoryExclusions:
+    """
+    Set-like view used as exclude_ids: IDs added in memory (e.g. repos already picked
+    by this run) plus every repo in a ScanHistory.
+    """
+    def __init__(self, history, ids=()):
+        self.history = history
+        self.ids = set(ids)
+
+    def __contains__(self, repo_id):
+        return repo_id in self.ids or repo_id in self.history
+
+    def add(self, repo_id):
+        self.ids.add(repo_id)
+
+    def update(self, ids):
+        self.ids.update(ids)
+
+    def copy(self):
+        return HistoryExclusions(self.history, self.ids)
@@ -2,52 +2,244 @@ import csv
 import json
 import os
 import logging
+import sqlite3
+import time
 from config import OUTPUT_FORMAT
 
+FIELDNAMES = ["repo", "type", "value", "commit", "location", "line", "column", "context", "file_url",
+              "first_seen_commit", "last_seen_commit", "occurrences", "fingerprint"]
+
+# Buffered findings are flushed to disk after this many, or when this many seconds have passed
+FLUSH_EVERY = 1000
+FLUSH_SECONDS = 2.0
+
+
+class ResultSink:
+    """
+    Append-only destination for findings. write() costs the same per finding however
+    large the file already is; data reaches the disk at least every FLUSH_SECONDS.
+    """
+    extension = None
+
+    def __init__(self, filename):
+        self.filename = filename
+        self.count = 0
+        self._pending = 0
+        self._last_flush = time.monotonic()
+
+    def write(self, findings):
+        """
+        Appends findings (Finding records or dicts) from any iterable, e.g. a generator.
+        Returns how many were written.
+        """
+        written = 0
+        for finding in findings:
+            if hasattr(finding, "to_dict"):
+                finding = finding.to_dict()
+            self._write_one(finding)
+            written += 1
+            self._pending += 1
+            if self._pending >= FLUSH_EVERY:
+                self.flush()
+        self.count += written
+        if self._pending and time.monotonic() - self._last_flush >= FLUSH_SECONDS:
+            self.flush()
+        return written
+
+    def _write_one(self, finding):
+        raise NotImplementedError
+
+    def flush(self):
+        self._pending = 0
+        self._last_flush = time.monotonic()
+
+    def close(self):
+        self.flush()
+
+
+class CsvSink(ResultSink):
+    """
+    Appends rows to filename. A file written with other columns (e.g. by an older
+    version) is left alone and the rows go to the first free "<name>_<n>.csv" instead.
+    """
+    extension = "csv"
+
+    def __init__(self, filename):
+        root, ext = os.path.splitext(filename)
+        n = 1
+        header = self._header(filename)
+        while header not in (None, FIELDNAMES):
+            n += 1
+            header = self._header(f"{root}_{n}{ext}")
+        if n > 1:
+            logging.getLogger(__name__).warning(f"{filename} has different columns; writing to {root}_{n}{ext} instead.")
+            filename = f"{root}_{n}{ext}"
+        super().__init__(filename)
+        self._file = open(filename, 'a', newline='', encoding='utf-8')
+        self._writer = csv.DictWriter(self._file, fieldnames=FIELDNAMES, extrasaction='ignore')
+        if header is None:
+            self._writer.writeheader()
+
+    @staticmethod
+    def _header(filename):
+        """The column names of an existing CSV file, or None if it doesn't exist or is empty."""
+        try:
+            with open(filename, 'r', newline='', encoding='utf-8') as f:
+                return next(csv.reader(f), None)
+        except FileNotFoundError:
+            return None
+
+    def _write_one(self, finding):
+        self._writer.writerow(finding)
+
+    def flush(self):
+        self._file.flush()
+        super().flush()
+
+    def close(self):
+        super().close()
+        self._file.close()
+
+
+class JsonlSink(ResultSink):
+    """One JSON object per line; a crash can only cut off the line being written."""
+    extension = "jsonl"
+
+    def __init__(self, filename):
+        super().__init__(filename)
+        self._file = open(filename, 'a', encoding='utf-8')
+
+    def _write_one(self, finding):
+        self._file.write(json.dumps(finding, ensure_ascii=False))
+        self._file.write("\n")
+
+    def flush(self):
+        self._file.flush()
+        super().flush()
+
+    def close(self):
+        super().close()
+        self._file.close()
+
+
+class JsonSink(JsonlSink):
+    """
+    Streams findings to "<filename>.partial.jsonl" and writes the JSON array to filename
+    on close. After a crash the partial file still holds every flushed finding.
+    """
+    extension = "json"
+
+    def __init__(self, filename):
+        self.array_filename = filename
+        partial_file = f"{filename}.partial.jsonl"
+        if os.path.isfile(filename) and not os.path.exists(partial_file):
+            # Appending to a finished array (a resumed run): its findings come first
+            with open(filename, 'r', encoding='utf-8') as src, open(partial_file, 'w', encoding='utf-8') as dst:
+                for finding in json.load(src):
+                    dst.write(json.dumps(finding, ensure_ascii=False))
+                    dst.write("\n")
+        super().__init__(partial_file)
+
+    def close(self):
+        super().close()
+        temp_file = f"{self.array_filename}.tmp"
+        with open(self.filename, 'r', encoding='utf-8') as src, open(temp_file, 'w', encoding='utf-8') as dst:
+            dst.write("[")
+            first = True
+            for line in src:
+                if not line.strip():
+                    continue
+                dst.write("\n    " if first else ",\n    ")
+                dst.write(json.dumps(json.loads(line), ensure_ascii=False, indent=4).replace("\n", "\n    "))
+                first = False
+            dst.write("\n]" if not first else "]")
+        os.replace(temp_file, self.array_filename)
+        os.remove(self.filename)
+
+
+class SqliteSink(ResultSink):
+    extension = "sqlite"
+
+    def __init__(self, filename):
+        super().__init__(filename)
+        self._conn = sqlite3.connect(filename, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS findings ("
+            "id INTEGER PRIMARY KEY, " + ", ".join(f'"{name}"' for name in FIELDNAMES) + ", finding TEXT NOT NULL)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS findings_fingerprint ON findings (fingerprint)")
+        self._conn.commit()
+        self._insert = (
+            "INSERT INTO findings (" + ", ".join(f'"{name}"' for name in FIELDNAMES) + ", finding) "
+            "VALUES (" + ", ".join("?" * (len(FIELDNAMES) + 1)) + ")"
+        )
+
+    def _write_one(self, finding):
+        self._conn.execute(
+            self._insert,
+            tuple(finding.get(name) for name in FIELDNAMES) + (json.dumps(finding, ensure_ascii=False),),
+        )
+
+    def flush(self):
+        self._conn.commit()
+        super().flush()
+
+    def close(self):
+        super().close()
+        self._conn.close()
+
+
+SINKS = {sink.extension: sink for sink in (CsvSink, JsonlSink, JsonSink, SqliteSink)}
+
+
 class ResultWriter:
     def __init__(self, output_format=OUTPUT_FORMAT):
         self.output_format = output_format.lower()
+        if self.output_format not in SINKS:
+            self.output_format = "csv"
         self.logger = logging.getLogger(__name__)
+        self._sink = None
+        # The filename the sink was opened for (a sink may write elsewhere, e.g. JSON's partial file)
+        self._filename = None
+
+    @property
+    def extension(self):
+        return SINKS[self.output_format].extension
 
-    def save(self, results, filename):
+    def open(self, filename):
+        """Opens the sink for filename; save() appends to it until close()."""
+        self.close()
+        # Ensure directory exists
+        os.makedirs(os.path.dirname(filename) or ".", exist_ok=True)
+        self._sink = SINKS[self.output_format](filename)
+        self._filename = filename
+
+    def save(self, results, filename=None):
         """
-        Saves results to the specified filename.
-        Delegates to specific format handlers based on self.output_format.
+        Appends results (any iterable of findings) to the open sink.
+        Opens one for filename if none is open for it yet.
         """
-        # Ensure directory exists
-        os.makedirs(os.path.dirname(filename), exist_ok=True)
-        
-        if self.output_format == 'json':
-            self._save_json(results, filename)
-        else:
-            self._save_csv(results, filename)
-
-    def _save_csv(self, results, filename):
-        file_exists = os.path.isfile(filename)
         try:
-            with open(filename, 'a', newline='', encoding='utf-8') as f:
-                writer = csv.DictWriter(f, fieldnames=["repo", "type", "value", "commit", "location", "file_url"], extrasaction='ignore')
-                if not file_exists:
-                    writer.writeheader()
-                
-                for r in results:
-                    writer.writerow(r)
+            if filename and (self._sink is None or filename != self._filename):
+                self.open(filename)
+            return self._sink.write(results)
         except Exception as e:
-            self.logger.error(f"Failed to save CSV results to {filename}: {e}")
-
-    def _save_json(self, results, filename):
-        current_data = []
-        if os.path.isfile(filename):
-            try:
-                with open(filename, 'r', encoding='utf-8') as f:
-                    current_data = json.load(f)
-            except json.JSONDecodeError:
-                pass # Start fresh if corrupt
-                
-        current_data.extend(results)
-        
+            self.logger.error(f"Failed to save {self.output_format.upper()} results to {filename or self._filename}: {e}")
+            return 0
+
+    def flush(self):
+        """Writes buffered findings to disk now."""
+        if self._sink is not None:
+            self._sink.flush()
+
+    def close(self):
+        """Flushes the sink (and, for JSON, writes the final array)."""
+        if self._sink is None:
+            return
         try:
-            with open(filename, 'w', encoding='utf-8') as f:
-                json.dump(current_data, f, indent=4, ensure_ascii=False)
+            self._sink.close()
         except Exception as e:
-            self.logger.error(f"Failed to save JSON results to {filename}: {e}")
+            self.logger.error(f"Failed to finish results file {self._filename}: {e}")
+        self._sink = None
+        self._filename = None
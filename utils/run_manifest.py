@@ -0,0 +1,162 @@
+import hashlib
+import json
+import os
+import shutil
+import threading
+import time
+
+from scanner.finding import Finding
+
+# Valid path relative for execution from root
+CACHE_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "cache")
+RUNS_DIR = os.path.join(CACHE_DIR, "runs")
+
+# A history scan's progress is checkpointed at most this often
+CHECKPOINT_SECONDS = 30.0
+
+# Arguments that decide what a run scans and finds; a resumed run takes them from its manifest
+RESUMED_ARGS = ("mode", "depth", "file_age", "checkout", "blob_limit", "incremental", "regex_engine", "entropy",
+                "exclude", "max_file_size", "scan_all")
+
+
+class RunManifest:
+    """
+    Checkpoint of one run in cache/runs/<run_id>/, so an interrupted run can be resumed:
+    - repos.json: the repositories the run planned to scan (written once);
+    - manifest.json: results file and format, scan arguments and the repos completed so far;
+    - cursors/: per repository, how far its history scan got (see HistoryCursor).
+    Every file is replaced atomically (write to a temp file, fsync, rename), so a crash
+    leaves either the previous or the new version.
+    """
+    def __init__(self, run_id, path, state, repos):
+        self.run_id = run_id
+        self.path = path
+        self._state = state
+        self.repos = repos
+        self._completed = set(state["completed"])
+        self._lock = threading.Lock()
+
+    @classmethod
+    def create(cls, run_id, results_file, output_format, repos, args, runs_dir=None):
+        path = os.path.join(runs_dir or RUNS_DIR, run_id)
+        os.makedirs(os.path.join(path, "cursors"), exist_ok=True)
+        _write_json(os.path.join(path, "repos.json"), repos)
+        state = {
+            "run_id": run_id,
+            "created_at": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "results_file": os.path.abspath(results_file),
+            "output_format": output_format,
+            "args": {name: getattr(args, name) for name in RESUMED_ARGS},
+            "planned": len(repos),
+            "completed": [],
+        }
+        manifest = cls(run_id, path, state, repos)
+        manifest._save()
+        return manifest
+
+    @classmethod
+    def load(cls, run_id, runs_dir=None):
+        """Raises FileNotFoundError if there is no run run_id."""
+        path = os.path.join(runs_dir or RUNS_DIR, run_id)
+        with open(os.path.join(path, "manifest.json"), 'r', encoding='utf-8') as f:
+            state = json.load(f)
+        with open(os.path.join(path, "repos.json"), 'r', encoding='utf-8') as f:
+            repos = json.load(f)
+        return cls(run_id, path, state, repos)
+
+    @property
+    def results_file(self):
+        return self._state["results_file"]
+
+    @property
+    def output_format(self):
+        return self._state["output_format"]
+
+    def restore_args(self, args):
+        """Sets the run's scan arguments on args."""
+        for name, value in self._state["args"].items():
+            setattr(args, name, value)
+
+    def pending_repos(self, key):
+        """The planned repos not completed yet, identified by key(repo)."""
+        with self._lock:
+            return [repo for repo in self.repos if str(key(repo)) not in self._completed]
+
+    def complete(self, key):
+        """Records a repo as done (its findings must be in the results file) and drops its cursor."""
+        with self._lock:
+            self._completed.add(str(key))
+            self._state["completed"].append(str(key))
+            self._save()
+        cursor_file = self._cursor_file(key)
+        for path in (cursor_file, f"{cursor_file}.tmp"):
+            if os.path.exists(path):
+                os.remove(path)
+
+    def cursor(self, key):
+        """The HistoryCursor of a repo: where an earlier attempt at its history scan stopped, if anywhere."""
+        return HistoryCursor(self._cursor_file(key))
+
+    def remove(self):
+        """Deletes the checkpoint (once every repo is completed there is nothing to resume)."""
+        shutil.rmtree(self.path, ignore_errors=True)
+
+    def _cursor_file(self, key):
+        return os.path.join(self.path, "cursors", hashlib.sha1(str(key).encode('utf-8')).hexdigest()[:16] + ".json")
+
+    def _save(self):
+        self._state["updated_at"] = time.strftime("%Y-%m-%dT%H:%M:%S")
+        _write_json(os.path.join(self.path, "manifest.json"), self._state)
+
+
+class HistoryCursor:
+    """
+    Progress of one repository's history scan: the HEAD it started from, how many commits
+    (in `git log` order) were scanned and the findings made in them. RepoProcessor.scan_history
+    continues after those commits and calls save() as it goes, which writes at most every
+    CHECKPOINT_SECONDS.
+    """
+    def __init__(self, path):
+        self.path = path
+        self.head = None
+        self.commits = 0
+        self._findings = []
+        self._last_save = time.monotonic()
+        if os.path.exists(path):
+            with open(path, 'r', encoding='utf-8') as f:
+                state = json.load(f)
+            self.head = state["head"]
+            self.commits = state["commits"]
+            self._findings = state["findings"]
+
+    def findings(self):
+        """The findings made before the checkpoint, in the order they were found."""
+        return [_finding_from_state(state) for state in self._findings]
+
+    def save(self, head, commits, findings, force=False):
+        """Checkpoints commits scanned from head with findings (a FindingIndex), throttled unless force."""
+        if not force and time.monotonic() - self._last_save < CHECKPOINT_SECONDS:
+            return
+        self._last_save = time.monotonic()
+        state = {
+            "head": head,
+            "commits": commits,
+            "findings": [{name: getattr(f, name) for name in Finding.__slots__} for f in findings.findings()],
+        }
+        _write_json(self.path, state)
+
+
+def _finding_from_state(state):
+    finding = Finding.__new__(Finding)
+    for name in Finding.__slots__:
+        setattr(finding, name, state.get(name))
+    return finding
+
+
+def _write_json(path, data):
+    temp_file = f"{path}.tmp"
+    with open(temp_file, 'w', encoding='utf-8') as f:
+        json.dump(data, f, ensure_ascii=False)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(temp_file, path)